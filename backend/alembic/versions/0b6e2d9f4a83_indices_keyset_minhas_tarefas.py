@@ -0,0 +1,38 @@
+"""Índices para a paginação keyset de minhas-tarefas
+
+Revision ID: 0b6e2d9f4a83
+Revises: f3b8d26a1c47
+Create Date: 2026-10-18 19:12:27.104583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e2d9f4a83'
+down_revision: Union[str, None] = 'f3b8d26a1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # O cursor compara (updated_at, id): NULL quebraria a ordem
+    op.execute("UPDATE execucoes_teste SET updated_at = coalesce(created_at, now()) WHERE updated_at IS NULL")
+    op.alter_column('execucoes_teste', 'updated_at',
+               existing_type=sa.DateTime(timezone=True),
+               existing_server_default=sa.text('now()'),
+               nullable=False)
+    op.create_index('ix_execucoes_teste_responsavel_status_updated', 'execucoes_teste', ['responsavel_id', 'status_geral', sa.text('updated_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_execucoes_teste_responsavel_updated', 'execucoes_teste', ['responsavel_id', sa.text('updated_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_execucoes_teste_responsavel_updated', table_name='execucoes_teste')
+    op.drop_index('ix_execucoes_teste_responsavel_status_updated', table_name='execucoes_teste')
+    op.alter_column('execucoes_teste', 'updated_at',
+               existing_type=sa.DateTime(timezone=True),
+               existing_server_default=sa.text('now()'),
+               nullable=True)
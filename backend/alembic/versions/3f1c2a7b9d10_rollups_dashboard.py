@@ -0,0 +1,70 @@
+"""Rollups do dashboard
+
+Revision ID: 3f1c2a7b9d10
+Revises: 9dd3c1332332
+Create Date: 2026-10-18 09:12:31.104522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a7b9d10'
+down_revision: Union[str, None] = '9dd3c1332332'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_execucoes',
+    sa.Column('sistema_id', sa.Integer(), nullable=False),
+    sa.Column('modulo_id', sa.Integer(), nullable=False),
+    sa.Column('projeto_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM(name='status_execucao_enum', create_type=False), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['modulo_id'], ['modulos.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sistema_id'], ['sistemas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sistema_id', 'modulo_id', 'projeto_id', 'status')
+    )
+    op.create_table('rollup_defeitos',
+    sa.Column('sistema_id', sa.Integer(), nullable=False),
+    sa.Column('modulo_id', sa.Integer(), nullable=False),
+    sa.Column('projeto_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM(name='status_defeito_enum', create_type=False), nullable=False),
+    sa.Column('severidade', postgresql.ENUM(name='severidade_defeito_enum', create_type=False), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['modulo_id'], ['modulos.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sistema_id'], ['sistemas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sistema_id', 'modulo_id', 'projeto_id', 'status', 'severidade')
+    )
+
+    # Carga inicial a partir dos dados existentes
+    op.execute("""
+        INSERT INTO rollup_execucoes (sistema_id, modulo_id, projeto_id, status, total)
+        SELECT p.sistema_id, p.modulo_id, p.id, e.status_geral, count(*)
+        FROM execucoes_teste e
+        JOIN casos_teste c ON c.id = e.caso_teste_id
+        JOIN projetos p ON p.id = c.projeto_id
+        WHERE e.status_geral IS NOT NULL
+        GROUP BY p.sistema_id, p.modulo_id, p.id, e.status_geral
+    """)
+    op.execute("""
+        INSERT INTO rollup_defeitos (sistema_id, modulo_id, projeto_id, status, severidade, total)
+        SELECT p.sistema_id, p.modulo_id, p.id, d.status, d.severidade, count(*)
+        FROM defeitos d
+        JOIN execucoes_teste e ON e.id = d.execucao_teste_id
+        JOIN casos_teste c ON c.id = e.caso_teste_id
+        JOIN projetos p ON p.id = c.projeto_id
+        WHERE d.status IS NOT NULL
+        GROUP BY p.sistema_id, p.modulo_id, p.id, d.status, d.severidade
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_defeitos')
+    op.drop_table('rollup_execucoes')
@@ -0,0 +1,41 @@
+"""Blobs de evidência endereçados pelo conteúdo, com contagem de referências
+
+Revision ID: 4a8c6e2f9b17
+Revises: b7e3a9c14f26
+Create Date: 2026-10-18 22:31:54.118702
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a8c6e2f9b17'
+down_revision: Union[str, None] = 'b7e3a9c14f26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'evidencias_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('caminho', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('tamanho', sa.BigInteger(), nullable=False),
+        sa.Column('referencias', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('ultimo_uso_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+    op.create_index(
+        'ix_evidencias_blobs_orfaos', 'evidencias_blobs', ['ultimo_uso_em'], unique=False,
+        postgresql_where=sa.text('referencias <= 0')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_evidencias_blobs_orfaos', table_name='evidencias_blobs')
+    op.drop_table('evidencias_blobs')
@@ -0,0 +1,38 @@
+"""Reserva (lease) de execuções para a fila de runners
+
+Revision ID: 5c9e1a7d3b62
+Revises: 0b6e2d9f4a83
+Create Date: 2026-10-18 20:04:39.518274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c9e1a7d3b62'
+down_revision: Union[str, None] = '0b6e2d9f4a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('execucoes_teste', sa.Column('reservado_por_id', sa.Integer(), nullable=True))
+    op.add_column('execucoes_teste', sa.Column('reservado_ate', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'execucoes_teste_reservado_por_id_fkey', 'execucoes_teste', 'usuarios',
+        ['reservado_por_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(
+        'ix_execucoes_teste_fila', 'execucoes_teste', ['ciclo_teste_id', 'reservado_ate'], unique=False,
+        postgresql_where=sa.text("status_geral IN ('pendente', 'reteste', 'em_progresso')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_execucoes_teste_fila', table_name='execucoes_teste')
+    op.drop_constraint('execucoes_teste_reservado_por_id_fkey', 'execucoes_teste', type_='foreignkey')
+    op.drop_column('execucoes_teste', 'reservado_ate')
+    op.drop_column('execucoes_teste', 'reservado_por_id')
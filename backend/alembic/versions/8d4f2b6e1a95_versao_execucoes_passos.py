@@ -0,0 +1,28 @@
+"""Versão (concorrência otimista) em execuções e passos de execução
+
+Revision ID: 8d4f2b6e1a95
+Revises: 5c9e1a7d3b62
+Create Date: 2026-10-18 21:12:07.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2b6e1a95'
+down_revision: Union[str, None] = '5c9e1a7d3b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('execucoes_teste', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('execucoes_passos', sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('execucoes_passos', 'versao')
+    op.drop_column('execucoes_teste', 'versao')
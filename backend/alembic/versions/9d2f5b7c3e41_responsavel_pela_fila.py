@@ -0,0 +1,29 @@
+"""Marca execuções cujo responsável veio da reserva na fila
+
+Revision ID: 9d2f5b7c3e41
+Revises: 4a8c6e2f9b17
+Create Date: 2026-10-18 21:14:03.518276
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f5b7c3e41'
+down_revision: Union[str, None] = '4a8c6e2f9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'execucoes_teste',
+        sa.Column('responsavel_pela_fila', sa.Boolean(), server_default=sa.text('false'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('execucoes_teste', 'responsavel_pela_fila')
@@ -0,0 +1,52 @@
+"""Fato diário de execuções concluídas
+
+Revision ID: a84d2c6e51f3
+Revises: 3f1c2a7b9d10
+Create Date: 2026-10-18 11:40:07.218391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84d2c6e51f3'
+down_revision: Union[str, None] = '3f1c2a7b9d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('fato_execucoes_diarias',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('responsavel_id', sa.Integer(), nullable=True),
+    sa.Column('projeto_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM(name='status_execucao_enum', create_type=False), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['responsavel_id'], ['usuarios.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dia', 'responsavel_id', 'projeto_id', 'status', name='uq_fato_execucoes_diarias_chave')
+    )
+    op.create_index(op.f('ix_fato_execucoes_diarias_id'), 'fato_execucoes_diarias', ['id'], unique=False)
+    op.create_index('ix_fato_execucoes_diarias_responsavel_dia', 'fato_execucoes_diarias', ['responsavel_id', 'dia'], unique=False)
+
+    # Carga inicial: o histórico de transições não existe, então usa o updated_at
+    # das execuções que já estão em status final (mesma aproximação do gráfico antigo)
+    op.execute("""
+        INSERT INTO fato_execucoes_diarias (dia, responsavel_id, projeto_id, status, total)
+        SELECT e.updated_at::date, e.responsavel_id, c.projeto_id, e.status_geral, count(*)
+        FROM execucoes_teste e
+        JOIN casos_teste c ON c.id = e.caso_teste_id
+        WHERE e.status_geral IN ('fechado', 'falha', 'bloqueado') AND e.updated_at IS NOT NULL
+        GROUP BY e.updated_at::date, e.responsavel_id, c.projeto_id, e.status_geral
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fato_execucoes_diarias_responsavel_dia', table_name='fato_execucoes_diarias')
+    op.drop_index(op.f('ix_fato_execucoes_diarias_id'), table_name='fato_execucoes_diarias')
+    op.drop_table('fato_execucoes_diarias')
@@ -0,0 +1,38 @@
+"""Operações do jornal offline já sincronizadas (idempotência)
+
+Revision ID: b7e3a9c14f26
+Revises: 8d4f2b6e1a95
+Create Date: 2026-10-18 21:47:31.209845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a9c14f26'
+down_revision: Union[str, None] = '8d4f2b6e1a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'operacoes_sincronizadas',
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('op_id', sa.String(length=64), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('execucao_teste_id', sa.Integer(), nullable=True),
+        sa.Column('resultado', sa.String(length=20), nullable=False),
+        sa.Column('detalhe', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('usuario_id', 'op_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operacoes_sincronizadas')
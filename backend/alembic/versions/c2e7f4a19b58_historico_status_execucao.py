@@ -0,0 +1,52 @@
+"""Histórico de transições de status das execuções
+
+Revision ID: c2e7f4a19b58
+Revises: a84d2c6e51f3
+Create Date: 2026-10-18 14:02:51.660173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e7f4a19b58'
+down_revision: Union[str, None] = 'a84d2c6e51f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('historico_status_execucao',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('execucao_teste_id', sa.Integer(), nullable=False),
+    sa.Column('status_anterior', postgresql.ENUM(name='status_execucao_enum', create_type=False), nullable=True),
+    sa.Column('status_novo', postgresql.ENUM(name='status_execucao_enum', create_type=False), nullable=False),
+    sa.Column('duracao_segundos', sa.Integer(), nullable=True),
+    sa.Column('responsavel_id', sa.Integer(), nullable=True),
+    sa.Column('caso_teste_id', sa.Integer(), nullable=False),
+    sa.Column('ciclo_teste_id', sa.Integer(), nullable=False),
+    sa.Column('projeto_id', sa.Integer(), nullable=False),
+    sa.Column('modulo_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['execucao_teste_id'], ['execucoes_teste.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_historico_status_execucao_execucao', 'historico_status_execucao', ['execucao_teste_id', 'id'], unique=False)
+    op.create_index('ix_historico_status_execucao_created_brin', 'historico_status_execucao', ['created_at'], unique=False, postgresql_using='brin')
+    op.create_index('ix_historico_duracao_responsavel', 'historico_status_execucao', ['responsavel_id', 'created_at'], unique=False, postgresql_include=['duracao_segundos'], postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.create_index('ix_historico_duracao_caso', 'historico_status_execucao', ['caso_teste_id', 'created_at'], unique=False, postgresql_include=['duracao_segundos'], postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.create_index('ix_historico_duracao_modulo', 'historico_status_execucao', ['modulo_id', 'created_at'], unique=False, postgresql_include=['duracao_segundos'], postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.create_index('ix_historico_duracao_ciclo', 'historico_status_execucao', ['ciclo_teste_id', 'created_at'], unique=False, postgresql_include=['duracao_segundos'], postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_historico_duracao_ciclo', table_name='historico_status_execucao', postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.drop_index('ix_historico_duracao_modulo', table_name='historico_status_execucao', postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.drop_index('ix_historico_duracao_caso', table_name='historico_status_execucao', postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.drop_index('ix_historico_duracao_responsavel', table_name='historico_status_execucao', postgresql_where=sa.text('duracao_segundos IS NOT NULL'))
+    op.drop_index('ix_historico_status_execucao_created_brin', table_name='historico_status_execucao', postgresql_using='brin')
+    op.drop_index('ix_historico_status_execucao_execucao', table_name='historico_status_execucao')
+    op.drop_table('historico_status_execucao')
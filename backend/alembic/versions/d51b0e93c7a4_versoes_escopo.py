@@ -0,0 +1,31 @@
+"""Versões por escopo para GET condicional
+
+Revision ID: d51b0e93c7a4
+Revises: c2e7f4a19b58
+Create Date: 2026-10-18 16:27:44.905318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd51b0e93c7a4'
+down_revision: Union[str, None] = 'c2e7f4a19b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('versoes_escopo',
+    sa.Column('escopo', sa.String(length=64), nullable=False),
+    sa.Column('versao', sa.BigInteger(), server_default='1', nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('escopo')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('versoes_escopo')
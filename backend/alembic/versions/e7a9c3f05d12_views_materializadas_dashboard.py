@@ -0,0 +1,129 @@
+"""Views materializadas do dashboard geral
+
+Revision ID: e7a9c3f05d12
+Revises: d51b0e93c7a4
+Create Date: 2026-10-18 17:21:43.905512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a9c3f05d12'
+down_revision: Union[str, None] = 'd51b0e93c7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUS_EXECUCAO = ('pendente', 'em_progresso', 'reteste', 'fechado', 'bloqueado', 'falha')
+SEVERIDADES = ('critico', 'alto', 'medio', 'baixo')
+LIMITE_TOP_MODULOS = 5
+
+
+def upgrade() -> None:
+    exec_colunas = ",\n            ".join(
+        f"count(*) FILTER (WHERE e.status_geral = '{s}') AS exec_{s}" for s in STATUS_EXECUCAO
+    )
+    sev_colunas = ",\n            ".join(
+        f"count(*) FILTER (WHERE status <> 'fechado' AND severidade = '{sev}') AS sev_{sev}" for sev in SEVERIDADES
+    )
+    exec_saida = ",\n        ".join(f"coalesce(ek.exec_{s}, 0) AS exec_{s}" for s in STATUS_EXECUCAO)
+    sev_saida = ",\n        ".join(f"coalesce(dk.sev_{sev}, 0) AS sev_{sev}" for sev in SEVERIDADES)
+
+    # Cada agregado usa GROUPING SETS ((sistema_id), ()): a linha do grupo vazio
+    # (sistema_id NULL) é o total geral, gravado com escopo 0.
+    op.execute(f"""
+        CREATE MATERIALIZED VIEW mv_dashboard_sistema AS
+        WITH escopos AS (
+            SELECT id AS escopo FROM sistemas
+            UNION ALL
+            SELECT 0
+        ),
+        projetos_kpis AS (
+            SELECT coalesce(sistema_id, 0) AS escopo,
+                   count(*) FILTER (WHERE status = 'ativo') AS total_projetos
+            FROM projetos
+            GROUP BY GROUPING SETS ((sistema_id), ())
+        ),
+        ciclos_kpis AS (
+            SELECT coalesce(p.sistema_id, 0) AS escopo, count(*) AS total_ciclos_ativos
+            FROM ciclos_teste ci
+            JOIN projetos p ON p.id = ci.projeto_id
+            WHERE ci.status IN ('em_execucao', 'planejado')
+            GROUP BY GROUPING SETS ((p.sistema_id), ())
+        ),
+        casos_kpis AS (
+            SELECT coalesce(p.sistema_id, 0) AS escopo, count(*) AS total_casos_teste
+            FROM casos_teste c
+            JOIN projetos p ON p.id = c.projeto_id
+            GROUP BY GROUPING SETS ((p.sistema_id), ())
+        ),
+        exec_kpis AS (
+            SELECT coalesce(p.sistema_id, 0) AS escopo,
+            {exec_colunas}
+            FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            GROUP BY GROUPING SETS ((p.sistema_id), ())
+        ),
+        defeitos_escopo AS (
+            SELECT p.sistema_id, p.modulo_id, d.status, d.severidade
+            FROM defeitos d
+            JOIN execucoes_teste e ON e.id = d.execucao_teste_id
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+        ),
+        def_kpis AS (
+            SELECT coalesce(sistema_id, 0) AS escopo,
+            count(*) FILTER (WHERE status IN ('aberto', 'em_teste')) AS total_defeitos_abertos,
+            count(*) FILTER (WHERE status <> 'fechado' AND severidade IN ('critico', 'alto')) AS total_defeitos_criticos,
+            count(*) FILTER (WHERE status = 'corrigido') AS total_aguardando_reteste,
+            {sev_colunas}
+            FROM defeitos_escopo
+            GROUP BY GROUPING SETS ((sistema_id), ())
+        ),
+        ranking_modulos AS (
+            SELECT coalesce(de.sistema_id, 0) AS escopo, m.nome, count(*) AS total,
+                   row_number() OVER (
+                       PARTITION BY coalesce(de.sistema_id, 0) ORDER BY count(*) DESC, m.nome
+                   ) AS posicao
+            FROM defeitos_escopo de
+            JOIN modulos m ON m.id = de.modulo_id
+            GROUP BY GROUPING SETS ((de.sistema_id, m.nome), (m.nome))
+        ),
+        top_modulos AS (
+            SELECT escopo, json_agg(json_build_array(nome, total) ORDER BY posicao) AS top_modulos
+            FROM ranking_modulos
+            WHERE posicao <= {LIMITE_TOP_MODULOS}
+            GROUP BY escopo
+        )
+        SELECT
+        es.escopo,
+        coalesce(pk.total_projetos, 0) AS total_projetos,
+        coalesce(ck.total_ciclos_ativos, 0) AS total_ciclos_ativos,
+        coalesce(ca.total_casos_teste, 0) AS total_casos_teste,
+        {exec_saida},
+        coalesce(dk.total_defeitos_abertos, 0) AS total_defeitos_abertos,
+        coalesce(dk.total_defeitos_criticos, 0) AS total_defeitos_criticos,
+        coalesce(dk.total_aguardando_reteste, 0) AS total_aguardando_reteste,
+        {sev_saida},
+        tm.top_modulos,
+        now() AS atualizado_em
+        FROM escopos es
+        LEFT JOIN projetos_kpis pk USING (escopo)
+        LEFT JOIN ciclos_kpis ck USING (escopo)
+        LEFT JOIN casos_kpis ca USING (escopo)
+        LEFT JOIN exec_kpis ek USING (escopo)
+        LEFT JOIN def_kpis dk USING (escopo)
+        LEFT JOIN top_modulos tm USING (escopo)
+    """)
+    # Obrigatório para REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ix_mv_dashboard_sistema_escopo', 'mv_dashboard_sistema', ['escopo'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM versoes_escopo WHERE escopo = 'dashboard:materializado'")
+    op.drop_index('ix_mv_dashboard_sistema_escopo', table_name='mv_dashboard_sistema')
+    op.execute("DROP MATERIALIZED VIEW mv_dashboard_sistema")
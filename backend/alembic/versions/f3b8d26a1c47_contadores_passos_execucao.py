@@ -0,0 +1,55 @@
+"""Contadores de passos por status nas execuções
+
+Revision ID: f3b8d26a1c47
+Revises: e7a9c3f05d12
+Create Date: 2026-10-18 18:05:12.337840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d26a1c47'
+down_revision: Union[str, None] = 'e7a9c3f05d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONTADORES = {
+    'pendente': 'passos_pendentes',
+    'aprovado': 'passos_aprovados',
+    'reprovado': 'passos_reprovados',
+    'bloqueado': 'passos_bloqueados',
+}
+
+
+def upgrade() -> None:
+    for coluna in CONTADORES.values():
+        op.add_column('execucoes_teste', sa.Column(coluna, sa.Integer(), server_default='0', nullable=False))
+
+    # Carga inicial; passo sem status conta como pendente
+    contagens = ",\n            ".join(
+        f"{coluna} = c.{coluna}" for coluna in CONTADORES.values()
+    )
+    filtros = ",\n                   ".join(
+        f"count(*) FILTER (WHERE coalesce(status, 'pendente') = '{status}') AS {coluna}"
+        for status, coluna in CONTADORES.items()
+    )
+    op.execute(f"""
+        UPDATE execucoes_teste e SET
+            {contagens}
+        FROM (
+            SELECT execucao_teste_id,
+                   {filtros}
+            FROM execucoes_passos
+            GROUP BY execucao_teste_id
+        ) c
+        WHERE c.execucao_teste_id = e.id
+    """)
+
+
+def downgrade() -> None:
+    for coluna in reversed(list(CONTADORES.values())):
+        op.drop_column('execucoes_teste', coluna)
@@ -0,0 +1,237 @@
+import mimetypes
+import os
+import stat
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+
+from app.api.condicional import _etag_confere, _nao_modificado_desde
+from app.core.config import settings
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.services.armazenamento import armazenamento, ArmazenamentoLocal
+from app.services.evidencias import (
+    normalizar_tipo, validar_tamanho, validar_caminho_blob, receber_evidencia, descartar
+)
+
+# Download de arquivos de evidência: Range (206), GET condicional (ETag /
+# Last-Modified) e Content-Type cadastrado do blob (ou pela extensão, restrito
+# aos tipos permitidos no upload), sempre com nosniff.
+#
+# Uso no endpoint:
+#     return await responder_evidencia(request, caminho, db=db)
+# (armazenamento local e arquivos antigos: serve o arquivo; S3: redireciona para uma URL pré-assinada)
+
+# Blobs e prévias são endereçados pelo conteúdo: o arquivo de uma URL nunca muda
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+# Arquivos antigos (nome livre): pode guardar, mas revalida (304 barato)
+CACHE_REVALIDAR = "public, no-cache"
+
+def _partes_caminho(caminho: str) -> List[str]:
+    partes = caminho.replace("\\", "/").split("/")
+    if not caminho or any(not parte or parte.startswith(".") for parte in partes):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return partes
+
+def resolver_evidencia(caminho: str) -> str:
+    """
+    Caminho absoluto de um arquivo guardado em EVIDENCIAS_DIR. Recusa (404)
+    qualquer coisa fora dele (.., links simbólicos para fora, caminho absoluto),
+    temporários e ocultos (.parcial-*) e o que não for arquivo regular.
+    """
+    base = os.path.realpath(settings.EVIDENCIAS_DIR)
+    partes = _partes_caminho(caminho)
+    arquivo = os.path.realpath(os.path.join(base, *partes))
+    if os.path.commonpath([base, arquivo]) != base or not os.path.isfile(arquivo):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return arquivo
+
+def cache_evidencia(caminho: str) -> str:
+    return CACHE_IMUTAVEL if caminho.startswith(("blobs/", "previews/")) else CACHE_REVALIDAR
+
+def tipo_por_extensao(caminho: str) -> str:
+    # Sem tipo cadastrado (arquivos antigos): só um tipo que o upload aceitaria sai como tal
+    tipo = mimetypes.guess_type(caminho)[0]
+    return tipo if tipo in settings.EVIDENCIA_TIPOS_PERMITIDOS else "application/octet-stream"
+
+def _etag(estado: os.stat_result) -> str:
+    return f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+
+def _intervalo(cabecalho: str, tamanho: int) -> Optional[Tuple[int, int]]:
+    """
+    (início, fim inclusivo) de um Range "bytes=" com um único intervalo; None
+    se o cabeçalho não for entendido (a resposta é o arquivo inteiro, como a RFC
+    permite). Intervalo fora do arquivo levanta 416.
+    """
+    unidade, _, especificacao = cabecalho.partition("=")
+    if unidade.strip().lower() != "bytes" or "," in especificacao:
+        return None
+    inicio, separador, fim = (parte.strip() for parte in especificacao.partition("-"))
+    if not separador or not (inicio or fim) or not all(parte.isdigit() for parte in (inicio, fim) if parte):
+        return None
+    if not inicio:
+        # Sufixo: os últimos N bytes
+        if int(fim) == 0:
+            raise _fora_do_arquivo(tamanho)
+        return max(0, tamanho - int(fim)), tamanho - 1
+    if fim and int(fim) < int(inicio):
+        return None
+    if int(inicio) >= tamanho:
+        raise _fora_do_arquivo(tamanho)
+    return int(inicio), min(int(fim), tamanho - 1) if fim else tamanho - 1
+
+def _fora_do_arquivo(tamanho: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Intervalo fora do arquivo",
+        headers={"Content-Range": f"bytes */{tamanho}"},
+    )
+
+def _if_range_confere(if_range: str, etag: str, modificado_em: datetime) -> bool:
+    # ETag forte exata, ou a data de Last-Modified
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return _nao_modificado_desde(if_range, modificado_em)
+
+class RespostaIntervalo(Response):
+    """206 com um pedaço do arquivo, lido em blocos numa thread."""
+
+    def __init__(self, caminho: str, inicio: int, fim: int, headers: dict, media_type: str):
+        super().__init__(status_code=status.HTTP_206_PARTIAL_CONTENT, headers=headers, media_type=media_type)
+        self.caminho, self.inicio, self.fim = caminho, inicio, fim
+        self.headers["content-length"] = str(fim - inicio + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        restante = self.fim - self.inicio + 1
+        async with await anyio.open_file(self.caminho, mode="rb") as arquivo:
+            await arquivo.seek(self.inicio)
+            while restante > 0:
+                bloco = await arquivo.read(min(settings.EVIDENCIA_BLOCO_BYTES, restante))
+                if not bloco:
+                    break
+                restante -= len(bloco)
+                await send({"type": "http.response.body", "body": bloco, "more_body": restante > 0})
+        if restante > 0:
+            # Arquivo encolheu no meio do envio: encerra o corpo (o cliente vê o tamanho errado e repete)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+async def responder_arquivo(
+    request: Request,
+    arquivo: str,
+    cache_control: str = CACHE_REVALIDAR,
+    media_type: Optional[str] = None,
+    nome_download: Optional[str] = None,
+) -> Response:
+    """
+    Responde com o arquivo inteiro (200, via FileResponse: usa sendfile/
+    http.response.pathsend quando o servidor oferece), um intervalo (206),
+    416, ou 304 se o cliente já tem esta versão. `nome_download` põe
+    Content-Disposition: attachment; sem ele o navegador exibe (inline).
+    """
+    estado = await anyio.to_thread.run_sync(os.stat, arquivo)
+    if not stat.S_ISREG(estado.st_mode):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    etag = _etag(estado)
+    modificado_em = datetime.fromtimestamp(estado.st_mtime, tz=timezone.utc)
+    cabecalhos = {
+        "ETag": etag,
+        "Last-Modified": formatdate(estado.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        # O navegador não adivinha outro tipo (um "PNG" com HTML dentro não vira página)
+        "X-Content-Type-Options": "nosniff",
+    }
+    media_type = media_type or tipo_por_extensao(arquivo)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        nao_modificado = _etag_confere(if_none_match, etag)
+    else:
+        nao_modificado = bool(if_modified_since and _nao_modificado_desde(if_modified_since, modificado_em))
+    if nao_modificado:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+
+    if nome_download:
+        cabecalhos["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(nome_download)}"
+
+    faixa = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if faixa and (if_range is None or _if_range_confere(if_range, etag, modificado_em)):
+        try:
+            intervalo = _intervalo(faixa, estado.st_size)
+        except HTTPException as erro:
+            erro.headers = {**cabecalhos, **erro.headers}
+            raise
+        if intervalo:
+            inicio, fim = intervalo
+            cabecalhos["Content-Range"] = f"bytes {inicio}-{fim}/{estado.st_size}"
+            return RespostaIntervalo(arquivo, inicio, fim, cabecalhos, media_type)
+
+    return FileResponse(arquivo, headers=cabecalhos, media_type=media_type, stat_result=estado)
+
+async def responder_evidencia(
+    request: Request,
+    caminho: str,
+    media_type: Optional[str] = None,
+    nome_download: Optional[str] = None,
+    db: Optional[AsyncSession] = None,
+) -> Response:
+    """
+    Arquivo de evidência pelo caminho relativo. No disco local é servido aqui
+    (responder_arquivo), com o content_type cadastrado do blob quando há `db`;
+    no S3 vira um 307 para a URL pré-assinada, e os bytes (com Range, ETag,
+    cache e o Content-Type gravados no objeto) não passam pela API. Arquivos
+    antigos de nome livre (fora de blobs/ e previews/) continuam no disco
+    local mesmo com S3 e são servidos daqui.
+    """
+    if isinstance(armazenamento, ArmazenamentoLocal) or not caminho.startswith(("blobs/", "previews/")):
+        arquivo = resolver_evidencia(caminho)
+        if media_type is None and db is not None and caminho.startswith("blobs/"):
+            media_type = await EvidenciaRepository(db).content_type(caminho)
+        return await responder_arquivo(
+            request, arquivo, cache_control=cache_evidencia(caminho), media_type=media_type, nome_download=nome_download
+        )
+    caminho = "/".join(_partes_caminho(caminho))
+    return RedirectResponse(
+        armazenamento.url_download(caminho, nome_download),
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        # O redirecionamento pode ser reaproveitado enquanto a URL assinada ainda vale
+        headers={"Cache-Control": f"private, max-age={settings.EVIDENCIA_URL_EXPIRA_SEGUNDOS // 2}"},
+    )
+
+async def receber_upload_assinado(request: Request, caminho: str) -> Response:
+    """
+    PUT na URL de upload direto do armazenamento local (url_upload): confere
+    assinatura e validade, grava o corpo em stream e só publica se o SHA-256
+    for o do nome do blob.
+    """
+    if not isinstance(armazenamento, ArmazenamentoLocal):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    tipo = normalizar_tipo(request.headers.get("content-type"))
+    if not armazenamento.assinatura_valida(
+        caminho, tipo, request.query_params.get("expira", ""), request.query_params.get("assinatura", "")
+    ):
+        raise HTTPException(status_code=403, detail="URL de upload inválida ou expirada")
+    sha256 = os.path.basename(caminho)[:64]
+    validar_caminho_blob(sha256, caminho)
+    tamanho = request.headers.get("content-length")
+    validar_tamanho(int(tamanho) if tamanho and tamanho.isdigit() else None)
+
+    recebida = await receber_evidencia(request.stream())
+    if recebida.sha256 != sha256:
+        await descartar(recebida.parcial)
+        raise HTTPException(status_code=400, detail="Conteúdo recebido não confere com o SHA-256 informado")
+    await armazenamento.publicar(recebida.parcial, caminho, tipo)
+    return Response(status_code=status.HTTP_200_OK)
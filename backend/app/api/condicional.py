@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.versao_escopo import VersaoEscopo
+
+# GET condicional (ETag / Last-Modified) a partir das versões por escopo.
+#
+# Uso no endpoint, antes de qualquer consulta pesada:
+#     nao_modificado = await verificar_condicional(request, response, db, f"projeto:{projeto_id}", current_user.id)
+#     if nao_modificado:
+#         return nao_modificado
+
+async def obter_versao(db: AsyncSession, escopo: str) -> Tuple[int, Optional[datetime]]:
+    """
+    Versão e data da última alteração de um escopo. "sistema:*" agrega todos os
+    sistemas (soma das versões: muda sempre que qualquer um deles muda).
+    """
+    if escopo.endswith("*"):
+        query = select(
+            func.coalesce(func.sum(VersaoEscopo.versao), 0),
+            func.max(VersaoEscopo.atualizado_em)
+        ).where(VersaoEscopo.escopo.like(escopo[:-1] + "%"))
+    else:
+        query = select(VersaoEscopo.versao, VersaoEscopo.atualizado_em).where(VersaoEscopo.escopo == escopo)
+
+    row = (await db.execute(query)).first()
+    if not row:
+        return 0, None
+    return int(row[0] or 0), row[1]
+
+def _etag(request: Request, escopo: str, versao: int, usuario_id: Optional[int]) -> str:
+    # A mesma versão serve respostas diferentes por rota, filtros e usuário
+    parametros = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    base = f"{request.url.path}?{parametros}|{escopo}|{versao}|{usuario_id}"
+    return f'W/"{hashlib.sha1(base.encode()).hexdigest()[:20]}"'
+
+def _etag_confere(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca: ignora o prefixo W/
+    alvo = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == alvo for tag in if_none_match.split(","))
+
+def _nao_modificado_desde(if_modified_since: str, atualizado_em: datetime) -> bool:
+    try:
+        desde = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    # Last-Modified tem resolução de segundos
+    return atualizado_em.replace(microsecond=0) <= desde
+
+async def verificar_condicional(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    escopo: str,
+    usuario_id: Optional[int] = None
+) -> Optional[Response]:
+    """
+    Devolve uma resposta 304 se o cliente já tem a versão atual do escopo; caso
+    contrário grava ETag/Last-Modified em `response` e devolve None.
+    """
+    versao, atualizado_em = await obter_versao(db, escopo)
+    etag = _etag(request, escopo, versao, usuario_id)
+
+    cabecalhos = {
+        "ETag": etag,
+        # O cliente pode guardar, mas deve revalidar sempre (a revalidação é barata)
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if atualizado_em:
+        cabecalhos["Last-Modified"] = format_datetime(atualizado_em.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        nao_modificado = _etag_confere(if_none_match, etag)
+    else:
+        nao_modificado = bool(if_modified_since and atualizado_em and _nao_modificado_desde(if_modified_since, atualizado_em))
+
+    if nao_modificado:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+
+    response.headers.update(cabecalhos)
+    return None
@@ -1,12 +1,12 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Header, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.usuario import Usuario
 from app.schemas.token import TokenPayload
 from app.repositories.usuario_repository import UsuarioRepository
@@ -18,6 +18,9 @@ reusable_oauth2 = OAuth2PasswordBearer(
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> Usuario:
+    return await _usuario_do_token(db, token)
+
+async def _usuario_do_token(db: AsyncSession, token: str) -> Usuario:
     try:
         # CORREÇÃO AQUI: settings.ALGORITHM
         payload = jwt.decode(
@@ -45,4 +48,21 @@ def get_current_active_user(
 ) -> Usuario:
     if not current_user.ativo:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_active_user_stream(
+    token: Optional[str] = Query(None, description="Token JWT (EventSource não envia headers)"),
+    authorization: Optional[str] = Header(None),
+) -> Usuario:
+    """
+    Autenticação para conexões longas (SSE): aceita o token no header ou em ?token=
+    e usa uma sessão curta, para não prender uma conexão do pool durante o stream.
+    """
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    async with AsyncSessionLocal() as db:
+        user = await _usuario_do_token(db, token)
+    return get_current_active_user(user)
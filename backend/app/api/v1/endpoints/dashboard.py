@@ -1,22 +1,56 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
-from app.services.dashboard_service import DashboardService
+from app.core.eventos import ESCOPO_DASHBOARD_MATERIALIZADO
+from app.services.dashboard_service import DashboardService, cache_dashboard
 from app.schemas.dashboard import DashboardResponse
 from app.models.usuario import Usuario
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_active_user_stream
+from app.api.condicional import verificar_condicional
+from app.services.dashboard_stream import hub_dashboard
 
 router = APIRouter()
 
 @router.get("/", response_model=DashboardResponse)
 async def get_dashboard(
+    request: Request,
+    response: Response,
     sistema_id: Optional[int] = Query(None, description="Filtrar KPI por Sistema"),
     current_user: Usuario = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
+    if settings.DASHBOARD_USAR_MATVIEWS:
+        # Servido das views: só muda quando elas são atualizadas
+        escopo = ESCOPO_DASHBOARD_MATERIALIZADO
+    else:
+        escopo = f"sistema:{sistema_id}" if sistema_id else "sistema:*"
+    nao_modificado = await verificar_condicional(request, response, db, escopo)
+    if nao_modificado:
+        return nao_modificado
+
     # --- CORREÇÃO AQUI ---
     # NÃO crie o repo aqui. O Service já faz isso internamente agora.
     service = DashboardService(db) 
     
-    return await service.get_dashboard_data(sistema_id=sistema_id)
\ No newline at end of file
+    return await service.get_dashboard_data(sistema_id=sistema_id)
+
+@router.get("/cache", summary="Estatísticas do cache de dashboards deste worker")
+async def get_dashboard_cache_stats(
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return cache_dashboard.estatisticas()
+
+
+@router.get("/stream", summary="Stream SSE do dashboard geral (snapshot inicial + deltas)")
+async def stream_dashboard(
+    sistema_id: Optional[int] = Query(None, description="Filtrar KPI por Sistema"),
+    current_user: Usuario = Depends(get_current_active_user_stream)
+):
+    return StreamingResponse(
+        hub_dashboard.transmitir(("dashboard", sistema_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from app.core.database import get_db
 from app.services.defeito_service import DefeitoService
-from app.schemas.defeito import DefeitoCreate, DefeitoResponse, DefeitoUpdate
+from app.schemas.defeito import DefeitoCreate, DefeitoResponse, DefeitoUpdate, DefeitoResumo, DefeitoCompleto
+from app.schemas.execucao_teste import VisaoExecucao
 from app.models.usuario import Usuario 
 from app.api.deps import get_current_user
+from app.api.condicional import verificar_condicional
 
 router = APIRouter()
 
+# Com ?view= o formato muda; o service já devolve os schemas validados
+RESPOSTA_LISTA_DEFEITOS = {200: {"model": Union[List[DefeitoResponse], List[DefeitoResumo], List[DefeitoCompleto]]}}
+
 def get_service(db: AsyncSession = Depends(get_db)) -> DefeitoService:
     return DefeitoService(db)
 
@@ -20,20 +25,30 @@ async def criar_defeito(
 ):
     return await service.registrar_defeito(dados)
 
-@router.get("/execucao/{execucao_id}", response_model=List[DefeitoResponse])
+@router.get("/execucao/{execucao_id}", response_model=None, responses=RESPOSTA_LISTA_DEFEITOS)
 async def listar_defeitos_execucao(
     execucao_id: int, 
+    view: Optional[VisaoExecucao] = Query(None, description="summary: só colunas; full: execução normalizada"),
     service: DefeitoService = Depends(get_service)
 ):
-    return await service.listar_por_execucao(execucao_id)
+    return await service.listar_por_execucao(execucao_id, view)
 
-@router.get("/", response_model=List[DefeitoResponse])
+@router.get("/", response_model=None, responses=RESPOSTA_LISTA_DEFEITOS)
 async def listar_todos_defeitos(
+    request: Request,
+    response: Response,
     responsavel_id: Optional[int] = Query(None, description="Filtrar por ID do responsável"),
+    view: Optional[VisaoExecucao] = Query(None, description="summary: só colunas; full: execução normalizada"),
     current_user: Usuario = Depends(get_current_user),
-    service: DefeitoService = Depends(get_service)
+    service: DefeitoService = Depends(get_service),
+    db: AsyncSession = Depends(get_db)
 ):
-    return await service.listar_todos(current_user, filtro_responsavel_id=responsavel_id)
+    # Defeitos de qualquer sistema entram na lista: versão agregada de todos
+    nao_modificado = await verificar_condicional(request, response, db, "sistema:*", current_user.id)
+    if nao_modificado:
+        return nao_modificado
+
+    return await service.listar_todos(current_user, filtro_responsavel_id=responsavel_id, view=view)
 
 @router.put("/{id}", response_model=DefeitoResponse)
 async def atualizar_defeito(
@@ -1,11 +1,14 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from typing import List, Optional, Literal
+from datetime import date
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.services.dashboard_service import DashboardService
-from app.schemas.dashboard import RunnerDashboardResponse, PerformanceResponse
+from app.schemas.dashboard import RunnerDashboardResponse, PerformanceResponse, DuracaoExecucaoData, EquipeRunnersResponse
 from app.models.usuario import Usuario
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_active_user_stream
+from app.services.dashboard_stream import hub_dashboard
 
 router = APIRouter()
 
@@ -18,13 +21,67 @@ async def get_runner_dashboard(
     service = DashboardService(db)
     return await service.get_runner_dashboard_data(runner_id=current_user.id)
 
+@router.get("/stream", summary="Stream SSE do dashboard pessoal do runner (snapshot inicial + deltas)")
+async def stream_runner_dashboard(
+    current_user: Usuario = Depends(get_current_active_user_stream)
+):
+    return StreamingResponse(
+        hub_dashboard.transmitir(("runner", current_user.id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/equipe", response_model=EquipeRunnersResponse)
+async def get_kpis_equipe(
+    ordenar_por: Literal[
+        "nome", "total_execucoes_concluidas", "total_defeitos_reportados",
+        "tempo_medio_execucao_minutos", "testes_em_fila", "ultima_atividade"
+    ] = Query("total_execucoes_concluidas", description="KPI usado na ordenação"),
+    ordem: Literal["asc", "desc"] = Query("desc"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # KPIs de todos os runners de uma vez (visao do gestor)
+    service = DashboardService(db)
+    return await service.get_kpis_equipe(ordenar_por, ordem == "desc", skip, limit)
+
 @router.get("/performance", response_model=PerformanceResponse)
 async def get_performance_dashboard(
     user_id: Optional[int] = Query(None, description="ID do usuário para visão individual"),
+    granularidade: Literal["dia", "semana", "mes"] = Query("dia", description="Agrupamento do gráfico de velocidade"),
+    data_inicio: Optional[date] = Query(None, description="Início do período (padrão: 30 dias antes do fim)"),
+    data_fim: Optional[date] = Query(None, description="Fim do período (padrão: hoje)"),
     current_user: Usuario = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     # endpoint de analise de performance 
     # se user_id for passado, filtra pelo testador, senao mostra geral
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+
+    service = DashboardService(db)
+    return await service.get_performance_analytics(
+        user_id=user_id,
+        granularidade=granularidade,
+        data_inicio=data_inicio,
+        data_fim=data_fim
+    )
+
+@router.get("/duracoes", response_model=List[DuracaoExecucaoData])
+async def get_duracoes_execucao(
+    agrupar_por: Literal["runner", "caso", "modulo", "ciclo"] = Query("runner", description="Dimensão do agrupamento"),
+    user_id: Optional[int] = Query(None, description="Considerar apenas execuções deste testador"),
+    data_inicio: Optional[date] = Query(None, description="Conclusões a partir desta data"),
+    data_fim: Optional[date] = Query(None, description="Conclusões até esta data (inclusive)"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # duracao media, p50 e p95 das execucoes concluidas (historico de status)
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+
     service = DashboardService(db)
-    return await service.get_performance_analytics(user_id=user_id)
\ No newline at end of file
+    return await service.get_duracoes_execucao(agrupar_por, user_id, data_inicio, data_fim, limit)
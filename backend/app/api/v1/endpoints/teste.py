@@ -2,19 +2,22 @@ import shutil
 import uuid
 import os
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from app.core.database import get_db
+from app.core.config import settings
 from app.api.deps import get_current_user, get_current_active_user
+from app.api.condicional import verificar_condicional
+from app.api.arquivos import responder_evidencia
 from app.models.usuario import Usuario
 from app.models.testing import StatusExecucaoEnum
 
 from app.services.caso_teste_service import CasoTesteService
 from app.services.ciclo_teste_service import CicloTesteService
 from app.services.execucao_teste_service import ExecucaoTesteService
+from app.services.evidencias import blocos_upload
 
 from app.schemas.caso_teste import CasoTesteCreate, CasoTesteResponse, CasoTesteUpdate
 from app.schemas.ciclo_teste import CicloTesteCreate, CicloTesteResponse, CicloTesteUpdate
@@ -22,7 +25,25 @@ from app.schemas.execucao_teste import (
     ExecucaoTesteCreate, 
     ExecucaoTesteResponse, 
     ExecucaoPassoResponse, 
-    ExecucaoPassoUpdate
+    ExecucaoPassoUpdate,
+    ExecucaoPassosLote,
+    ExecucaoPassosLoteResponse,
+    ExecucaoTesteResumo,
+    ExecucaoTesteCompleta,
+    VisaoExecucao,
+    PlanejamentoLote,
+    PlanejamentoLoteResponse,
+    ReservaExecucaoResponse,
+    AtribuicaoCiclo,
+    AtribuicaoCicloResponse,
+    AutosavePasso,
+    AutosavePassoResponse,
+    JornalSincronizacao,
+    SincronizacaoResponse,
+    EvidenciaUploadResponse,
+    EvidenciaUploadDiretoCreate,
+    EvidenciaUploadDiretoResponse,
+    EvidenciaUploadDiretoConcluir
 )
 
 router = APIRouter()
@@ -41,9 +62,16 @@ def get_execucao_service(db: AsyncSession = Depends(get_db)) -> ExecucaoTesteSer
 @router.get("/projetos/{projeto_id}/casos", response_model=List[CasoTesteResponse])
 async def listar_casos_projeto(
     projeto_id: int,
+    request: Request,
+    response: Response,
     service: CasoTesteService = Depends(get_caso_service),
-    current_user: Usuario = Depends(get_current_active_user)
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    nao_modificado = await verificar_condicional(request, response, db, f"projeto:{projeto_id}", current_user.id)
+    if nao_modificado:
+        return nao_modificado
+
     # CORREÇÃO: Método correto é listar_casos_teste
     return await service.listar_casos_teste(projeto_id)
 
@@ -92,9 +120,16 @@ async def remover_caso_teste(
 @router.get("/projetos/{projeto_id}/ciclos", response_model=List[CicloTesteResponse])
 async def listar_ciclos_projeto(
     projeto_id: int,
+    request: Request,
+    response: Response,
     service: CicloTesteService = Depends(get_ciclo_service),
-    current_user: Usuario = Depends(get_current_active_user)
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    nao_modificado = await verificar_condicional(request, response, db, f"projeto:{projeto_id}", current_user.id)
+    if nao_modificado:
+        return nao_modificado
+
     return await service.listar_por_projeto(projeto_id)
 
 @router.post("/projetos/{projeto_id}/ciclos", response_model=CicloTesteResponse, status_code=status.HTTP_201_CREATED)
@@ -137,27 +172,92 @@ async def criar_execucao(
 ):
     return await service.alocar_teste(dados.ciclo_teste_id, dados.caso_teste_id, dados.responsavel_id)
 
-@router.get("/minhas-tarefas", response_model=List[ExecucaoTesteResponse]) 
+@router.post("/ciclos/{ciclo_id}/planejamento", response_model=PlanejamentoLoteResponse, status_code=status.HTTP_201_CREATED)
+async def planejar_ciclo(
+    ciclo_id: int,
+    dados: PlanejamentoLote,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.planejar_ciclo(ciclo_id, dados)
+
+@router.post("/ciclos/{ciclo_id}/atribuicao", response_model=AtribuicaoCicloResponse)
+async def atribuir_ciclo(
+    ciclo_id: int,
+    dados: AtribuicaoCiclo,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.atribuir_ciclo(ciclo_id, dados)
+
+@router.get(
+    "/minhas-tarefas",
+    response_model=None,
+    responses={200: {"model": Union[List[ExecucaoTesteResponse], List[ExecucaoTesteResumo], List[ExecucaoTesteCompleta]]}}
+) 
 async def listar_meus_testes(
+    response: Response,
     status: Optional[StatusExecucaoEnum] = None,
     skip: int = 0,
     limit: int = 20,
+    view: Optional[VisaoExecucao] = Query(None, description="summary: só colunas; full: passos do caso uma única vez"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior (ignora skip)"),
     current_user: Usuario = Depends(get_current_user),
     service: ExecucaoTesteService = Depends(get_execucao_service)
 ):
-    return await service.listar_tarefas_usuario(current_user.id, status, skip, limit)
+    pagina, proximo = await service.listar_tarefas_usuario(current_user.id, status, skip, limit, view, cursor)
+    if proximo:
+        response.headers["X-Next-Cursor"] = proximo
+    return pagina
 
-@router.get("/execucoes/{execucao_id}", response_model=ExecucaoTesteResponse)
+@router.get(
+    "/execucoes/{execucao_id}",
+    response_model=None,
+    responses={200: {"model": Union[ExecucaoTesteResponse, ExecucaoTesteResumo, ExecucaoTesteCompleta]}}
+)
 async def obter_execucao(
     execucao_id: int,
+    view: Optional[VisaoExecucao] = Query(None, description="summary: só colunas; full: passos do caso uma única vez"),
     service: ExecucaoTesteService = Depends(get_execucao_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    execucao = await service.obter_execucao(execucao_id)
+    execucao = await service.obter_execucao(execucao_id, view)
     if not execucao:
         raise HTTPException(status_code=404, detail="Execução de teste não encontrada")
     return execucao
     
+@router.post(
+    "/fila/reservar",
+    response_model=ExecucaoTesteResponse,
+    responses={204: {"description": "Nenhuma execução livre na fila"}}
+)
+async def reservar_proxima_execucao(
+    ciclo_id: Optional[int] = None,
+    projeto_id: Optional[int] = None,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    execucao = await service.reservar_proxima(current_user.id, ciclo_id, projeto_id)
+    if not execucao:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return execucao
+
+@router.put("/execucoes/{execucao_id}/reserva", response_model=ReservaExecucaoResponse)
+async def renovar_reserva(
+    execucao_id: int,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.renovar_reserva(execucao_id, current_user.id)
+
+@router.delete("/execucoes/{execucao_id}/reserva", status_code=status.HTTP_204_NO_CONTENT)
+async def liberar_reserva(
+    execucao_id: int,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    await service.liberar_reserva(execucao_id, current_user.id)
+
 @router.put("/execucoes/passos/{passo_id}", response_model=ExecucaoPassoResponse)
 async def registrar_passo(
     passo_id: int,
@@ -167,38 +267,115 @@ async def registrar_passo(
 ):
     return await service.registrar_resultado_passo(passo_id, dados)
 
+@router.put("/execucoes/passos/{passo_id}/autosave", response_model=AutosavePassoResponse, status_code=status.HTTP_202_ACCEPTED)
+async def autosave_passo(
+    passo_id: int,
+    dados: AutosavePasso,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # Só o texto, gravado em lote pelo buffer do worker; status continua no PUT do passo
+    return await service.agendar_autosave(passo_id, dados)
+
+@router.put("/execucoes/{execucao_id}/passos", response_model=ExecucaoPassosLoteResponse)
+async def registrar_passos_lote(
+    execucao_id: int,
+    dados: ExecucaoPassosLote,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.registrar_resultados_passos(execucao_id, dados)
+
+@router.post("/sincronizacao", response_model=SincronizacaoResponse)
+async def sincronizar_jornal(
+    dados: JornalSincronizacao,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # Jornal offline do runner: reenviar é seguro, operações já sincronizadas não são reaplicadas
+    return await service.sincronizar_jornal(current_user.id, dados)
+
 @router.put("/execucoes/{execucao_id}/finalizar")
 async def finalizar_execucao_manual(
     execucao_id: int,
     status: StatusExecucaoEnum,
+    versao: Optional[int] = Query(None, description="Versão lida da execução; desatualizada, responde 409"),
     service: ExecucaoTesteService = Depends(get_execucao_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    execucao = await service.finalizar_execucao(execucao_id, status_final=status)
+    execucao = await service.finalizar_execucao(execucao_id, status_final=status, versao=versao)
     
     if not execucao:
         raise HTTPException(status_code=404, detail="Execução não encontrada")
         
-    return {"message": "Execução atualizada", "status": status}
+    return {"message": "Execução atualizada", "status": status, "versao": execucao.versao}
 
-@router.post("/passos/{passo_id}/evidencia") 
+@router.post("/passos/{passo_id}/evidencia", response_model=EvidenciaUploadResponse) 
 async def upload_evidencia_passo(
     passo_id: int,
     file: UploadFile = File(...),
     service: ExecucaoTesteService = Depends(get_execucao_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.upload_evidencia(passo_id, file)
+    return await service.upload_evidencia(passo_id, blocos_upload(file), file.content_type, file.size)
 
-@router.get("/evidencias/download/{filename}")
-async def download_evidencia(filename: str):
-    file_path = f"evidencias/{filename}"
+@router.put("/passos/{passo_id}/evidencia", response_model=EvidenciaUploadResponse)
+async def upload_evidencia_passo_stream(
+    passo_id: int,
+    request: Request,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # Corpo cru com o Content-Type do arquivo: gravado enquanto chega, sem o spool do multipart.
+    # Com X-Content-SHA256 de um blob já existente o corpo nem é lido.
+    tamanho = request.headers.get("content-length")
+    return await service.upload_evidencia(
+        passo_id,
+        request.stream(),
+        request.headers.get("content-type"),
+        int(tamanho) if tamanho and tamanho.isdigit() else None,
+        request.headers.get("x-content-sha256")
+    )
 
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
-    
-    return FileResponse(
-        path=file_path, 
-        filename=filename, 
-        media_type='application/octet-stream' 
-    )
\ No newline at end of file
+@router.post("/evidencias/uploads", response_model=EvidenciaUploadDiretoResponse)
+async def iniciar_upload_direto_evidencia(
+    dados: EvidenciaUploadDiretoCreate,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # Upload direto: a API só emite a URL de curta duração; o arquivo vai direto para o armazenamento
+    return await service.iniciar_upload_direto(dados)
+
+@router.post("/evidencias/uploads/concluir", response_model=EvidenciaUploadResponse)
+async def concluir_upload_direto_evidencia(
+    dados: EvidenciaUploadDiretoConcluir,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.concluir_upload_direto(dados)
+
+@router.get("/evidencias/blobs/{sha256}", response_model=EvidenciaUploadResponse)
+async def obter_evidencia_por_hash(
+    sha256: str,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # Anexo por hash: 200 com a URL do blob existente, 404 se for preciso enviar o arquivo
+    return await service.obter_evidencia(sha256)
+
+@router.get("/evidencias/previews/{sha256}/{variante}")
+async def obter_preview_evidencia(
+    sha256: str,
+    variante: str,
+    request: Request,
+    service: ExecucaoTesteService = Depends(get_execucao_service)
+):
+    # Sem autenticação, como o download: a URL vai direto no <img> da galeria.
+    # A variante de um hash nunca muda, então o navegador/CDN pode guardá-la para sempre.
+    caminho = await service.obter_preview(sha256, variante)
+    return await responder_evidencia(request, caminho, media_type="image/webp")
+
+@router.api_route("/evidencias/download/{caminho:path}", methods=["GET", "HEAD"])
+async def download_evidencia(caminho: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # Só arquivos guardados no armazenamento; Range (206) e 304 para vídeos e re-downloads
+    return await responder_evidencia(request, caminho, nome_download=os.path.basename(caminho), db=db)
\ No newline at end of file
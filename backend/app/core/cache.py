@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class CacheTTL:
+    """
+    Cache em memória do processo (um por worker), com expiração por TTL,
+    limite de itens (LRU) e contadores de acerto/erro para monitoramento.
+
+    A invalidação entre workers é feita por fora (ver app.core.eventos):
+    quem recebe o evento chama `invalidar`.
+    """
+
+    def __init__(self, ttl_segundos: float, max_itens: int = 512):
+        self.ttl = ttl_segundos
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._travas: Dict[Hashable, asyncio.Lock] = {}
+        # Incrementada a cada invalidação: um cálculo iniciado antes dela não é guardado
+        self._geracao = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def _obter(self, chave: Hashable):
+        item = self._itens.get(chave)
+        if item is None:
+            return False, None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            return False, None
+        self._itens.move_to_end(chave)
+        return True, valor
+
+    def _guardar(self, chave: Hashable, valor: Any):
+        self._itens[chave] = (time.monotonic() + self.ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    async def obter_ou_calcular(self, chave: Hashable, calcular: Callable[[], Awaitable[Any]]) -> Any:
+        encontrado, valor = self._obter(chave)
+        if encontrado:
+            self.hits += 1
+            return valor
+
+        # Uma única requisição recalcula a chave; as demais aguardam o resultado
+        trava = self._travas.setdefault(chave, asyncio.Lock())
+        async with trava:
+            encontrado, valor = self._obter(chave)
+            if encontrado:
+                self.hits += 1
+                return valor
+
+            self.misses += 1
+            geracao = self._geracao
+            valor = await calcular()
+            if geracao == self._geracao:
+                self._guardar(chave, valor)
+            return valor
+
+    def invalidar(self, predicado: Callable[[Hashable], bool]):
+        self._geracao += 1
+        self.invalidacoes += 1
+        for chave in [c for c in self._itens if predicado(c)]:
+            del self._itens[chave]
+
+    def limpar(self):
+        self._geracao += 1
+        self.invalidacoes += 1
+        self._itens.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total * 100, 1) if total else 0.0,
+            "itens": len(self._itens),
+            "invalidacoes": self.invalidacoes,
+            "ttl_segundos": self.ttl,
+        }
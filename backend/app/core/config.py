@@ -49,4 +49,65 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Projeto GE"
     API_V1_STR: str = "/api/v1"
 
+    # Dashboard: lê execuções/defeitos das tabelas de rollup (False = recontagem completa)
+    DASHBOARD_USAR_ROLLUPS: bool = True
+
+    # Dashboard geral servido de views materializadas (leitura de uma linha; dados com o atraso
+    # do último refresh, informado em "as_of"). Tem precedência sobre DASHBOARD_USAR_ROLLUPS.
+    DASHBOARD_USAR_MATVIEWS: bool = False
+    DASHBOARD_MATVIEWS_INTERVALO_SEGUNDOS: float = 60
+    # Após escritas o refresh é antecipado, mas nunca com menos que isto entre dois refreshes
+    DASHBOARD_MATVIEWS_INTERVALO_MINIMO_SEGUNDOS: float = 5
+
+    # Cache dos dashboards (por worker); invalidado via LISTEN/NOTIFY, o TTL é só a rede de segurança
+    DASHBOARD_CACHE_TTL_SEGUNDOS: float = 30
+    DASHBOARD_CACHE_MAX_ITENS: int = 512
+
+    # Máximo de consultas simultâneas (conexões do pool) que um único dashboard pode usar
+    DASHBOARD_FANOUT_MAX: int = 4
+    # Teto de conexões extras de todos os fan-outs do worker (None = metade do pool); acima dele
+    # as consultas rodam em sequência na sessão da própria requisição
+    DASHBOARD_FANOUT_CONEXOES: int | None = None
+
+    # Stream SSE dos dashboards: no máximo um push por intervalo por escopo; heartbeat para manter a conexão
+    DASHBOARD_STREAM_INTERVALO_SEGUNDOS: float = 1.0
+    DASHBOARD_STREAM_HEARTBEAT_SEGUNDOS: float = 15.0
+
+    # Fila de execuções: duração da reserva dada a um runner; renovada a cada gravação de passo
+    RESERVA_DURACAO_MINUTOS: int = 15
+
+    # Autosave dos passos (write-behind): textos ficam no buffer do worker e são gravados em lote
+    AUTOSAVE_INTERVALO_MS: int = 500
+    # Com tantos passos pendentes o buffer é descarregado sem esperar o intervalo
+    AUTOSAVE_MAX_PENDENTES: int = 2000
+
+    # Endereço público da API, base das URLs devolvidas (evidências)
+    PUBLIC_BASE_URL: str = "http://localhost:8000"
+
+    # Upload de evidências: gravado em blocos fora do event loop, com limite de tamanho e de tipo
+    EVIDENCIAS_DIR: str = "evidencias"
+    EVIDENCIA_MAX_BYTES: int = 100 * 1024 * 1024
+    EVIDENCIA_BLOCO_BYTES: int = 1024 * 1024
+    EVIDENCIA_TIPOS_PERMITIDOS: list[str] = [
+        "image/png", "image/jpeg", "image/gif", "image/webp",
+        "video/mp4", "video/webm", "video/quicktime",
+        "application/pdf", "text/plain",
+    ]
+    # Miniaturas/prévias das evidências de imagem: processos do pool que as gera (fora dos workers da API)
+    PREVIEW_PROCESSOS: int = 2
+    # Imagem com mais pixels que isto não ganha prévia (bomba de descompressão derrubaria o processo do pool)
+    PREVIEW_MAX_PIXELS: int = 50_000_000
+
+    # Onde ficam os blobs de evidência: "local" (EVIDENCIAS_DIR, servido pela API) ou "s3".
+    # EVIDENCIAS_DIR continua recebendo os temporários dos uploads que passam pela API.
+    EVIDENCIAS_ARMAZENAMENTO: str = "local"
+    # Validade das URLs de upload/download direto
+    EVIDENCIA_URL_EXPIRA_SEGUNDOS: int = 300
+    S3_BUCKET: str | None = None
+    S3_PREFIXO: str = "evidencias/"
+    S3_ENDPOINT_URL: str | None = None # MinIO/compatível; vazio = AWS
+    S3_REGIAO: str | None = None
+    S3_ACCESS_KEY: str | None = None
+    S3_SECRET_KEY: str | None = None
+
 settings = Settings()
\ No newline at end of file
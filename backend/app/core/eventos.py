@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import Integer, Text, case, cast, func, literal, null, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.core.config import settings
+from app.models.projeto import Projeto
+from app.models.testing import CasoTeste, ExecucaoTeste
+from app.models.versao_escopo import VersaoEscopo
+
+logger = logging.getLogger(__name__)
+
+# Canal Postgres usado para avisar todos os workers de que dados do dashboard mudaram.
+# Payload: {"sistemas": [ids], "usuarios": [ids]}, {"tudo": true} ou, após um refresh
+# das views materializadas, {"materializado": true}
+CANAL_ALTERACOES = "ge_alteracoes"
+
+# Versão (ETag) do dashboard servido pelas views materializadas: muda só no refresh
+ESCOPO_DASHBOARD_MATERIALIZADO = "dashboard:materializado"
+
+# O NOTIFY aceita até 8000 bytes de payload; acima disso avisamos "tudo"
+_LIMITE_PAYLOAD = 7000
+
+def escopo_execucoes(filtro: ColumnElement, usuario_id: Optional[int] = None) -> Select:
+    """
+    Sistemas, projetos e responsáveis das execuções que casam com o filtro.
+    Com `usuario_id`, avisa esse usuário no lugar do responsável atual.
+    """
+    usuario = ExecucaoTeste.responsavel_id if usuario_id is None else literal(usuario_id, Integer)
+    return (
+        select(
+            Projeto.sistema_id.label("sistema_id"),
+            usuario.label("usuario_id"),
+            Projeto.id.label("projeto_id")
+        )
+        .select_from(ExecucaoTeste)
+        .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+        .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+        .where(filtro)
+    )
+
+def escopo_projetos(filtro: ColumnElement) -> Select:
+    """Sistemas dos projetos que casam com o filtro (cadastros: projetos, ciclos, casos)."""
+    return select(
+        Projeto.sistema_id.label("sistema_id"),
+        null().label("usuario_id"),
+        Projeto.id.label("projeto_id")
+    ).where(filtro)
+
+async def publicar_alteracao(db: AsyncSession, escopo: Select, versionar: bool = True):
+    """
+    Incrementa as versões dos escopos afetados ("sistema:<id>", "projeto:<id>",
+    usadas no ETag) e enfileira um NOTIFY com os sistemas/usuários afetados.
+
+    O Postgres só entrega a notificação no COMMIT (e descarta no rollback), e
+    as versões seguem a mesma transação; então deve ser chamado dentro da
+    transação da escrita e, em remoções, antes do DELETE. As linhas de versão
+    ficam travadas até o commit: chame perto do fim da transação.
+
+    `versionar=False` só avisa (caches e streams por usuário), sem tocar nas
+    linhas de versão: para escritas frequentes que não mudam nada servido com
+    ETag, como reservas da fila, que assim não se enfileiram na linha do sistema.
+    """
+    if db.bind is not None and db.bind.dialect.name != "postgresql":
+        return
+
+    alvo = escopo.cte("alvo")
+
+    chaves = union(
+        select((literal("sistema:") + cast(alvo.c.sistema_id, Text)).label("chave"))
+        .where(alvo.c.sistema_id.isnot(None)),
+        select((literal("projeto:") + cast(alvo.c.projeto_id, Text)).label("chave"))
+        .where(alvo.c.projeto_id.isnot(None)),
+    ).subquery("chaves")
+    versoes = pg_insert(VersaoEscopo).from_select(
+        ["escopo", "versao", "atualizado_em"],
+        # Ordem fixa das chaves evita deadlock entre escritas concorrentes
+        select(chaves.c.chave, literal(1), func.now()).order_by(chaves.c.chave)
+    )
+    versoes = versoes.on_conflict_do_update(
+        index_elements=["escopo"],
+        set_={"versao": VersaoEscopo.versao + 1, "atualizado_em": func.now()}
+    ).returning(VersaoEscopo.escopo).cte("versoes")
+
+    evento = (
+        select(
+            cast(
+                func.json_build_object(
+                    "sistemas", func.array_remove(func.array_agg(alvo.c.sistema_id.distinct()), None),
+                    "usuarios", func.array_remove(func.array_agg(alvo.c.usuario_id.distinct()), None),
+                ),
+                Text
+            ).label("payload")
+        )
+        .select_from(alvo)
+        .having(func.count() > 0)
+        .subquery("evento")
+    )
+
+    stmt = select(
+        func.pg_notify(
+            CANAL_ALTERACOES,
+            case(
+                (func.length(evento.c.payload) > _LIMITE_PAYLOAD, literal('{"tudo": true}')),
+                else_=evento.c.payload
+            )
+        )
+    )
+    if versionar:
+        stmt = stmt.add_cte(versoes)
+    await db.execute(stmt)
+
+async def publicar_views_atualizadas(db: AsyncSession):
+    """
+    Chamado na transação do refresh das views materializadas: incrementa a versão
+    ESCOPO_DASHBOARD_MATERIALIZADO e avisa os workers ({"materializado": true}).
+    """
+    versao = pg_insert(VersaoEscopo).values(
+        escopo=ESCOPO_DASHBOARD_MATERIALIZADO, versao=1, atualizado_em=func.now()
+    )
+    versao = versao.on_conflict_do_update(
+        index_elements=["escopo"],
+        set_={"versao": VersaoEscopo.versao + 1, "atualizado_em": func.now()}
+    )
+    await db.execute(versao)
+    await db.execute(select(func.pg_notify(CANAL_ALTERACOES, json.dumps({"materializado": True}))))
+
+class OuvinteAlteracoes:
+    """
+    Mantém um LISTEN no canal de alterações (uma conexão dedicada por worker)
+    e repassa cada evento para os callbacks registrados (ex.: invalidar cache).
+    Reconecta sozinho; ao (re)conectar dispara {"tudo": true}, pois eventos
+    podem ter sido perdidos enquanto estava desconectado.
+    """
+
+    def __init__(self, canal: str = CANAL_ALTERACOES):
+        self.canal = canal
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self._engine: Optional[AsyncEngine] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def registrar(self, callback: Callable[[Dict[str, Any]], None]):
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+
+    def despachar(self, evento: Dict[str, Any]):
+        for callback in self._callbacks:
+            try:
+                callback(evento)
+            except Exception:
+                logger.exception("Erro ao processar evento de alteração")
+
+    def _ao_notificar(self, conexao, pid, canal, payload: str):
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            evento = {"tudo": True}
+        self.despachar(evento)
+
+    async def iniciar(self):
+        if not settings.ASYNC_DATABASE_URL.startswith("postgresql"):
+            logger.info("LISTEN/NOTIFY indisponível para este banco; caches dependem apenas do TTL.")
+            return
+        # Fora do pool da aplicação: esta conexão fica presa no LISTEN
+        self._engine = create_async_engine(settings.ASYNC_DATABASE_URL, poolclass=NullPool)
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        if self._engine:
+            await self._engine.dispose()
+            self._engine = None
+
+    async def _executar(self):
+        while True:
+            try:
+                async with self._engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+
+                    perdida = asyncio.Event()
+                    driver.add_termination_listener(lambda c: perdida.set())
+                    await driver.add_listener(self.canal, self._ao_notificar)
+                    logger.info("Escutando alterações no canal %s", self.canal)
+
+                    self.despachar({"tudo": True})
+                    while not perdida.is_set():
+                        try:
+                            await asyncio.wait_for(perdida.wait(), timeout=30)
+                        except asyncio.TimeoutError:
+                            # Sem tráfego a queda da conexão passaria despercebida
+                            await driver.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Conexão LISTEN perdida (%s); tentando novamente em 5s", e)
+            await asyncio.sleep(5)
+
+ouvinte_alteracoes = OuvinteAlteracoes()
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+Consulta = Callable[[AsyncSession], Awaitable[Any]]
+
+# Conexões extras em uso por todos os fan-outs do processo, por pool. A sessão
+# da requisição já segura uma conexão; sem este teto, uns 15 dashboards
+# simultâneos (pool padrão 5+10) esgotam o pool e todos esperam o checkout.
+_semaforos: Dict[int, asyncio.Semaphore] = {}
+
+def _semaforo_pool(sessao: AsyncSession) -> asyncio.Semaphore:
+    pool = sessao.bind.sync_engine.pool
+    semaforo = _semaforos.get(id(pool))
+    if semaforo is None:
+        limite = settings.DASHBOARD_FANOUT_CONEXOES
+        if limite is None:
+            # Metade do pool (incluindo overflow) fica para as sessões das requisições
+            tamanho = getattr(pool, "size", lambda: 5)() + max(getattr(pool, "_max_overflow", 0), 0)
+            limite = max(1, tamanho // 2)
+        semaforo = _semaforos[id(pool)] = asyncio.Semaphore(limite)
+    return semaforo
+
+class ConsultasParalelas:
+    """
+    Executa consultas de leitura independentes ao mesmo tempo, cada uma na sua
+    própria sessão (e portanto conexão do pool), e devolve os resultados na
+    ordem em que foram passadas.
+
+    O número de consultas simultâneas por requisição é limitado por
+    `DASHBOARD_FANOUT_MAX`, e o total de conexões extras do processo por
+    `DASHBOARD_FANOUT_CONEXOES` (padrão: metade do pool). Com o teto do
+    processo esgotado, a consulta não espera conexão: roda na sessão da
+    requisição, uma de cada vez, como sem fan-out.
+    Se o banco não for Postgres (ex.: SQLite em memória, onde cada conexão é
+    um banco diferente) as consultas rodam em sequência na sessão da requisição.
+
+    Uso:
+        kpis, dist = await ConsultasParalelas(db).executar(
+            lambda s: DashboardRepository(s).get_runner_kpis(runner_id),
+            lambda s: DashboardRepository(s).get_status_distribution(runner_id),
+        )
+    """
+
+    def __init__(self, db: AsyncSession, limite: Optional[int] = None):
+        self.db = db
+        self.limite = limite or settings.DASHBOARD_FANOUT_MAX
+
+    def _paralelo_disponivel(self) -> bool:
+        return self.db.bind is not None and self.db.bind.dialect.name == "postgresql"
+
+    async def executar(self, *consultas: Consulta) -> List[Any]:
+        if len(consultas) <= 1 or not self._paralelo_disponivel():
+            return [await consulta(self.db) for consulta in consultas]
+
+        semaforo = asyncio.Semaphore(self.limite)
+        conexoes = _semaforo_pool(self.db)
+        trava_sessao = asyncio.Lock()
+
+        async def rodar(consulta: Consulta):
+            async with semaforo:
+                # locked() + acquire() sem ponto de espera entre os dois: nunca bloqueia aqui
+                if conexoes.locked():
+                    async with trava_sessao:
+                        return await consulta(self.db)
+                await conexoes.acquire()
+                try:
+                    async with AsyncSessionLocal() as sessao:
+                        return await consulta(sessao)
+                finally:
+                    conexoes.release()
+
+        # TaskGroup cancela as demais consultas se uma delas falhar
+        try:
+            async with asyncio.TaskGroup() as grupo:
+                tarefas = [grupo.create_task(rodar(consulta)) for consulta in consultas]
+        except ExceptionGroup as erros:
+            raise erros.exceptions[0]
+        return [tarefa.result() for tarefa in tarefas]
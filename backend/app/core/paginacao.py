@@ -0,0 +1,19 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Cursor opaco de paginação keyset: (updated_at, id) do último item da página
+
+def codificar_cursor(updated_at: datetime, id: int) -> str:
+    bruto = json.dumps([updated_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Levanta ValueError se o cursor não veio de codificar_cursor."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        momento, id = json.loads(bruto)
+        return datetime.fromisoformat(momento), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
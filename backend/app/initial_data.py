@@ -9,6 +9,7 @@ from app.seeds.projetos import seed_projetos
 from app.seeds.ciclos import seed_ciclos
 from app.seeds.casos import seed_casos
 from app.seeds.execucoes import seed_execucoes
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
 
 async def seed_db():
     async with AsyncSessionLocal() as session:
@@ -35,6 +36,9 @@ async def seed_db():
 
             await seed_execucoes(session)
 
+            # Seeds inserem direto pela sessão: os rollups do dashboard são recalculados no final
+            await DashboardRollupRepository(session).recalcular()
+
             # Final commit for all changes
             await session.commit()
             print("--- Seed Completed Successfully! ---")
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.services.armazenamento import armazenamento
+from app.services.previews import VARIANTES, caminho_preview
+
+async def apagar_arquivos(caminhos):
+    for caminho in caminhos:
+        # O nome do blob começa pelo hash; as prévias dele vão junto
+        sha256 = os.path.basename(caminho)[:64]
+        for arquivo in [caminho] + [caminho_preview(sha256, variante) for variante in VARIANTES]:
+            await armazenamento.remover(arquivo)
+
+def apagar_parciais(carencia: timedelta) -> int:
+    """Temporários locais de uploads interrompidos (worker derrubado no meio), com qualquer armazenamento."""
+    limite = time.time() - carencia.total_seconds()
+    apagados = 0
+    for entrada in os.scandir(settings.EVIDENCIAS_DIR):
+        if entrada.name.startswith(".parcial-") and entrada.stat().st_mtime < limite:
+            os.remove(entrada.path)
+            apagados += 1
+    return apagados
+
+async def limpar_evidencias(carencia: timedelta, recontar: bool, lote: int):
+    async with AsyncSessionLocal() as session:
+        repo = EvidenciaRepository(session)
+        try:
+            if recontar:
+                print("--- Recontando referências dos blobs ---")
+                print(f"--- {await repo.recontar()} blobs corrigidos ---")
+
+            total = 0
+            while True:
+                # Cadastro primeiro (commit), arquivo depois: nunca sobra URL para arquivo apagado
+                caminhos = await repo.coletar_orfaos(carencia, lote)
+                await apagar_arquivos(caminhos)
+                total += len(caminhos)
+                if len(caminhos) < lote:
+                    break
+            print(f"--- {total} blobs sem referência removidos ---")
+            print(f"--- {await asyncio.to_thread(apagar_parciais, carencia)} uploads interrompidos removidos ---")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"Erro ao limpar as evidências: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove blobs de evidência sem referências (coletor de lixo).")
+    parser.add_argument("--carencia-horas", type=float, default=24, help="tempo mínimo sem uso antes de remover")
+    parser.add_argument("--recontar", action="store_true", help="recalcula as referências antes de coletar")
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(limpar_evidencias(timedelta(hours=args.carencia_horas), args.recontar, args.lote))
+    except Exception as e:
+        print(f"Execution Error: {e}")
+        sys.exit(1)
@@ -1,13 +1,20 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.core.database import Base, engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import Base, engine, get_db
 from app.api.v1.api import api_router
+from app.core.eventos import ouvinte_alteracoes
+from app.api.arquivos import responder_evidencia, receber_upload_assinado
+from app.services.dashboard_service import invalidar_cache_dashboard
+from app.services.dashboard_stream import hub_dashboard
+from app.services.dashboard_views import atualizador_views
+from app.services.autosave_passos import buffer_autosave
+from app.services.previews import gerador_previews
 import os
 
-os.makedirs("evidencias", exist_ok=True)
+os.makedirs(settings.EVIDENCIAS_DIR, exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,7 +24,24 @@ async def lifespan(app: FastAPI):
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    # Invalida o cache dos dashboards quando qualquer worker grava algo
+    ouvinte_alteracoes.registrar(invalidar_cache_dashboard)
+    # Depois do cache: os streams recalculam já com as entradas antigas descartadas
+    ouvinte_alteracoes.registrar(hub_dashboard.ao_alterar)
+    # Escritas antecipam o refresh das views materializadas (se o modo estiver ativo)
+    ouvinte_alteracoes.registrar(atualizador_views.ao_alterar)
+    await ouvinte_alteracoes.iniciar()
+    atualizador_views.iniciar()
+    buffer_autosave.iniciar()
+    gerador_previews.iniciar()
     yield
+    # Antes de fechar o engine: o que ainda está no buffer é gravado
+    await buffer_autosave.parar()
+    await gerador_previews.parar()
+    await atualizador_views.parar()
+    await hub_dashboard.parar()
+    await ouvinte_alteracoes.parar()
     await engine.dispose()
 
 app = FastAPI(
@@ -33,11 +57,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "Content-Range", "Accept-Ranges"],
 )
 
-app.mount("/evidencias", StaticFiles(directory="evidencias"), name="evidencias")
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.api_route("/evidencias/{caminho:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def servir_evidencia(caminho: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # URLs devolvidas no upload (exibição inline): Range para o <video> buscar, 304 na revisita.
+    # Com armazenamento S3, redireciona para uma URL pré-assinada.
+    return await responder_evidencia(request, caminho, db=db)
+
+@app.put("/evidencias/{caminho:path}", include_in_schema=False)
+async def receber_evidencia_direta(caminho: str, request: Request):
+    # Destino das URLs de upload direto do armazenamento local (assinadas; sem login)
+    return await receber_upload_assinado(request, caminho)
+
 @app.get("/", summary="Endpoint raiz da API")
 def read_root():
     return {"message": "Backend conectado ao banco de dados gerenciado pelo Docker!"}
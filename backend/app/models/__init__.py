@@ -3,6 +3,9 @@ from .usuario import Usuario
 from .sistema import Sistema
 from .modulo import Modulo
 from .projeto import Projeto
-from .testing import (CasoTeste, CicloTeste, PassoCasoTeste, ExecucaoTeste, ExecucaoPasso, StatusExecucaoEnum, StatusPassoEnum)
+from .testing import (CasoTeste, CicloTeste, PassoCasoTeste, ExecucaoTeste, ExecucaoPasso, StatusExecucaoEnum, StatusPassoEnum, HistoricoStatusExecucao, OperacaoSincronizada)
 from .metrica import Metrica
-from .password_reset import PasswordReset
\ No newline at end of file
+from .password_reset import PasswordReset
+from .dashboard_rollup import RollupExecucao, RollupDefeito, FatoExecucaoDiaria
+from .versao_escopo import VersaoEscopo
+from .evidencia_blob import EvidenciaBlob
\ No newline at end of file
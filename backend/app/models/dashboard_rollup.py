@@ -0,0 +1,73 @@
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Date, UniqueConstraint, Index, MetaData, Table, DateTime
+from sqlalchemy.types import JSON
+from app.core.database import Base
+from app.models.testing import StatusExecucaoEnum, StatusDefeitoEnum, SeveridadeDefeitoEnum
+
+# Contadores pré-agregados do dashboard, mantidos pelos repositórios na mesma
+# transação das escritas. Recalculáveis do zero com `python -m app.rebuild_rollups`.
+
+class RollupExecucao(Base):
+    __tablename__ = "rollup_execucoes"
+
+    sistema_id = Column(Integer, ForeignKey("sistemas.id", ondelete="CASCADE"), primary_key=True)
+    modulo_id = Column(Integer, ForeignKey("modulos.id", ondelete="CASCADE"), primary_key=True)
+    projeto_id = Column(Integer, ForeignKey("projetos.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+
+class RollupDefeito(Base):
+    __tablename__ = "rollup_defeitos"
+
+    sistema_id = Column(Integer, ForeignKey("sistemas.id", ondelete="CASCADE"), primary_key=True)
+    modulo_id = Column(Integer, ForeignKey("modulos.id", ondelete="CASCADE"), primary_key=True)
+    projeto_id = Column(Integer, ForeignKey("projetos.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(StatusDefeitoEnum, name='status_defeito_enum', create_type=False), primary_key=True)
+    severidade = Column(Enum(SeveridadeDefeitoEnum, name='severidade_defeito_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+
+class FatoExecucaoDiaria(Base):
+    """
+    Conclusões de execução por dia (append-only): cada transição de um status não
+    final para fechado/falha/bloqueado soma 1 no dia em que aconteceu. Edições
+    posteriores da execução não movem a contagem para outro dia.
+    """
+    __tablename__ = "fato_execucoes_diarias"
+    __table_args__ = (
+        # Sem responsável (NULL) não há conflito: a linha é apenas acrescentada, e o SUM continua correto
+        UniqueConstraint("dia", "responsavel_id", "projeto_id", "status", name="uq_fato_execucoes_diarias_chave"),
+        Index("ix_fato_execucoes_diarias_responsavel_dia", "responsavel_id", "dia"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    dia = Column(Date, nullable=False)
+    responsavel_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+    projeto_id = Column(Integer, ForeignKey("projetos.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), nullable=False)
+
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+
+# Views materializadas do dashboard (modo DASHBOARD_USAR_MATVIEWS). Criadas pela
+# migration e atualizadas com REFRESH ... CONCURRENTLY; ficam fora do Base.metadata
+# para o create_all e o autogenerate não as tratarem como tabelas.
+metadata_views = MetaData()
+
+# Uma linha por sistema (escopo = sistema_id) e uma com o total geral (escopo = 0),
+# com as mesmas colunas que DashboardRepository._montar_snapshot espera.
+mv_dashboard_sistema = Table(
+    "mv_dashboard_sistema",
+    metadata_views,
+    Column("escopo", Integer, primary_key=True),
+    Column("total_projetos", Integer),
+    Column("total_ciclos_ativos", Integer),
+    Column("total_casos_teste", Integer),
+    *[Column(f"exec_{s.value}", Integer) for s in StatusExecucaoEnum],
+    Column("total_defeitos_abertos", Integer),
+    Column("total_defeitos_criticos", Integer),
+    Column("total_aguardando_reteste", Integer),
+    *[Column(f"sev_{sev.value}", Integer) for sev in SeveridadeDefeitoEnum],
+    # [[nome do módulo, total de defeitos], ...] — os 5 primeiros
+    Column("top_modulos", JSON),
+    Column("atualizado_em", DateTime(timezone=True)),
+)
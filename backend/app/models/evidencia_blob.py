@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index, text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class EvidenciaBlob(Base):
+    """
+    Arquivo de evidência endereçado pelo conteúdo: um por SHA-256, gravado no
+    armazenamento (disco local ou S3) em blobs/ab/cd/<sha256><ext>. `referencias` conta os passos de
+    execução e defeitos cujas evidências apontam para ele; sem referências e
+    sem uso há mais que a carência, o blob é removido por app.limpar_evidencias.
+    """
+    __tablename__ = "evidencias_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    caminho = Column(String(255), nullable=False) # relativo ao armazenamento
+    content_type = Column(String(100), nullable=False)
+    tamanho = Column(BigInteger, nullable=False)
+    referencias = Column(Integer, nullable=False, default=0, server_default="0")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Upload repetido ou consulta por hash: o blob ainda vai ser anexado, o coletor espera a carência
+    ultimo_uso_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Coletor: só os candidatos (sem referências), na ordem de uso
+        Index("ix_evidencias_blobs_orfaos", "ultimo_uso_em", postgresql_where=text("referencias <= 0")),
+    )
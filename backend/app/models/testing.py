@@ -1,5 +1,6 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -18,12 +19,23 @@ class StatusExecucaoEnum(str, enum.Enum):
     bloqueado = "bloqueado" 
     falha = "falha"  
 
+# Status em que a execução é considerada concluída (velocidade, ranking, fato diário)
+STATUS_FINAIS = (StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado)
+
 class StatusPassoEnum(str, enum.Enum):
     pendente = "pendente"
     aprovado = "aprovado"
     reprovado = "reprovado"
     bloqueado = "bloqueado"
 
+# Coluna de ExecucaoTeste que conta os passos em cada status (passo sem status conta como pendente)
+CONTADORES_PASSOS = {
+    StatusPassoEnum.pendente: "passos_pendentes",
+    StatusPassoEnum.aprovado: "passos_aprovados",
+    StatusPassoEnum.reprovado: "passos_reprovados",
+    StatusPassoEnum.bloqueado: "passos_bloqueados",
+}
+
 class StatusCicloEnum(str, enum.Enum):
     planejado = "planejado"
     em_execucao = "em_execucao"
@@ -87,6 +99,15 @@ class CicloTeste(Base):
         if not self.execucoes:
             return 0
         return sum(1 for e in self.execucoes if e.status_geral == StatusExecucaoEnum.fechado)
+
+    # Progresso dos passos somando os contadores das execuções (sem carregar os passos)
+    @property
+    def passos_total(self):
+        return sum(e.passos_total for e in self.execucoes or [])
+
+    @property
+    def passos_concluidos(self):
+        return sum(e.passos_total - (e.passos_pendentes or 0) for e in self.execucoes or [])
     
 class CasoTeste(Base):
     __tablename__ = "casos_teste"
@@ -150,15 +171,45 @@ class ExecucaoTeste(Base):
     
     status_geral = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), default=StatusExecucaoEnum.pendente)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Passos por status (CONTADORES_PASSOS), mantidos pelo repositório a cada gravação de passo
+    passos_pendentes = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_aprovados = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_reprovados = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_bloqueados = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Reserva (lease) da fila de execuções; vencida, a execução volta a ficar livre
+    reservado_por_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+    reservado_ate = Column(DateTime(timezone=True), nullable=True)
+    # Responsável veio da própria reserva (não de atribuição): volta para a fila com ela
+    responsavel_pela_fila = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    # Concorrência otimista: sobe a cada mudança de status ou responsável
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
 
     ciclo = relationship("CicloTeste", back_populates="execucoes")
     caso_teste = relationship("CasoTeste", back_populates="execucoes")
-    responsavel = relationship("Usuario", back_populates="execucoes_atribuidas")
+    responsavel = relationship("Usuario", back_populates="execucoes_atribuidas", foreign_keys=[responsavel_id])
     
     passos_executados = relationship("ExecucaoPasso", back_populates="execucao_pai", cascade="all, delete-orphan", order_by="ExecucaoPasso.id")
     defeitos = relationship("Defeito", back_populates="execucao", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # /minhas-tarefas (keyset): já na ordem da página, com e sem filtro de status
+        Index("ix_execucoes_teste_responsavel_status_updated", "responsavel_id", "status_geral", updated_at.desc(), id.desc()),
+        Index("ix_execucoes_teste_responsavel_updated", "responsavel_id", updated_at.desc(), id.desc()),
+        # Fila de reservas: só as execuções que ainda podem ser reservadas
+        Index(
+            "ix_execucoes_teste_fila", "ciclo_teste_id", "reservado_ate",
+            postgresql_where=text("status_geral IN ('pendente', 'reteste', 'em_progresso')")
+        ),
+    )
+
+    @property
+    def passos_total(self):
+        return (self.passos_pendentes or 0) + (self.passos_aprovados or 0) + (self.passos_reprovados or 0) + (self.passos_bloqueados or 0)
+
 class ExecucaoPasso(Base):
     __tablename__ = "execucoes_passos"
 
@@ -172,6 +223,9 @@ class ExecucaoPasso(Base):
     
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Concorrência otimista: sobe a cada gravação de status/resultado/evidências (o autosave não conta)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+
     execucao_pai = relationship("ExecucaoTeste", back_populates="passos_executados")
     passo_template = relationship("PassoCasoTeste", back_populates="execucoes_deste_passo")
 
@@ -190,4 +244,69 @@ class Defeito(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    execucao = relationship("ExecucaoTeste", back_populates="defeitos")
\ No newline at end of file
+    execucao = relationship("ExecucaoTeste", back_populates="defeitos")
+class HistoricoStatusExecucao(Base):
+    """
+    Log append-only das transições de ExecucaoTeste.status_geral.
+
+    Os ids de responsável/caso/ciclo/projeto/módulo são copiados no momento da
+    transição (sem FK) para que os agregados de duração não precisem de joins.
+    `duracao_segundos` só é preenchida nas transições para um status final e
+    mede desde a última entrada em em_progresso.
+    """
+    __tablename__ = "historico_status_execucao"
+
+    id = Column(BigInteger, primary_key=True)
+    execucao_teste_id = Column(Integer, ForeignKey("execucoes_teste.id", ondelete="CASCADE"), nullable=False)
+    status_anterior = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), nullable=True)
+    status_novo = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), nullable=False)
+    duracao_segundos = Column(Integer, nullable=True)
+
+    responsavel_id = Column(Integer, nullable=True)
+    caso_teste_id = Column(Integer, nullable=False)
+    ciclo_teste_id = Column(Integer, nullable=False)
+    projeto_id = Column(Integer, nullable=False)
+    modulo_id = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Busca do início da execução corrente (última entrada em em_progresso) e cascade de remoção
+        Index("ix_historico_status_execucao_execucao", "execucao_teste_id", "id"),
+        # Log cresce em ordem de tempo: BRIN é minúsculo e atende filtros por período
+        Index("ix_historico_status_execucao_created_brin", "created_at", postgresql_using="brin"),
+        # Agregados de duração: só as linhas de conclusão, com a duração no próprio índice
+        Index(
+            "ix_historico_duracao_responsavel", "responsavel_id", "created_at",
+            postgresql_include=["duracao_segundos"], postgresql_where=text("duracao_segundos IS NOT NULL")
+        ),
+        Index(
+            "ix_historico_duracao_caso", "caso_teste_id", "created_at",
+            postgresql_include=["duracao_segundos"], postgresql_where=text("duracao_segundos IS NOT NULL")
+        ),
+        Index(
+            "ix_historico_duracao_modulo", "modulo_id", "created_at",
+            postgresql_include=["duracao_segundos"], postgresql_where=text("duracao_segundos IS NOT NULL")
+        ),
+        Index(
+            "ix_historico_duracao_ciclo", "ciclo_teste_id", "created_at",
+            postgresql_include=["duracao_segundos"], postgresql_where=text("duracao_segundos IS NOT NULL")
+        ),
+    )
+
+class OperacaoSincronizada(Base):
+    """
+    Operações do jornal offline dos runners já processadas, pelo id gerado no
+    cliente. Reenviar o jornal (conexão caiu antes da resposta) não reaplica
+    nada: a operação devolve o resultado gravado da primeira vez.
+    """
+    __tablename__ = "operacoes_sincronizadas"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    op_id = Column(String(64), primary_key=True)
+    tipo = Column(String(20), nullable=False)
+    execucao_teste_id = Column(Integer, nullable=True) # sem FK: operação rejeitada pode citar execução inexistente
+    resultado = Column(String(20), nullable=False)
+    detalhe = Column(JSONB, nullable=True) # motivo e estado atual, para rejeição/conflito
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -20,4 +20,4 @@ class Usuario(Base):
 
     nivel_acesso = relationship("NivelAcesso", back_populates="usuarios")
     projetos_gerenciados = relationship("Projeto", back_populates="responsavel")
-    execucoes_atribuidas = relationship("ExecucaoTeste", back_populates="responsavel")
\ No newline at end of file
+    execucoes_atribuidas = relationship("ExecucaoTeste", back_populates="responsavel", foreign_keys="ExecucaoTeste.responsavel_id")
\ No newline at end of file
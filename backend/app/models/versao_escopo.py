@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class VersaoEscopo(Base):
+    """
+    Contador de versão por escopo ("sistema:<id>", "projeto:<id>"), incrementado
+    na mesma transação das escritas (ver app.core.eventos.publicar_alteracao).
+    Usado para ETag/Last-Modified dos endpoints de leitura.
+    """
+    __tablename__ = "versoes_escopo"
+
+    escopo = Column(String(64), primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=1, server_default="1")
+    atualizado_em = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,24 @@
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+
+async def rebuild_rollups():
+    async with AsyncSessionLocal() as session:
+        try:
+            print("--- Recalculando rollups do dashboard ---")
+            await DashboardRollupRepository(session).recalcular()
+            await session.commit()
+            print("--- Rollups recalculados com sucesso! ---")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"Erro ao recalcular rollups: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(rebuild_rollups())
+    except Exception as e:
+        print(f"Execution Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,27 @@
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+
+async def refresh_views():
+    async with AsyncSessionLocal() as session:
+        try:
+            print("--- Atualizando views materializadas do dashboard ---")
+            atualizou = await DashboardRollupRepository(session).atualizar_views()
+            await session.commit()
+            if atualizou:
+                print("--- Views atualizadas com sucesso! ---")
+            else:
+                print("--- Outro processo já está atualizando as views ---")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"Erro ao atualizar as views: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(refresh_views())
+    except Exception as e:
+        print(f"Execution Error: {e}")
+        sys.exit(1)
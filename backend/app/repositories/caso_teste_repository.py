@@ -7,10 +7,17 @@ from typing import Sequence, Optional
 from app.models.testing import CasoTeste, PassoCasoTeste, ExecucaoTeste, StatusExecucaoEnum, ExecucaoPasso, Defeito
 from app.models.usuario import Usuario
 from app.schemas.caso_teste import CasoTesteCreate, CasoTesteUpdate
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from app.repositories.execucao_teste_repository import recontar_passos
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.core.eventos import publicar_alteracao, escopo_execucoes, escopo_projetos
+from app.models.projeto import Projeto
 
 class CasoTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = DashboardRollupRepository(db)
+        self.evidencias = EvidenciaRepository(db)
 
     async def get_by_nome_projeto(self, nome: str, projeto_id: int) -> Optional[CasoTeste]:
         query = select(CasoTeste).where(CasoTeste.nome == nome, CasoTeste.projeto_id == projeto_id)
@@ -78,6 +85,7 @@ class CasoTesteRepository:
             )
             self.db.add(nova_execucao)
             await self.db.flush() 
+            await self.rollup.registrar_execucoes(ExecucaoTeste.id == nova_execucao.id, 1)
 
             if passos_objs:
                 passos_execucao = [
@@ -90,7 +98,9 @@ class CasoTesteRepository:
                     for p in passos_objs
                 ]
                 self.db.add_all(passos_execucao)
+                nova_execucao.passos_pendentes = len(passos_execucao)
 
+        await publicar_alteracao(self.db, escopo_projetos(Projeto.id == projeto_id))
         await self.db.commit()
         # Retorna o objeto completo com os relacionamentos carregados
         return await self.get_by_id(db_caso.id)
@@ -120,7 +130,12 @@ class CasoTesteRepository:
             if ids_para_deletar:
                 # Nota: Em produção real, deletar passos pode quebrar histórico de execução. 
                 # Aqui removemos as execuções de passos órfãos para permitir o delete.
-                await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.passo_caso_teste_id.in_(ids_para_deletar)))
+                removidos = await self.db.execute(
+                    delete(ExecucaoPasso)
+                    .where(ExecucaoPasso.passo_caso_teste_id.in_(ids_para_deletar))
+                    .returning(ExecucaoPasso.evidencias)
+                )
+                await self.evidencias.liberar(removidos.scalars().all())
                 await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.id.in_(ids_para_deletar)))
 
             # Atualiza ou Cria passos
@@ -156,6 +171,7 @@ class CasoTesteRepository:
             # Atualiza responsável
             if 'responsavel_id' in dados_dict and execucao_ativa.responsavel_id != dados_dict['responsavel_id']:
                 execucao_ativa.responsavel_id = dados_dict['responsavel_id']
+                execucao_ativa.responsavel_pela_fila = False
                 has_changes = True
             
             # Atualiza ciclo
@@ -165,16 +181,22 @@ class CasoTesteRepository:
                     has_changes = True
             
             if has_changes:
+                # Troca de responsável ou ciclo conta como alteração da execução (concorrência otimista)
+                execucao_ativa.versao = ExecucaoTeste.versao + 1
                 self.db.add(execucao_ativa)
+                await self.db.flush()
+                await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == execucao_ativa.id))
 
             # Sincroniza passos novos com a execução ativa
             if passos_data is not None:
                 # Remove da execução passos que foram deletados do caso
-                await self.db.execute(
+                removidos = await self.db.execute(
                     delete(ExecucaoPasso)
                     .where(ExecucaoPasso.execucao_teste_id == execucao_ativa.id)
                     .where(ExecucaoPasso.passo_caso_teste_id.notin_(current_passos_ids))
+                    .returning(ExecucaoPasso.evidencias)
                 )
+                await self.evidencias.liberar(removidos.scalars().all())
 
                 # Verifica quais passos faltam na execução
                 subquery_existentes = select(ExecucaoPasso.passo_caso_teste_id).where(ExecucaoPasso.execucao_teste_id == execucao_ativa.id)
@@ -194,19 +216,46 @@ class CasoTesteRepository:
                         resultado_obtido=""
                     ))
 
+        if passos_data is not None:
+            # Passos removidos/incluídos mexem nas execuções do caso: recontagem completa
+            await self.db.flush()
+            await recontar_passos(self.db, ExecucaoTeste.caso_teste_id == caso_id)
+
+        await publicar_alteracao(
+            self.db,
+            escopo_projetos(Projeto.id == select(CasoTeste.projeto_id).where(CasoTeste.id == caso_id).scalar_subquery())
+        )
         await self.db.commit()
         return await self.get_by_id(caso_id)
 
     async def delete(self, caso_id: int) -> bool:
         # Busca execuções associadas para limpeza em cascata manual
-        execs = await self.db.execute(select(ExecucaoTeste.id).where(ExecucaoTeste.caso_teste_id == caso_id))
+        execs = await self.db.execute(
+            select(ExecucaoTeste.id).where(ExecucaoTeste.caso_teste_id == caso_id).with_for_update()
+        )
         execs_ids = execs.scalars().all()
 
         if execs_ids:
-            await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)))
+            await self.db.execute(
+                select(Defeito.id).where(Defeito.execucao_teste_id.in_(execs_ids)).with_for_update()
+            )
+            await self.rollup.registrar_defeitos(Defeito.execucao_teste_id.in_(execs_ids), -1)
+            await self.rollup.registrar_execucoes(ExecucaoTeste.id.in_(execs_ids), -1)
+            await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id.in_(execs_ids)))
+
+            passos = await self.db.execute(
+                delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)).returning(ExecucaoPasso.evidencias)
+            )
+            defeitos = await self.db.execute(
+                delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)).returning(Defeito.evidencias)
+            )
+            await self.evidencias.liberar([*passos.scalars().all(), *defeitos.scalars().all()])
             await self.db.execute(delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)))
 
+        await publicar_alteracao(
+            self.db,
+            escopo_projetos(Projeto.id == select(CasoTeste.projeto_id).where(CasoTeste.id == caso_id).scalar_subquery())
+        )
         await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.caso_teste_id == caso_id))
         result = await self.db.execute(delete(CasoTeste).where(CasoTeste.id == caso_id))
         await self.db.commit()
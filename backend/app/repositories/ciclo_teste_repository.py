@@ -1,38 +1,58 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import delete, update as sqlalchemy_update
+from sqlalchemy import delete, func, update as sqlalchemy_update
+from sqlalchemy.engine import Row
 from typing import Sequence, Optional
 
-from app.models.testing import CicloTeste, ExecucaoTeste
+from app.models.testing import CicloTeste, ExecucaoTeste, StatusExecucaoEnum
 from app.models.usuario import Usuario
 from app.schemas.ciclo_teste import CicloTesteCreate
+from app.models.projeto import Projeto
+from app.core.eventos import publicar_alteracao, escopo_projetos
 
 class CicloTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    def _escopo_ciclo(self, ciclo_id: int):
+        return escopo_projetos(
+            Projeto.id == select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id).scalar_subquery()
+        )
+
     async def get_by_nome_projeto(self, nome: str, projeto_id: int) -> Optional[CicloTeste]:
         query = select(CicloTeste).where(CicloTeste.nome == nome, CicloTeste.projeto_id == projeto_id)
         result = await self.db.execute(query)
         return result.scalars().first()
 
-    async def list_by_projeto(self, projeto_id: int) -> Sequence[CicloTeste]:
+    async def list_by_projeto(self, projeto_id: int) -> Sequence[Row]:
+        """
+        Ciclos do projeto com o progresso (testes e passos) agregado no banco,
+        a partir dos contadores das execuções: nenhuma execução é carregada.
+        """
+        concluidos = ExecucaoTeste.passos_aprovados + ExecucaoTeste.passos_reprovados + ExecucaoTeste.passos_bloqueados
         query = (
-            select(CicloTeste)
-            .options(
-                selectinload(CicloTeste.execucoes).selectinload(ExecucaoTeste.responsavel)
+            select(
+                *CicloTeste.__table__.columns,
+                func.count(ExecucaoTeste.id).label("total_testes"),
+                func.count(ExecucaoTeste.id)
+                .filter(ExecucaoTeste.status_geral == StatusExecucaoEnum.fechado)
+                .label("testes_concluidos"),
+                func.coalesce(func.sum(ExecucaoTeste.passos_pendentes + concluidos), 0).label("passos_total"),
+                func.coalesce(func.sum(concluidos), 0).label("passos_concluidos"),
             )
+            .outerjoin(ExecucaoTeste, ExecucaoTeste.ciclo_teste_id == CicloTeste.id)
             .where(CicloTeste.projeto_id == projeto_id)
+            .group_by(CicloTeste.id)
             .order_by(CicloTeste.data_inicio.desc())
         )
-        result = await self.db.execute(query)
-        return result.unique().scalars().all()
+        return (await self.db.execute(query)).all()
 
     async def create(self, projeto_id: int, ciclo_data: CicloTesteCreate) -> CicloTeste:
         dados_ciclo = ciclo_data.model_dump(exclude={'projeto_id'})        
         db_ciclo = CicloTeste(projeto_id=projeto_id, **dados_ciclo)        
         self.db.add(db_ciclo)
+        await publicar_alteracao(self.db, escopo_projetos(Projeto.id == projeto_id))
         await self.db.commit()
         return await self.get_by_id(db_ciclo.id)
 
@@ -52,10 +72,12 @@ class CicloTesteRepository:
         await self.db.execute(
             sqlalchemy_update(CicloTeste).where(CicloTeste.id == ciclo_id).values(**dados)
         )
+        await publicar_alteracao(self.db, self._escopo_ciclo(ciclo_id))
         await self.db.commit()
         return await self.get_by_id(ciclo_id)
 
     async def delete(self, ciclo_id: int) -> bool:
+        await publicar_alteracao(self.db, self._escopo_ciclo(ciclo_id))
         result = await self.db.execute(delete(CicloTeste).where(CicloTeste.id == ciclo_id))
         await self.db.commit()
         return result.rowcount > 0
\ No newline at end of file
@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, desc, case, or_
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from sqlalchemy import func, desc, case, or_, cast, literal_column, Date
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array
+from sqlalchemy.types import JSON
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, timedelta
 
 from app.models.modulo import Modulo
 from app.models.projeto import Projeto, StatusProjetoEnum
@@ -10,9 +12,25 @@ from app.models.testing import (
     CicloTeste, StatusCicloEnum, 
     CasoTeste, 
     Defeito, StatusDefeitoEnum, SeveridadeDefeitoEnum,
-    ExecucaoTeste, StatusExecucaoEnum
+    ExecucaoTeste, StatusExecucaoEnum, STATUS_FINAIS,
+    HistoricoStatusExecucao
 )
 from app.models.usuario import Usuario
+from app.models.dashboard_rollup import RollupExecucao, RollupDefeito, FatoExecucaoDiaria, mv_dashboard_sistema
+
+# granularidade aceita pela API -> unidade do date_trunc
+GRANULARIDADES_VELOCIDADE = {"dia": "day", "semana": "week", "mes": "month"}
+
+# agrupamento dos agregados de duração -> (coluna do histórico, tabela com o nome)
+DIMENSOES_DURACAO = {
+    "runner": (HistoricoStatusExecucao.responsavel_id, Usuario),
+    "caso": (HistoricoStatusExecucao.caso_teste_id, CasoTeste),
+    "modulo": (HistoricoStatusExecucao.modulo_id, Modulo),
+    "ciclo": (HistoricoStatusExecucao.ciclo_teste_id, CicloTeste),
+}
+
+# limites (em segundos) das faixas do gráfico de distribuição de duração
+FAIXAS_DURACAO_SEGUNDOS = [5 * 60, 15 * 60, 30 * 60, 60 * 60, 120 * 60]
 
 class DashboardRepository:
     def __init__(self, db: AsyncSession):
@@ -120,6 +138,232 @@ class DashboardRepository:
             "total_aguardando_reteste": total_aguardando_reteste
         }
 
+    def _subqueries_cadastro(self, projetos) -> list:
+        """Contagens de projetos/ciclos/casos do escopo (tabelas pequenas, lidas direto)."""
+        q_total_projetos = (
+            select(func.count()).select_from(projetos)
+            .where(projetos.c.status == StatusProjetoEnum.ativo)
+            .scalar_subquery()
+        )
+        q_total_ciclos = (
+            select(func.count(CicloTeste.id))
+            .join(projetos, CicloTeste.projeto_id == projetos.c.id)
+            .where(CicloTeste.status.in_([StatusCicloEnum.em_execucao, StatusCicloEnum.planejado]))
+            .scalar_subquery()
+        )
+        q_total_casos = (
+            select(func.count(CasoTeste.id))
+            .join(projetos, CasoTeste.projeto_id == projetos.c.id)
+            .scalar_subquery()
+        )
+        return [
+            q_total_projetos.label("total_projetos"),
+            q_total_ciclos.label("total_ciclos_ativos"),
+            q_total_casos.label("total_casos_teste"),
+        ]
+
+    def _top_modulos_json(self, top_modulos):
+        return select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_array(top_modulos.c.nome, top_modulos.c.total),
+                    top_modulos.c.total.desc(), top_modulos.c.nome
+                ),
+                type_=JSON
+            )
+        ).scalar_subquery().label("top_modulos")
+
+    def _montar_snapshot(self, row) -> Dict[str, Any]:
+        status_execucao = [
+            (s, row[f"exec_{s.value}"]) for s in StatusExecucaoEnum if row[f"exec_{s.value}"]
+        ]
+        severidades = [
+            (sev, row[f"sev_{sev.value}"]) for sev in SeveridadeDefeitoEnum if row[f"sev_{sev.value}"]
+        ]
+
+        passed = row["exec_fechado"]
+        failed = row["exec_falha"]
+        total_executed_valid = passed + failed
+        taxa = round((passed / total_executed_valid * 100), 1) if total_executed_valid > 0 else 0.0
+
+        kpis = {
+            "total_projetos": row["total_projetos"] or 0,
+            "total_ciclos_ativos": row["total_ciclos_ativos"] or 0,
+            "total_casos_teste": row["total_casos_teste"] or 0,
+            "taxa_sucesso_ciclos": taxa,
+            "total_defeitos_abertos": row["total_defeitos_abertos"],
+            "total_defeitos_criticos": row["total_defeitos_criticos"],
+            "total_pendentes": row["exec_pendente"] + row["exec_em_progresso"],
+            "total_bloqueados": row["exec_bloqueado"],
+            "total_aguardando_reteste": row["total_aguardando_reteste"]
+        }
+
+        return {
+            "kpis": kpis,
+            "status_execucao": status_execucao,
+            "defeitos_por_severidade": severidades,
+            "modulos_com_mais_defeitos": [(nome, total) for nome, total in (row["top_modulos"] or [])]
+        }
+
+    async def get_dashboard_snapshot(self, sistema_id: Optional[int] = None, limit_modulos: int = 5) -> Dict[str, Any]:
+        """
+        Calcula KPIs e graficos do dashboard geral em uma unica ida ao banco.
+        Equivale a get_kpis_gerais + get_status_execucao_geral +
+        get_defeitos_por_severidade + get_modulos_com_mais_defeitos.
+        """
+        # --- ESCOPO: projetos do sistema (ou todos) ---
+        q_projetos = select(Projeto.id, Projeto.modulo_id, Projeto.status)
+        if sistema_id:
+            q_projetos = q_projetos.where(Projeto.sistema_id == sistema_id)
+        projetos = q_projetos.cte("projetos_escopo")
+
+        # --- EXECUÇÕES: uma contagem por status via FILTER ---
+        exec_kpis = (
+            select(*[
+                func.count().filter(ExecucaoTeste.status_geral == s).label(f"exec_{s.value}")
+                for s in StatusExecucaoEnum
+            ])
+            .select_from(ExecucaoTeste)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(projetos, CasoTeste.projeto_id == projetos.c.id)
+            .cte("exec_kpis")
+        )
+
+        # --- DEFEITOS: o join ate projetos e feito uma unica vez ---
+        defeitos = (
+            select(Defeito.id, Defeito.status, Defeito.severidade, projetos.c.modulo_id)
+            .join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(projetos, CasoTeste.projeto_id == projetos.c.id)
+            .cte("defeitos_escopo")
+        )
+
+        def_kpis = (
+            select(
+                func.count().filter(
+                    defeitos.c.status.in_([StatusDefeitoEnum.aberto, StatusDefeitoEnum.em_teste])
+                ).label("total_defeitos_abertos"),
+                func.count().filter(
+                    defeitos.c.status != StatusDefeitoEnum.fechado,
+                    defeitos.c.severidade.in_([SeveridadeDefeitoEnum.critico, SeveridadeDefeitoEnum.alto])
+                ).label("total_defeitos_criticos"),
+                func.count().filter(defeitos.c.status == StatusDefeitoEnum.corrigido).label("total_aguardando_reteste"),
+                *[
+                    func.count().filter(
+                        defeitos.c.status != StatusDefeitoEnum.fechado,
+                        defeitos.c.severidade == sev
+                    ).label(f"sev_{sev.value}")
+                    for sev in SeveridadeDefeitoEnum
+                ]
+            )
+            .select_from(defeitos)
+            .cte("def_kpis")
+        )
+
+        top_modulos = (
+            select(Modulo.nome.label("nome"), func.count(defeitos.c.id).label("total"))
+            .select_from(defeitos)
+            .join(Modulo, Modulo.id == defeitos.c.modulo_id)
+            .group_by(Modulo.nome)
+            .order_by(desc(func.count(defeitos.c.id)), Modulo.nome)
+            .limit(limit_modulos)
+            .subquery("top_modulos")
+        )
+
+        query = select(
+            *self._subqueries_cadastro(projetos),
+            exec_kpis,
+            def_kpis,
+            self._top_modulos_json(top_modulos)
+        )
+
+        row = (await self.db.execute(query)).mappings().one()
+        return self._montar_snapshot(row)
+
+    async def get_snapshot_consolidado(self, sistema_id: Optional[int] = None, limit_modulos: int = 5) -> Dict[str, Any]:
+        """
+        Mesmo resultado de get_dashboard_snapshot, mas lendo execucoes/defeitos
+        das tabelas de rollup (poucas linhas por projeto) em vez de recontar tudo.
+        """
+        q_projetos = select(Projeto.id, Projeto.modulo_id, Projeto.status)
+        if sistema_id:
+            q_projetos = q_projetos.where(Projeto.sistema_id == sistema_id)
+        projetos = q_projetos.cte("projetos_escopo")
+
+        q_exec = select(*[
+            func.coalesce(func.sum(RollupExecucao.total).filter(RollupExecucao.status == s), 0).label(f"exec_{s.value}")
+            for s in StatusExecucaoEnum
+        ])
+        if sistema_id:
+            q_exec = q_exec.where(RollupExecucao.sistema_id == sistema_id)
+        exec_kpis = q_exec.cte("exec_kpis")
+
+        def soma_defeitos(*condicoes):
+            return func.coalesce(func.sum(RollupDefeito.total).filter(*condicoes), 0)
+
+        q_def = select(
+            soma_defeitos(
+                RollupDefeito.status.in_([StatusDefeitoEnum.aberto, StatusDefeitoEnum.em_teste])
+            ).label("total_defeitos_abertos"),
+            soma_defeitos(
+                RollupDefeito.status != StatusDefeitoEnum.fechado,
+                RollupDefeito.severidade.in_([SeveridadeDefeitoEnum.critico, SeveridadeDefeitoEnum.alto])
+            ).label("total_defeitos_criticos"),
+            soma_defeitos(RollupDefeito.status == StatusDefeitoEnum.corrigido).label("total_aguardando_reteste"),
+            *[
+                soma_defeitos(
+                    RollupDefeito.status != StatusDefeitoEnum.fechado,
+                    RollupDefeito.severidade == sev
+                ).label(f"sev_{sev.value}")
+                for sev in SeveridadeDefeitoEnum
+            ]
+        )
+        if sistema_id:
+            q_def = q_def.where(RollupDefeito.sistema_id == sistema_id)
+        def_kpis = q_def.cte("def_kpis")
+
+        q_top = (
+            select(Modulo.nome.label("nome"), func.sum(RollupDefeito.total).label("total"))
+            .select_from(RollupDefeito)
+            .join(Modulo, Modulo.id == RollupDefeito.modulo_id)
+            .group_by(Modulo.nome)
+            .having(func.sum(RollupDefeito.total) > 0)
+            .order_by(desc(func.sum(RollupDefeito.total)), Modulo.nome)
+            .limit(limit_modulos)
+        )
+        if sistema_id:
+            q_top = q_top.where(RollupDefeito.sistema_id == sistema_id)
+        top_modulos = q_top.subquery("top_modulos")
+
+        query = select(
+            *self._subqueries_cadastro(projetos),
+            exec_kpis,
+            def_kpis,
+            self._top_modulos_json(top_modulos)
+        )
+
+        row = (await self.db.execute(query)).mappings().one()
+        return self._montar_snapshot(row)
+
+    async def get_snapshot_materializado(self, sistema_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Mesmo resultado de get_dashboard_snapshot lido de mv_dashboard_sistema
+        (uma linha, independente do volume), com o horário do último refresh em
+        "as_of". O top de módulos vem fixo em 5 itens.
+        """
+        mv = mv_dashboard_sistema
+        query = select(mv).where(mv.c.escopo == (sistema_id or 0))
+        row = (await self.db.execute(query)).mappings().first()
+
+        if row is None:
+            # Sistema criado depois do último refresh: ainda sem dados
+            as_of = (await self.db.execute(select(func.max(mv.c.atualizado_em)))).scalar()
+            row = {**{coluna.name: 0 for coluna in mv.c}, "top_modulos": None, "atualizado_em": as_of}
+
+        snapshot = self._montar_snapshot(row)
+        snapshot["as_of"] = row["atualizado_em"]
+        return snapshot
+
     async def get_status_execucao_geral(self, sistema_id: Optional[int] = None) -> List[tuple]:
         query = (
             select(ExecucaoTeste.status_geral, func.count(ExecucaoTeste.id))
@@ -187,15 +431,21 @@ class DashboardRepository:
             ExecucaoTeste.responsavel_id == runner_id
         )
 
+        q_tempo = select(func.avg(HistoricoStatusExecucao.duracao_segundos)).where(
+            HistoricoStatusExecucao.responsavel_id == runner_id,
+            HistoricoStatusExecucao.duracao_segundos.isnot(None)
+        )
+
         total_concluidos = (await self.db.execute(q_concluidos)).scalar() or 0
         total_defeitos = (await self.db.execute(q_defeitos)).scalar() or 0
         total_fila = (await self.db.execute(q_fila)).scalar() or 0
         ultima_atividade = (await self.db.execute(q_last)).scalar()
+        tempo_medio_segundos = (await self.db.execute(q_tempo)).scalar()
 
         return {
             "total_concluidos": total_concluidos,
             "total_defeitos": total_defeitos,
-            "tempo_medio_minutos": 0.0,
+            "tempo_medio_minutos": round(float(tempo_medio_segundos) / 60, 1) if tempo_medio_segundos else 0.0,
             "total_fila": total_fila,
             "ultima_atividade": ultima_atividade
         }
@@ -228,31 +478,182 @@ class DashboardRepository:
             select(Usuario.nome, func.count(ExecucaoTeste.id))
             .join(ExecucaoTeste, Usuario.id == ExecucaoTeste.responsavel_id)
             .where(ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]))
-            .group_by(Usuario.nome)
-            .order_by(desc(func.count(ExecucaoTeste.id)))
+            # Por id: dois testadores com o mesmo nome não podem ser somados
+            .group_by(Usuario.id, Usuario.nome)
+            .order_by(desc(func.count(ExecucaoTeste.id)), Usuario.id)
             .limit(limit)
         )
         result = await self.db.execute(query)
         return result.all()
 
-    # --- metodos de performance (novos) ---
+    async def get_kpis_equipe(
+        self,
+        ordenar_por: str = "total_execucoes_concluidas",
+        decrescente: bool = True,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Any], int]:
+        """
+        KPIs e distribuição de status de todos os runners em uma única passada
+        (GROUP BY responsavel_id com FILTER). Retorna (linhas da página, total
+        de runners); o total vem de uma contagem própria, então continua certo
+        em páginas além da última.
+        """
+        defeitos_por_execucao = (
+            select(Defeito.execucao_teste_id, func.count().label("total"))
+            .group_by(Defeito.execucao_teste_id)
+            .subquery("defeitos_por_execucao")
+        )
+        por_runner = (
+            select(
+                ExecucaoTeste.responsavel_id.label("runner_id"),
+                func.count().filter(ExecucaoTeste.status_geral.in_(STATUS_FINAIS)).label("total_concluidos"),
+                func.coalesce(func.sum(defeitos_por_execucao.c.total), 0).label("total_defeitos"),
+                func.count().filter(ExecucaoTeste.status_geral == StatusExecucaoEnum.pendente).label("total_fila"),
+                func.max(ExecucaoTeste.updated_at).label("ultima_atividade"),
+                *[
+                    func.count().filter(ExecucaoTeste.status_geral == status_exec).label(f"exec_{status_exec.value}")
+                    for status_exec in StatusExecucaoEnum
+                ]
+            )
+            .outerjoin(defeitos_por_execucao, defeitos_por_execucao.c.execucao_teste_id == ExecucaoTeste.id)
+            .where(ExecucaoTeste.responsavel_id.isnot(None))
+            .group_by(ExecucaoTeste.responsavel_id)
+            .subquery("por_runner")
+        )
+        duracoes = (
+            select(
+                HistoricoStatusExecucao.responsavel_id,
+                func.avg(HistoricoStatusExecucao.duracao_segundos).label("tempo_medio_segundos")
+            )
+            .where(
+                HistoricoStatusExecucao.duracao_segundos.isnot(None),
+                HistoricoStatusExecucao.responsavel_id.isnot(None)
+            )
+            .group_by(HistoricoStatusExecucao.responsavel_id)
+            .subquery("duracoes")
+        )
+
+        colunas_ordenacao = {
+            "nome": Usuario.nome,
+            "total_execucoes_concluidas": por_runner.c.total_concluidos,
+            "total_defeitos_reportados": por_runner.c.total_defeitos,
+            "tempo_medio_execucao_minutos": duracoes.c.tempo_medio_segundos,
+            "testes_em_fila": por_runner.c.total_fila,
+            "ultima_atividade": por_runner.c.ultima_atividade,
+        }
+        coluna = colunas_ordenacao[ordenar_por]
+        ordem = coluna.desc().nulls_last() if decrescente else coluna.asc().nulls_last()
 
-    async def get_performance_velocity(self, user_id: Optional[int] = None, days: int = 30) -> List[tuple]:
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
         query = (
             select(
-                func.date(ExecucaoTeste.updated_at).label('date'), 
-                func.count(ExecucaoTeste.id)
+                Usuario.id,
+                Usuario.nome,
+                por_runner,
+                duracoes.c.tempo_medio_segundos
             )
-            .where(ExecucaoTeste.updated_at >= cutoff_date)
-            .where(ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]))
-            .group_by(func.date(ExecucaoTeste.updated_at))
-            .order_by(func.date(ExecucaoTeste.updated_at))
+            .join(por_runner, por_runner.c.runner_id == Usuario.id)
+            .outerjoin(duracoes, duracoes.c.responsavel_id == Usuario.id)
+            .order_by(ordem, Usuario.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        total = select(func.count()).select_from(por_runner).join(Usuario, Usuario.id == por_runner.c.runner_id)
+        linhas = (await self.db.execute(query)).all()
+        return linhas, (await self.db.execute(total)).scalar()
+
+    async def get_duracoes_execucao(
+        self,
+        agrupar_por: str = "runner",
+        runner_id: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        limit: int = 50
+    ) -> List[tuple]:
+        """
+        Duração das execuções concluídas (média, p50, p95 em segundos) agrupada por
+        runner, caso, módulo ou ciclo. Retorna (id, nome, total, media, p50, p95).
+        """
+        coluna, entidade = DIMENSOES_DURACAO[agrupar_por]
+        duracao = HistoricoStatusExecucao.duracao_segundos
+
+        agregados = (
+            select(
+                coluna.label("chave"),
+                func.count().label("total"),
+                func.avg(duracao).label("media"),
+                func.percentile_cont(0.5).within_group(duracao).label("p50"),
+                func.percentile_cont(0.95).within_group(duracao).label("p95"),
+            )
+            .where(duracao.isnot(None), coluna.isnot(None))
+            .group_by(coluna)
+        )
+        if runner_id:
+            agregados = agregados.where(HistoricoStatusExecucao.responsavel_id == runner_id)
+        if data_inicio:
+            agregados = agregados.where(HistoricoStatusExecucao.created_at >= data_inicio)
+        if data_fim:
+            agregados = agregados.where(HistoricoStatusExecucao.created_at < data_fim + timedelta(days=1))
+        agregados = agregados.subquery("agregados")
+
+        query = (
+            select(
+                agregados.c.chave, entidade.nome, agregados.c.total,
+                agregados.c.media, agregados.c.p50, agregados.c.p95
+            )
+            .join(entidade, entidade.id == agregados.c.chave)
+            .order_by(desc(agregados.c.total))
+            .limit(limit)
+        )
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def get_distribuicao_duracao(self, runner_id: Optional[int] = None) -> List[tuple]:
+        """Quantidade de execuções concluídas por faixa de duração: (índice da faixa, total)."""
+        faixa = func.width_bucket(
+            HistoricoStatusExecucao.duracao_segundos, array(FAIXAS_DURACAO_SEGUNDOS)
+        ).label("faixa")
+        query = (
+            select(faixa, func.count())
+            .where(HistoricoStatusExecucao.duracao_segundos.isnot(None))
+            .group_by(literal_column("faixa"))
+            .order_by(literal_column("faixa"))
+        )
+        if runner_id:
+            query = query.where(HistoricoStatusExecucao.responsavel_id == runner_id)
+
+        result = await self.db.execute(query)
+        return result.all()
+
+    # --- metodos de performance (novos) ---
+
+    async def get_performance_velocity(
+        self,
+        user_id: Optional[int] = None,
+        granularidade: str = "dia",
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        days: int = 30
+    ) -> List[tuple]:
+        """
+        Execuções concluídas por período (dia/semana/mes), lidas do fato diário.
+        Sem intervalo informado, considera os últimos `days` dias.
+        """
+        data_fim = data_fim or date.today()
+        data_inicio = data_inicio or (data_fim - timedelta(days=days))
+
+        # Unidade vem do dicionário fixo; literal para que SELECT e GROUP BY sejam a mesma expressão
+        unidade = literal_column(f"'{GRANULARIDADES_VELOCIDADE[granularidade]}'")
+        periodo = cast(func.date_trunc(unidade, FatoExecucaoDiaria.dia), Date).label('date')
+        query = (
+            select(periodo, func.sum(FatoExecucaoDiaria.total))
+            .where(FatoExecucaoDiaria.dia.between(data_inicio, data_fim))
+            .group_by(periodo)
+            .order_by(periodo)
         )
 
         if user_id:
-            query = query.where(ExecucaoTeste.responsavel_id == user_id)
+            query = query.where(FatoExecucaoDiaria.responsavel_id == user_id)
 
         result = await self.db.execute(query)
         return result.all()
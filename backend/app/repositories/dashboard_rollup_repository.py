@@ -0,0 +1,140 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import delete, func, text, true
+from sqlalchemy.sql import ColumnElement
+from typing import Optional
+
+from app.core.eventos import publicar_views_atualizadas
+from app.models.dashboard_rollup import RollupExecucao, RollupDefeito, FatoExecucaoDiaria, mv_dashboard_sistema
+from app.models.projeto import Projeto
+from app.models.testing import CasoTeste, ExecucaoTeste, Defeito
+
+# pg_try_advisory_xact_lock: um refresh das views por vez entre todos os workers
+TRAVA_REFRESH_VIEWS = 0x67656D76
+
+class DashboardRollupRepository:
+    """
+    Mantém os contadores de rollup_execucoes / rollup_defeitos.
+
+    Os métodos registrar_* aplicam um delta (+1/-1 por linha) para as linhas
+    que casam com o filtro e NÃO fazem commit: devem ser chamados dentro da
+    transação da escrita correspondente. Para remoções/alterações, chame com
+    sinal -1 antes de mexer na linha e +1 depois.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def registrar_execucoes(self, filtro: ColumnElement, sinal: int = 1):
+        origem = (
+            select(
+                Projeto.sistema_id,
+                Projeto.modulo_id,
+                Projeto.id,
+                ExecucaoTeste.status_geral,
+                func.count() * sinal
+            )
+            .select_from(ExecucaoTeste)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .where(filtro, ExecucaoTeste.status_geral.isnot(None))
+            .group_by(Projeto.sistema_id, Projeto.modulo_id, Projeto.id, ExecucaoTeste.status_geral)
+            # Ordem fixa das chaves evita deadlock entre escritas concorrentes
+            .order_by(Projeto.sistema_id, Projeto.modulo_id, Projeto.id, ExecucaoTeste.status_geral)
+        )
+        stmt = pg_insert(RollupExecucao).from_select(
+            ["sistema_id", "modulo_id", "projeto_id", "status", "total"], origem
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sistema_id", "modulo_id", "projeto_id", "status"],
+            set_={"total": RollupExecucao.total + stmt.excluded.total}
+        )
+        await self.db.execute(stmt)
+
+    async def registrar_defeitos(self, filtro: ColumnElement, sinal: int = 1):
+        origem = (
+            select(
+                Projeto.sistema_id,
+                Projeto.modulo_id,
+                Projeto.id,
+                Defeito.status,
+                Defeito.severidade,
+                func.count() * sinal
+            )
+            .select_from(Defeito)
+            .join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .where(filtro, Defeito.status.isnot(None))
+            .group_by(Projeto.sistema_id, Projeto.modulo_id, Projeto.id, Defeito.status, Defeito.severidade)
+            .order_by(Projeto.sistema_id, Projeto.modulo_id, Projeto.id, Defeito.status, Defeito.severidade)
+        )
+        stmt = pg_insert(RollupDefeito).from_select(
+            ["sistema_id", "modulo_id", "projeto_id", "status", "severidade", "total"], origem
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sistema_id", "modulo_id", "projeto_id", "status", "severidade"],
+            set_={"total": RollupDefeito.total + stmt.excluded.total}
+        )
+        await self.db.execute(stmt)
+
+    async def registrar_conclusao(self, filtro: ColumnElement):
+        """
+        Soma 1 no fato diário (hoje) para as execuções do filtro, com o status atual.
+        Chamar apenas na transição de um status não final para um final. Não faz commit.
+        """
+        origem = (
+            select(
+                func.current_date(),
+                ExecucaoTeste.responsavel_id,
+                CasoTeste.projeto_id,
+                ExecucaoTeste.status_geral,
+                func.count()
+            )
+            .select_from(ExecucaoTeste)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .where(filtro, ExecucaoTeste.status_geral.isnot(None))
+            .group_by(ExecucaoTeste.responsavel_id, CasoTeste.projeto_id, ExecucaoTeste.status_geral)
+        )
+        stmt = pg_insert(FatoExecucaoDiaria).from_select(
+            ["dia", "responsavel_id", "projeto_id", "status", "total"], origem
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_fato_execucoes_diarias_chave",
+            set_={"total": FatoExecucaoDiaria.total + stmt.excluded.total}
+        )
+        await self.db.execute(stmt)
+
+    async def recalcular(self, projeto_id: Optional[int] = None):
+        """Recalcula os rollups do zero (todos, ou apenas os de um projeto). Não faz commit."""
+        # Bloqueia os deltas concorrentes até o commit, para que nenhum se perca
+        await self.db.execute(text(
+            "LOCK TABLE rollup_execucoes, rollup_defeitos IN SHARE ROW EXCLUSIVE MODE"
+        ))
+
+        if projeto_id is None:
+            filtro = true()
+            await self.db.execute(delete(RollupExecucao))
+            await self.db.execute(delete(RollupDefeito))
+        else:
+            filtro = Projeto.id == projeto_id
+            await self.db.execute(delete(RollupExecucao).where(RollupExecucao.projeto_id == projeto_id))
+            await self.db.execute(delete(RollupDefeito).where(RollupDefeito.projeto_id == projeto_id))
+
+        await self.registrar_execucoes(filtro, 1)
+        await self.registrar_defeitos(filtro, 1)
+
+    async def atualizar_views(self) -> bool:
+        """
+        REFRESH CONCURRENTLY das views materializadas do dashboard (as leituras
+        continuam enquanto isso) e aviso aos workers. Devolve False, sem fazer
+        nada, se outro worker já está atualizando. Não faz commit.
+        """
+        trava = await self.db.execute(select(func.pg_try_advisory_xact_lock(TRAVA_REFRESH_VIEWS)))
+        if not trava.scalar():
+            return False
+
+        await self.db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {mv_dashboard_sistema.name}"))
+        await publicar_views_atualizadas(self.db)
+        return True
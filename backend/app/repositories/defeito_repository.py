@@ -9,10 +9,16 @@ from app.models.testing import Defeito, ExecucaoTeste, CasoTeste, ExecucaoPasso
 from app.models.projeto import Projeto
 from app.models.usuario import Usuario
 from app.schemas.defeito import DefeitoCreate, DefeitoUpdate
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from app.repositories.execucao_teste_repository import opcoes_execucao_compacta
+from app.repositories.evidencia_repository import EvidenciaRepository, delta_referencias
+from app.core.eventos import publicar_alteracao, escopo_execucoes
 
 class DefeitoRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = DashboardRollupRepository(db)
+        self.evidencias = EvidenciaRepository(db)
 
     def _get_load_options(self):
         return [
@@ -26,6 +32,10 @@ class DefeitoRepository:
             selectinload(Defeito.execucao).selectinload(ExecucaoTeste.passos_executados).selectinload(ExecucaoPasso.passo_template)
         ]
 
+    def _get_load_options_compactas(self):
+        # Visão "full": execução normalizada, sem passo_template por resultado
+        return [selectinload(Defeito.execucao).options(*opcoes_execucao_compacta())]
+
     # --- MÉTODOS DE ESCRITA (HEAD - Com suporte a JSON) ---
 
     async def create(self, dados: DefeitoCreate) -> Defeito:
@@ -56,6 +66,10 @@ class DefeitoRepository:
         # 2. Criação
         novo_defeito = Defeito(**dados_dict)
         self.db.add(novo_defeito)
+        await self.db.flush()
+        await self.rollup.registrar_defeitos(Defeito.id == novo_defeito.id, 1)
+        await self.evidencias.ajustar_referencias(delta_referencias([(None, novo_defeito.evidencias)]))
+        await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == novo_defeito.execucao_teste_id))
         await self.db.commit()
         
         # 3. Recarrega
@@ -71,6 +85,10 @@ class DefeitoRepository:
         defeito = await self.get_by_id(id)
         if not defeito:
             return None
+
+        filtro = Defeito.id == id
+        await self.db.execute(select(Defeito.id).where(filtro).with_for_update())
+        await self.rollup.registrar_defeitos(filtro, -1)
             
         update_data = dados.model_dump(exclude_unset=True)
         
@@ -78,15 +96,26 @@ class DefeitoRepository:
         if 'evidencias' in update_data and isinstance(update_data['evidencias'], list):
              update_data['evidencias'] = json.dumps(update_data['evidencias'])
 
+        evidencias_anteriores = defeito.evidencias
         for key, value in update_data.items():
             setattr(defeito, key, value)
-            
+
+        await self.db.flush()
+        if 'evidencias' in update_data:
+            await self.evidencias.ajustar_referencias(
+                delta_referencias([(evidencias_anteriores, defeito.evidencias)])
+            )
+        await self.rollup.registrar_defeitos(filtro, 1)
+        await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == defeito.execucao_teste_id))
         await self.db.commit()
         return await self.get_by_id(id)
 
     async def delete(self, id: int) -> bool:
-        defeito = await self.db.get(Defeito, id)
+        defeito = await self.db.get(Defeito, id, with_for_update=True)
         if defeito:
+            await self.rollup.registrar_defeitos(Defeito.id == id, -1)
+            await self.evidencias.ajustar_referencias(delta_referencias([(defeito.evidencias, None)]))
+            await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == defeito.execucao_teste_id))
             await self.db.delete(defeito)
             await self.db.commit()
             return True
@@ -104,17 +133,27 @@ class DefeitoRepository:
         return result.scalars().first()
 
     # Trazido da MAIN (Necessário para o Service)
-    async def get_by_execucao(self, execucao_id: int) -> Sequence[Defeito]:
+    async def get_by_execucao(self, execucao_id: int, compacta: bool = False) -> Sequence[Defeito]:
+        opcoes = self._get_load_options_compactas() if compacta else self._get_load_options()
         query = (
             select(Defeito)
-            .options(*self._get_load_options())
+            .options(*opcoes)
             .where(Defeito.execucao_teste_id == execucao_id)
         )
         result = await self.db.execute(query)
         return result.scalars().all()
 
     # Mantido do HEAD (Essencial para a Tabela do Dashboard)
-    async def get_all_with_details(self, responsavel_id: Optional[int] = None):
+    async def get_all_completos(self, responsavel_id: Optional[int] = None) -> Sequence[Defeito]:
+        query = select(Defeito).options(*self._get_load_options_compactas()).order_by(desc(Defeito.id))
+        if responsavel_id:
+            query = query.join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id).where(
+                ExecucaoTeste.responsavel_id == responsavel_id
+            )
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
+    async def get_all_with_details(self, responsavel_id: Optional[int] = None, execucao_id: Optional[int] = None):
         Runner = aliased(Usuario)  
         Manager = aliased(Usuario) 
 
@@ -126,6 +165,7 @@ class DefeitoRepository:
                 Defeito.status,
                 Defeito.severidade,
                 Defeito.created_at,
+                Defeito.updated_at,
                 Defeito.evidencias,
                 Defeito.logs_erro,
                 Defeito.execucao_teste_id,
@@ -144,6 +184,8 @@ class DefeitoRepository:
 
         if responsavel_id:
             query = query.where(ExecucaoTeste.responsavel_id == responsavel_id)
+        if execucao_id:
+            query = query.where(Defeito.execucao_teste_id == execucao_id)
 
         result = await self.db.execute(query)
         return result.mappings().all()
\ No newline at end of file
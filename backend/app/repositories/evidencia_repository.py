@@ -0,0 +1,171 @@
+import json
+import os
+import re
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import update, delete, func, literal, column, text, Integer, Text, ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.evidencia_blob import EvidenciaBlob
+
+# URL (ou caminho) de um blob: .../blobs/ab/cd/<sha256><ext>
+PADRAO_BLOB = r"/blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})"
+_PADRAO_BLOB = re.compile(PADRAO_BLOB)
+
+def lista_evidencias(valor: Any) -> List[str]:
+    """Evidências gravadas (lista em JSON, lista ou uma referência solta) como lista."""
+    if not valor:
+        return []
+    if isinstance(valor, list):
+        return valor
+    try:
+        evidencias = json.loads(valor)
+    except ValueError:
+        return [valor]
+    return evidencias if isinstance(evidencias, list) else [valor]
+
+def hashes_evidencias(valor: Any) -> Set[str]:
+    """SHA-256 dos blobs referenciados (cada blob conta uma vez por passo/defeito)."""
+    hashes = set()
+    for evidencia in lista_evidencias(valor):
+        encontrado = _PADRAO_BLOB.search(str(evidencia))
+        if encontrado:
+            hashes.add(encontrado.group(1))
+    return hashes
+
+def delta_referencias(trocas: Iterable[Tuple[Any, Any]]) -> Dict[str, int]:
+    """(evidências antes, evidências depois) de cada passo/defeito -> variação de referências por blob."""
+    delta: Dict[str, int] = {}
+    for antes, depois in trocas:
+        anteriores, novos = hashes_evidencias(antes), hashes_evidencias(depois)
+        for sha256 in novos - anteriores:
+            delta[sha256] = delta.get(sha256, 0) + 1
+        for sha256 in anteriores - novos:
+            delta[sha256] = delta.get(sha256, 0) - 1
+    return {sha256: n for sha256, n in delta.items() if n}
+
+class EvidenciaRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, sha256: str) -> Optional[EvidenciaBlob]:
+        return await self.db.get(EvidenciaBlob, sha256)
+
+    async def content_type(self, caminho: str) -> Optional[str]:
+        """Tipo validado no upload do blob guardado em `caminho`; None se não for um blob cadastrado."""
+        stmt = select(EvidenciaBlob.content_type).where(
+            EvidenciaBlob.sha256 == os.path.basename(caminho)[:64], EvidenciaBlob.caminho == caminho
+        )
+        return (await self.db.execute(stmt)).scalar()
+
+    async def tocar(self, sha256: str) -> Optional[EvidenciaBlob]:
+        """Blob pelo hash, renovando ultimo_uso_em (vai ser anexado: o coletor espera). Faz commit."""
+        stmt = (
+            update(EvidenciaBlob)
+            .where(EvidenciaBlob.sha256 == sha256)
+            .values(ultimo_uso_em=func.now())
+            .returning(EvidenciaBlob)
+            .execution_options(synchronize_session=False)
+        )
+        blob = (await self.db.execute(stmt)).scalars().first()
+        await self.db.commit()
+        return blob
+
+    async def registrar(self, sha256: str, caminho: str, content_type: str, tamanho: int) -> EvidenciaBlob:
+        """
+        Cadastra o blob recém-gravado. Se outro upload do mesmo conteúdo chegou
+        antes, devolve o dele (o chamador confere `caminho`). Faz commit.
+        """
+        stmt = (
+            pg_insert(EvidenciaBlob)
+            .values(sha256=sha256, caminho=caminho, content_type=content_type, tamanho=tamanho)
+            .on_conflict_do_update(index_elements=[EvidenciaBlob.sha256], set_={"ultimo_uso_em": func.now()})
+            .returning(EvidenciaBlob)
+            .execution_options(populate_existing=True)
+        )
+        blob = (await self.db.execute(stmt)).scalars().one()
+        await self.db.commit()
+        return blob
+
+    async def ajustar_referencias(self, delta: Dict[str, int]):
+        """
+        Aplica delta_referencias num único UPDATE ... FROM unnest(...). Hashes sem
+        blob cadastrado (URLs antigas, externas) são ignorados. Não faz commit.
+        """
+        if not delta:
+            return
+        hashes = sorted(delta)
+        lote = (
+            func.unnest(literal(hashes, ARRAY(Text)), literal([delta[h] for h in hashes], ARRAY(Integer)))
+            .table_valued(column("sha256", Text), column("delta", Integer))
+            .render_derived(name="lote")
+        )
+        await self.db.execute(
+            update(EvidenciaBlob)
+            .where(EvidenciaBlob.sha256 == lote.c.sha256)
+            .values(referencias=EvidenciaBlob.referencias + lote.c.delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def liberar(self, evidencias: Iterable[Any]):
+        """
+        Evidências de passos/defeitos removidos em massa (DELETE ... RETURNING
+        evidencias): cada blob perde uma referência por dono. Não faz commit.
+        """
+        await self.ajustar_referencias(delta_referencias((valor, None) for valor in evidencias))
+
+    async def recontar(self) -> int:
+        """
+        Recalcula `referencias` de todos os blobs a partir das evidências gravadas
+        em passos e defeitos (corrige o que a contagem incremental não vê, como
+        execuções removidas em cascata). Faz commit; devolve os blobs corrigidos.
+        """
+        # Bloqueia os ajustes incrementais até o commit: quem já ajustou termina antes
+        # (e entra na contagem); quem anexar depois aplica o delta sobre o valor recontado
+        await self.db.execute(text("LOCK TABLE evidencias_blobs IN SHARE ROW EXCLUSIVE MODE"))
+        resultado = await self.db.execute(text(f"""
+            WITH refs AS (
+                SELECT DISTINCT 'p' || ep.id AS dono, m[1] AS sha256
+                FROM execucoes_passos ep, regexp_matches(ep.evidencias, '{PADRAO_BLOB}', 'g') AS m
+                WHERE ep.evidencias LIKE '%/blobs/%'
+                UNION ALL
+                SELECT DISTINCT 'd' || d.id, m[1]
+                FROM defeitos d, regexp_matches(d.evidencias, '{PADRAO_BLOB}', 'g') AS m
+                WHERE d.evidencias LIKE '%/blobs/%'
+            ),
+            contagem AS (
+                SELECT sha256, count(*) AS total FROM refs GROUP BY sha256
+            )
+            UPDATE evidencias_blobs b
+            SET referencias = coalesce(c.total, 0)
+            FROM evidencias_blobs b2
+            LEFT JOIN contagem c ON c.sha256 = b2.sha256
+            WHERE b2.sha256 = b.sha256 AND b.referencias <> coalesce(c.total, 0)
+        """))
+        await self.db.commit()
+        return resultado.rowcount
+
+    async def coletar_orfaos(self, carencia: timedelta, limite: int = 1000) -> List[str]:
+        """
+        Remove do cadastro até `limite` blobs sem referências e sem uso há mais
+        que `carencia`; devolve os caminhos, para o chamador apagar os arquivos
+        depois do commit. Faz commit.
+        """
+        candidatos = (
+            select(EvidenciaBlob.sha256)
+            .where(EvidenciaBlob.referencias <= 0, EvidenciaBlob.ultimo_uso_em < func.now() - carencia)
+            .order_by(EvidenciaBlob.ultimo_uso_em)
+            .limit(limite)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            delete(EvidenciaBlob)
+            .where(EvidenciaBlob.sha256.in_(candidatos.scalar_subquery()), EvidenciaBlob.referencias <= 0)
+            .returning(EvidenciaBlob.caminho)
+        )
+        caminhos = (await self.db.execute(stmt)).scalars().all()
+        await self.db.commit()
+        return list(caminhos)
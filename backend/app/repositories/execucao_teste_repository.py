@@ -1,20 +1,112 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
-from sqlalchemy.orm import selectinload
-from typing import Sequence, Optional
+from sqlalchemy import update, insert, func, cast, literal, null, case, values, column, tuple_, any_, and_, or_, Integer, Text, Boolean, ARRAY, JSON
+from sqlalchemy.orm import selectinload, joinedload, aliased
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
+from sqlalchemy.sql import ColumnElement
+from typing import Any, Dict, List, Sequence, Optional, Tuple
+from datetime import datetime, timedelta
 import json # <--- Importar json
 
 from app.models.testing import (
     ExecucaoTeste, ExecucaoPasso, PassoCasoTeste, 
-    CasoTeste, StatusExecucaoEnum, StatusPassoEnum
+    CasoTeste, CicloTeste, StatusExecucaoEnum, StatusPassoEnum, StatusCicloEnum, STATUS_FINAIS, CONTADORES_PASSOS,
+    HistoricoStatusExecucao, OperacaoSincronizada
 )
+from app.models.projeto import Projeto
 from app.models.usuario import Usuario
-from app.schemas.execucao_teste import ExecucaoPassoUpdate
+from app.schemas.execucao_teste import ExecucaoPassoUpdate, PlanejamentoLote, RegraAtribuicaoEnum
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from app.repositories.evidencia_repository import EvidenciaRepository, lista_evidencias, delta_referencias
+from app.core.eventos import publicar_alteracao, escopo_execucoes
+from app.core.config import settings
+
+# Campos de ExecucaoPasso aceitos na gravação em lote
+CAMPOS_PASSO_LOTE = ("status", "resultado_obtido", "evidencias")
+
+def status_consolidado(
+    status_atual: Optional[StatusExecucaoEnum], total: int, aprovados: int, reprovados: int
+) -> Optional[StatusExecucaoEnum]:
+    """
+    Status geral que os passos determinam (None = nenhuma regra se aplica):
+    todos aprovados fecha; algum reprovado ou o primeiro resultado põe em progresso.
+    """
+    if aprovados == total:
+        return StatusExecucaoEnum.fechado
+    if reprovados:
+        return StatusExecucaoEnum.em_progresso
+    if status_atual == StatusExecucaoEnum.pendente:
+        return StatusExecucaoEnum.em_progresso
+    return None
+
+# Distingue "execução inexistente" de status_geral NULL em _travar_execucao
+_SEM_EXECUCAO = object()
+
+def _status_passo(coluna):
+    # Passo sem status conta como pendente
+    return func.coalesce(coluna, StatusPassoEnum.pendente)
+
+async def recontar_passos(db: AsyncSession, filtro: ColumnElement):
+    """
+    Recalcula do zero os contadores de passos das execuções que casam com o
+    filtro. Para gravações que inserem/removem passos em massa (ex.: edição dos
+    passos de um caso). Não faz commit.
+    """
+    def contagem(status: StatusPassoEnum):
+        return (
+            select(func.count())
+            .where(ExecucaoPasso.execucao_teste_id == ExecucaoTeste.id, _status_passo(ExecucaoPasso.status) == status)
+            .scalar_subquery()
+        )
+
+    await db.execute(
+        update(ExecucaoTeste)
+        .where(filtro)
+        .values({
+            **{coluna: contagem(status) for status, coluna in CONTADORES_PASSOS.items()},
+            # Recontagem não é uma alteração da execução
+            "updated_at": ExecucaoTeste.updated_at,
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+# Status em que uma execução entra na fila de reservas (em_progresso só com reserva vencida)
+STATUS_FILA = (StatusExecucaoEnum.pendente, StatusExecucaoEnum.reteste, StatusExecucaoEnum.em_progresso)
+
+def fim_reserva() -> ColumnElement:
+    return func.now() + timedelta(minutes=settings.RESERVA_DURACAO_MINUTOS)
+
+def opcoes_execucao_compacta() -> list:
+    """
+    Carga da visão "full": caso (com projeto, ciclo e responsável) e responsável
+    em JOIN; passos do caso e resultados em selectin. O texto de cada passo vem
+    só uma vez (passo_template não é carregado nos resultados).
+    """
+    return [
+        joinedload(ExecucaoTeste.caso_teste).options(
+            joinedload(CasoTeste.projeto),
+            joinedload(CasoTeste.ciclo),
+            joinedload(CasoTeste.responsavel),
+            selectinload(CasoTeste.passos),
+        ),
+        joinedload(ExecucaoTeste.responsavel),
+        selectinload(ExecucaoTeste.passos_executados),
+    ]
+
+class ConflitoVersao(Exception):
+    """
+    Gravação condicional recusada: a versão informada não é mais a atual.
+    `atual` traz o estado já gravado (execução, passo ou lista de passos).
+    """
+    def __init__(self, atual: Any):
+        super().__init__("Versão desatualizada")
+        self.atual = atual
 
 class ExecucaoTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = DashboardRollupRepository(db)
+        self.evidencias = EvidenciaRepository(db)
 
     async def verificar_pendencias_ciclo(self, ciclo_id: int) -> bool:
         query = select(ExecucaoTeste).where(
@@ -33,6 +125,8 @@ class ExecucaoTesteRepository:
         )
         self.db.add(nova_exec)
         await self.db.flush() 
+        await self.rollup.registrar_execucoes(ExecucaoTeste.id == nova_exec.id, 1)
+        await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == nova_exec.id))
 
         query_passos = select(PassoCasoTeste.id).where(PassoCasoTeste.caso_teste_id == caso_id)
         passos_ids = (await self.db.execute(query_passos)).scalars().all()
@@ -48,14 +142,359 @@ class ExecucaoTesteRepository:
                 for pid in passos_ids
             ]
             self.db.add_all(novos_passos_execucao)
+            nova_exec.passos_pendentes = len(passos_ids)
         
         await self.db.commit()
         return await self.get_by_id(nova_exec.id)
 
-    async def get_by_id(self, id: int) -> Optional[ExecucaoTeste]:
+    async def get_projeto_do_ciclo(self, ciclo_id: int) -> Optional[int]:
+        result = await self.db.execute(select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id))
+        return result.scalar()
+
+    async def get_usuarios_existentes(self, ids: List[int], apenas_ativos: bool = False) -> set:
+        query = select(Usuario.id).where(Usuario.id == any_(literal(ids, ARRAY(Integer))))
+        if apenas_ativos:
+            query = query.where(Usuario.ativo.is_(True))
+        result = await self.db.execute(query)
+        return set(result.scalars().all())
+
+    async def get_carga_ciclo(self, ciclo_id: int, usuarios_ids: List[int]):
+        """
+        Execuções abertas do ciclo sem responsável ou de um dos usuários, com o
+        que a estimativa de custo precisa: passos, duração média histórica do
+        caso (None sem histórico) e se há reserva ativa. Uma leitura só de colunas.
+        """
+        duracao_caso = (
+            select(
+                HistoricoStatusExecucao.caso_teste_id,
+                func.avg(HistoricoStatusExecucao.duracao_segundos).label("media")
+            )
+            .where(
+                HistoricoStatusExecucao.duracao_segundos.isnot(None),
+                HistoricoStatusExecucao.caso_teste_id.in_(
+                    select(ExecucaoTeste.caso_teste_id).where(ExecucaoTeste.ciclo_teste_id == ciclo_id)
+                )
+            )
+            .group_by(HistoricoStatusExecucao.caso_teste_id)
+            .subquery()
+        )
+        contadores = [getattr(ExecucaoTeste, coluna) for coluna in CONTADORES_PASSOS.values()]
         query = (
-            select(ExecucaoTeste)
-            .options(
+            select(
+                ExecucaoTeste.id,
+                ExecucaoTeste.responsavel_id,
+                ExecucaoTeste.status_geral,
+                sum(contadores[1:], contadores[0]).label("passos"),
+                duracao_caso.c.media,
+                (ExecucaoTeste.reservado_ate > func.now()).label("reservada"),
+            )
+            .outerjoin(duracao_caso, duracao_caso.c.caso_teste_id == ExecucaoTeste.caso_teste_id)
+            .where(
+                ExecucaoTeste.ciclo_teste_id == ciclo_id,
+                ExecucaoTeste.status_geral.in_(STATUS_FILA),
+                or_(
+                    ExecucaoTeste.responsavel_id.is_(None),
+                    ExecucaoTeste.responsavel_id == any_(literal(usuarios_ids, ARRAY(Integer)))
+                )
+            )
+        )
+        return (await self.db.execute(query)).all()
+
+    async def atribuir_lote(self, ciclo_id: int, atribuicoes: List[Tuple[int, Optional[int], int]]) -> int:
+        """
+        Grava (execucao_id, responsavel_anterior, novo_responsavel) num único
+        UPDATE ... FROM unnest(...). Linhas cujo responsável mudou desde a
+        leitura, ou que ganharam reserva ativa, ficam como estão. Faz commit;
+        devolve quantas foram atribuídas.
+        """
+        # Atribuição e planejamento do mesmo ciclo não correm em paralelo
+        await self.db.execute(select(CicloTeste.id).where(CicloTeste.id == ciclo_id).with_for_update())
+        if not atribuicoes:
+            await self.db.commit()
+            return 0
+
+        ids, anteriores, novos = (list(coluna) for coluna in zip(*atribuicoes))
+        lote = (
+            func.unnest(
+                literal(ids, ARRAY(Integer)),
+                literal(anteriores, ARRAY(Integer)),
+                literal(novos, ARRAY(Integer)),
+            )
+            .table_valued(column("id", Integer), column("anterior", Integer), column("novo", Integer))
+            .render_derived(name="lote")
+        )
+        filtro = ExecucaoTeste.id == any_(literal(ids, ARRAY(Integer)))
+        # Antes e depois do UPDATE: avisa quem perdeu e quem ganhou execuções
+        await publicar_alteracao(self.db, escopo_execucoes(filtro))
+        stmt = (
+            update(ExecucaoTeste)
+            .where(
+                ExecucaoTeste.id == lote.c.id,
+                ExecucaoTeste.ciclo_teste_id == ciclo_id,
+                ExecucaoTeste.responsavel_id.is_not_distinct_from(lote.c.anterior),
+                or_(ExecucaoTeste.reservado_ate.is_(None), ExecucaoTeste.reservado_ate <= func.now()),
+            )
+            .values(responsavel_id=lote.c.novo, responsavel_pela_fila=False, versao=ExecucaoTeste.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+        atribuidas = (await self.db.execute(stmt)).rowcount
+        await publicar_alteracao(self.db, escopo_execucoes(filtro))
+        await self.db.commit()
+        return atribuidas
+
+    def _responsavel_do_lote(self, dados: PlanejamentoLote, caso_responsavel, ordem) -> ColumnElement:
+        if dados.regra == RegraAtribuicaoEnum.fixo:
+            return literal(dados.responsavel_id, Integer)
+        if dados.regra == RegraAtribuicaoEnum.rodizio:
+            # Arrays do Postgres começam em 1
+            return array(dados.responsaveis_ids)[(ordem - 1) % len(dados.responsaveis_ids) + 1]
+        if dados.regra == RegraAtribuicaoEnum.sem_responsavel:
+            return cast(null(), Integer)
+        return func.coalesce(caso_responsavel, literal(dados.responsavel_id, Integer))
+
+    async def planejar_lote(self, ciclo_id: int, projeto_id: int, dados: PlanejamentoLote) -> Dict[str, Any]:
+        """
+        Planeja vários casos no ciclo com um único statement: INSERT ... SELECT ...
+        RETURNING das execuções encadeado ao INSERT dos passos (CTEs), sem carregar
+        objetos. Casos que já têm execução no ciclo são ignorados; com a regra
+        sem_responsavel as execuções entram sem responsável (fila do ciclo, que
+        atribuir_ciclo distribui depois). Faz commit.
+        """
+        # Planejamentos concorrentes do mesmo ciclo não podem duplicar casos
+        await self.db.execute(select(CicloTeste.id).where(CicloTeste.id == ciclo_id).with_for_update())
+
+        filtros = [CasoTeste.projeto_id == projeto_id]
+        if dados.caso_teste_ids is not None:
+            filtros.append(CasoTeste.id == any_(literal(dados.caso_teste_ids, ARRAY(Integer))))
+        if dados.prioridade:
+            filtros.append(CasoTeste.prioridade == dados.prioridade)
+        if dados.status_caso:
+            filtros.append(CasoTeste.status == dados.status_caso)
+        if dados.apenas_casos_do_ciclo:
+            filtros.append(CasoTeste.ciclo_id == ciclo_id)
+
+        planejado = (
+            select(ExecucaoTeste.id)
+            .where(ExecucaoTeste.ciclo_teste_id == ciclo_id, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .exists()
+        )
+        candidatos = (
+            select(CasoTeste.id, CasoTeste.responsavel_id, planejado.label("planejado"))
+            .where(*filtros)
+            .cte("candidatos")
+        )
+        ordem = func.row_number().over(order_by=candidatos.c.id)
+        elegiveis_base = select(
+            candidatos.c.id, candidatos.c.responsavel_id, ordem.label("ordem")
+        ).where(candidatos.c.planejado.is_(False)).subquery()
+        elegiveis = select(
+            elegiveis_base.c.id,
+            self._responsavel_do_lote(dados, elegiveis_base.c.responsavel_id, elegiveis_base.c.ordem).label("responsavel_id"),
+        ).cte("elegiveis")
+
+        total_passos = (
+            select(func.count())
+            .where(PassoCasoTeste.caso_teste_id == elegiveis.c.id)
+            .scalar_subquery()
+        )
+        selecao = select(
+            literal(ciclo_id, Integer),
+            elegiveis.c.id,
+            elegiveis.c.responsavel_id,
+            literal(StatusExecucaoEnum.pendente, ExecucaoTeste.status_geral.type),
+            total_passos,
+        )
+        if dados.regra != RegraAtribuicaoEnum.sem_responsavel:
+            # Nas outras regras, caso sem responsável resolvido não é planejado (só contado)
+            selecao = selecao.where(elegiveis.c.responsavel_id.isnot(None))
+        novas = (
+            insert(ExecucaoTeste)
+            .from_select(
+                ["ciclo_teste_id", "caso_teste_id", "responsavel_id", "status_geral", "passos_pendentes"],
+                selecao,
+            )
+            .returning(ExecucaoTeste.id, ExecucaoTeste.caso_teste_id, ExecucaoTeste.responsavel_id)
+            .cte("novas")
+        )
+        passos = (
+            insert(ExecucaoPasso)
+            .from_select(
+                ["execucao_teste_id", "passo_caso_teste_id", "status", "resultado_obtido"],
+                select(
+                    novas.c.id,
+                    PassoCasoTeste.id,
+                    literal(StatusPassoEnum.pendente, ExecucaoPasso.status.type),
+                    literal("", Text),
+                ).join(PassoCasoTeste, PassoCasoTeste.caso_teste_id == novas.c.caso_teste_id)
+            )
+            .returning(ExecucaoPasso.id)
+            .cte("passos")
+        )
+        por_responsavel = (
+            select(novas.c.responsavel_id, func.count().label("total"))
+            .where(novas.c.responsavel_id.isnot(None))
+            .group_by(novas.c.responsavel_id)
+            .subquery()
+        )
+
+        def contagem(origem, *condicoes):
+            return select(func.count()).select_from(origem).where(*condicoes).scalar_subquery()
+
+        resumo = (await self.db.execute(select(
+            contagem(candidatos).label("casos_selecionados"),
+            contagem(candidatos, candidatos.c.planejado.is_(True)).label("ja_planejados"),
+            contagem(elegiveis, elegiveis.c.responsavel_id.is_(None)).label("sem_responsavel"),
+            contagem(passos).label("passos_criados"),
+            select(func.array_agg(novas.c.id)).scalar_subquery().label("ids"),
+            select(
+                func.json_object_agg(por_responsavel.c.responsavel_id, por_responsavel.c.total, type_=JSON)
+            ).scalar_subquery().label("por_responsavel"),
+        ))).one()
+
+        ids = resumo.ids or []
+        if ids:
+            filtro = ExecucaoTeste.id == any_(literal(ids, ARRAY(Integer)))
+            await self.rollup.registrar_execucoes(filtro, 1)
+            await publicar_alteracao(self.db, escopo_execucoes(filtro))
+        await self.db.commit()
+
+        return {
+            "ciclo_teste_id": ciclo_id,
+            "casos_selecionados": resumo.casos_selecionados,
+            "execucoes_criadas": len(ids),
+            "passos_criados": resumo.passos_criados,
+            "ja_planejados": resumo.ja_planejados,
+            "sem_responsavel": resumo.sem_responsavel,
+            "por_responsavel": {int(k): v for k, v in (resumo.por_responsavel or {}).items()},
+        }
+
+    async def reservar_proxima(
+        self, usuario_id: int, ciclo_id: Optional[int] = None, projeto_id: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Reserva para o usuário a próxima execução livre da fila e a atribui a ele:
+        as já atribuídas a ele primeiro, depois as sem responsável, por prioridade
+        do caso e ciclo. Execuções atribuídas a outra pessoa (manual ou pelo
+        balanceamento) nunca são tomadas; as que outra pessoa só pegou pela fila
+        (responsavel_pela_fila) voltam a ser de todos quando a reserva vence.
+        FOR UPDATE SKIP LOCKED faz runners concorrentes pularem a linha que outro
+        está reservando em vez de esperar por ela. Reserva vencida conta como
+        livre, então não há limpeza periódica. Faz commit; devolve o id ou None.
+        """
+        livre = or_(
+            ExecucaoTeste.reservado_ate < func.now(),
+            and_(
+                ExecucaoTeste.reservado_ate.is_(None),
+                # em_progresso sem reserva foi iniciada direto pelo responsável: não é da fila;
+                # sem responsável, foi liberada no meio da execução e volta para a fila
+                or_(
+                    ExecucaoTeste.status_geral != StatusExecucaoEnum.em_progresso,
+                    ExecucaoTeste.responsavel_id.is_(None),
+                ),
+            ),
+        )
+        filtros = [
+            ExecucaoTeste.status_geral.in_(STATUS_FILA),
+            livre,
+            or_(
+                ExecucaoTeste.responsavel_id.is_(None),
+                ExecucaoTeste.responsavel_id == usuario_id,
+                ExecucaoTeste.responsavel_pela_fila,
+            ),
+            CicloTeste.status.in_([StatusCicloEnum.planejado, StatusCicloEnum.em_execucao]),
+        ]
+        if ciclo_id:
+            filtros.append(ExecucaoTeste.ciclo_teste_id == ciclo_id)
+        if projeto_id:
+            filtros.append(CicloTeste.projeto_id == projeto_id)
+
+        alvo = (
+            select(ExecucaoTeste.id)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(CicloTeste, ExecucaoTeste.ciclo_teste_id == CicloTeste.id)
+            .where(*filtros)
+            .order_by(
+                case((ExecucaoTeste.responsavel_id == usuario_id, 0), else_=1),
+                CasoTeste.prioridade,
+                ExecucaoTeste.ciclo_teste_id,
+                ExecucaoTeste.id,
+            )
+            .limit(1)
+            .with_for_update(of=ExecucaoTeste, skip_locked=True)
+            .cte("alvo")
+        )
+        stmt = (
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.id == alvo.c.id)
+            .values(
+                responsavel_id=usuario_id, reservado_por_id=usuario_id, reservado_ate=fim_reserva(),
+                # Já atribuída ao usuário, continua atribuída; senão o responsável vem da fila
+                responsavel_pela_fila=or_(
+                    ExecucaoTeste.responsavel_id.is_distinct_from(usuario_id), ExecucaoTeste.responsavel_pela_fila
+                ),
+                versao=ExecucaoTeste.versao + 1
+            )
+            .returning(ExecucaoTeste.id)
+            .execution_options(synchronize_session=False)
+        )
+        execucao_id = (await self.db.execute(stmt)).scalar()
+        if execucao_id is None:
+            await self.db.rollback()
+            return None
+
+        # Reservar não muda nada servido com ETag (status, contagens): só avisa os caches/streams
+        # do usuário. Sem travar a linha de versão do sistema, reservas concorrentes não se enfileiram.
+        await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == execucao_id), versionar=False)
+        await self.db.commit()
+        return execucao_id
+
+    async def renovar_reserva(self, execucao_id: int, usuario_id: int) -> Optional[datetime]:
+        """Estende a reserva do usuário; None se a reserva não é dele. Faz commit."""
+        stmt = (
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.id == execucao_id, ExecucaoTeste.reservado_por_id == usuario_id)
+            # Renovar não é uma alteração da execução
+            .values(reservado_ate=fim_reserva(), updated_at=ExecucaoTeste.updated_at)
+            .returning(ExecucaoTeste.reservado_ate)
+            .execution_options(synchronize_session=False)
+        )
+        reservado_ate = (await self.db.execute(stmt)).scalar()
+        await self.db.commit()
+        return reservado_ate
+
+    async def liberar_reserva(self, execucao_id: int, usuario_id: int) -> bool:
+        """
+        Devolve a execução à fila; se o responsável veio da reserva, ela volta
+        sem responsável. False se a reserva não é do usuário. Faz commit.
+        """
+        da_fila = ExecucaoTeste.responsavel_pela_fila
+        stmt = (
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.id == execucao_id, ExecucaoTeste.reservado_por_id == usuario_id)
+            .values(
+                reservado_por_id=None, reservado_ate=None, responsavel_pela_fila=False,
+                responsavel_id=case((da_fila, null()), else_=ExecucaoTeste.responsavel_id),
+                versao=case((da_fila, ExecucaoTeste.versao + 1), else_=ExecucaoTeste.versao),
+                updated_at=ExecucaoTeste.updated_at,
+            )
+            .returning(ExecucaoTeste.id)
+            .execution_options(synchronize_session=False)
+        )
+        liberada = (await self.db.execute(stmt)).scalar() is not None
+        if liberada:
+            await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == execucao_id), versionar=False)
+        await self.db.commit()
+        return liberada
+
+    async def existe(self, execucao_id: int) -> bool:
+        result = await self.db.execute(select(ExecucaoTeste.id).where(ExecucaoTeste.id == execucao_id))
+        return result.scalar() is not None
+
+    async def get_by_id(self, id: int, compacta: bool = False) -> Optional[ExecucaoTeste]:
+        if compacta:
+            opcoes = opcoes_execucao_compacta()
+        else:
+            opcoes = [
                 selectinload(ExecucaoTeste.caso_teste).options(
                     selectinload(CasoTeste.passos),
                     selectinload(CasoTeste.projeto),
@@ -64,23 +503,87 @@ class ExecucaoTesteRepository:
                 selectinload(ExecucaoTeste.passos_executados).selectinload(ExecucaoPasso.passo_template),
                 selectinload(ExecucaoTeste.responsavel).selectinload(Usuario.nivel_acesso),
                 selectinload(ExecucaoTeste.ciclo)
-            )
+            ]
+        query = (
+            select(ExecucaoTeste)
+            .options(*opcoes)
             .where(ExecucaoTeste.id == id)
         )
         result = await self.db.execute(query)
         return result.scalars().first()
 
+    def _query_resumo(self):
+        """Visão "summary": só colunas (execução + nomes por join), sem carregar relacionamentos."""
+        contadores = [getattr(ExecucaoTeste, coluna) for coluna in CONTADORES_PASSOS.values()]
+        return (
+            select(
+                ExecucaoTeste.id,
+                ExecucaoTeste.ciclo_teste_id,
+                ExecucaoTeste.caso_teste_id,
+                ExecucaoTeste.responsavel_id,
+                ExecucaoTeste.status_geral,
+                ExecucaoTeste.versao,
+                ExecucaoTeste.created_at,
+                ExecucaoTeste.updated_at,
+                *contadores,
+                sum(contadores[1:], contadores[0]).label("passos_total"),
+                CasoTeste.nome.label("caso_teste_nome"),
+                CasoTeste.projeto_id.label("projeto_id"),
+                Projeto.nome.label("projeto_nome"),
+                CicloTeste.nome.label("ciclo_nome"),
+                Usuario.nome.label("responsavel_nome"),
+            )
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .join(CicloTeste, ExecucaoTeste.ciclo_teste_id == CicloTeste.id)
+            .outerjoin(Usuario, ExecucaoTeste.responsavel_id == Usuario.id)
+        )
+
+    async def get_resumo_by_id(self, id: int):
+        result = await self.db.execute(self._query_resumo().where(ExecucaoTeste.id == id))
+        return result.mappings().first()
+
+    async def get_minhas_execucoes_resumo(
+        self,
+        usuario_id: int,
+        status: Optional[StatusExecucaoEnum] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[Tuple[datetime, int]] = None
+    ):
+        query = self._query_resumo().where(ExecucaoTeste.responsavel_id == usuario_id)
+        query = self._paginar_tarefas(query, status, skip, limit, cursor)
+        result = await self.db.execute(query)
+        return result.mappings().all()
+
+    def _paginar_tarefas(self, query, status, skip: int, limit: int, cursor):
+        """
+        Filtro de status e página em ordem (updated_at desc, id desc), coberta pelos
+        índices ix_execucoes_teste_responsavel_*. Com cursor (updated_at, id do último
+        item visto) a página começa logo depois dele em vez de pular `skip` linhas.
+        """
+        if status:
+            query = query.where(ExecucaoTeste.status_geral == status)
+        if cursor:
+            query = query.where(tuple_(ExecucaoTeste.updated_at, ExecucaoTeste.id) < tuple_(*cursor))
+        else:
+            query = query.offset(skip)
+        return query.order_by(ExecucaoTeste.updated_at.desc(), ExecucaoTeste.id.desc()).limit(limit)
+
     async def get_minhas_execucoes(
         self, 
         usuario_id: int, 
         status: Optional[StatusExecucaoEnum] = None,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        compacta: bool = False,
+        cursor: Optional[Tuple[datetime, int]] = None
     ) -> Sequence[ExecucaoTeste]:
         
-        query = (
-            select(ExecucaoTeste)
-            .options(
+        if compacta:
+            opcoes = opcoes_execucao_compacta()
+        else:
+            opcoes = [
                 selectinload(ExecucaoTeste.ciclo),
                 selectinload(ExecucaoTeste.responsavel).selectinload(Usuario.nivel_acesso),
                 selectinload(ExecucaoTeste.caso_teste).options(
@@ -89,84 +592,599 @@ class ExecucaoTesteRepository:
                     selectinload(CasoTeste.projeto)
                 ),
                 selectinload(ExecucaoTeste.passos_executados).selectinload(ExecucaoPasso.passo_template)
-            )
+            ]
+        query = (
+            select(ExecucaoTeste)
+            .options(*opcoes)
             .where(ExecucaoTeste.responsavel_id == usuario_id)
         )
 
-        if status:
-            query = query.where(ExecucaoTeste.status_geral == status)
-
-        query = query.order_by(ExecucaoTeste.updated_at.desc()).offset(skip).limit(limit)
+        query = self._paginar_tarefas(query, status, skip, limit, cursor)
             
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_execucao_passo(self, passo_id: int) -> Optional[ExecucaoPasso]:
-        return await self.db.get(ExecucaoPasso, passo_id)
+    async def _get_passos(self, ids: List[int]) -> Sequence[ExecucaoPasso]:
+        return (await self.db.execute(
+            select(ExecucaoPasso)
+            .options(selectinload(ExecucaoPasso.passo_template))
+            .where(ExecucaoPasso.id.in_(ids))
+            .order_by(ExecucaoPasso.id)
+        )).scalars().all()
 
-    # --- CORREÇÃO AQUI ---
     async def update_passo(self, passo_id: int, data: ExecucaoPassoUpdate) -> Optional[ExecucaoPasso]:
-        passo = await self.db.get(ExecucaoPasso, passo_id)
-        
-        if passo:
-            update_data = data.model_dump(exclude_unset=True)
-            
-            # TRATAMENTO DE EVIDÊNCIAS: Se vier como lista, converte para JSON String
-            if 'evidencias' in update_data:
-                ev = update_data['evidencias']
-                if isinstance(ev, list):
-                    update_data['evidencias'] = json.dumps(ev)
-            
-            for k, v in update_data.items():
-                setattr(passo, k, v)
-            
-            await self.db.commit()
-            
-            query = (
-                select(ExecucaoPasso)
-                .options(selectinload(ExecucaoPasso.passo_template))
-                .where(ExecucaoPasso.id == passo_id)
+        """
+        Grava o passo com um UPDATE condicional (id e, se informada, versao) e
+        consolida o status geral na mesma transação. None se o passo não existe;
+        ConflitoVersao (com o passo atual) se a versão informada ficou para trás.
+        """
+        # Descobre a execução do passo já travando-a: sem leitura prévia do passo
+        linha = (await self.db.execute(
+            select(ExecucaoTeste.id, ExecucaoTeste.status_geral)
+            .join(ExecucaoPasso, ExecucaoPasso.execucao_teste_id == ExecucaoTeste.id)
+            .where(ExecucaoPasso.id == passo_id)
+            .with_for_update(of=ExecucaoTeste)
+        )).first()
+        if linha is None:
+            return None
+        execucao_id, status_atual = linha
+
+        update_data = data.model_dump(exclude_unset=True, exclude={"versao"})
+        # TRATAMENTO DE EVIDÊNCIAS: Se vier como lista, converte para JSON String
+        valores = {k: self._valor_passo(k, v) for k, v in update_data.items()}
+
+        condicoes = [ExecucaoPasso.id == passo_id]
+        if data.versao is not None:
+            condicoes.append(ExecucaoPasso.versao == data.versao)
+        if valores:
+            contadores, alterados, contagem_mudou = await self._gravar_passos(execucao_id, condicoes, valores)
+            if not alterados:
+                await self.db.rollback()
+                raise ConflitoVersao((await self._get_passos([passo_id]))[0])
+            await self._consolidar_status(execucao_id, status_atual, contadores, contagem_mudou)
+        await self.db.commit()
+
+        passos = await self._get_passos([passo_id])
+        return passos[0] if passos else None
+
+    async def existe_passo(self, passo_id: int) -> bool:
+        result = await self.db.execute(select(ExecucaoPasso.id).where(ExecucaoPasso.id == passo_id))
+        return result.scalar() is not None
+
+    async def get_versao_passo(self, passo_id: int) -> Optional[int]:
+        return (await self.db.execute(select(ExecucaoPasso.versao).where(ExecucaoPasso.id == passo_id))).scalar()
+
+    async def get_ids_passos(self, execucao_id: int) -> Sequence[int]:
+        query = select(ExecucaoPasso.id).where(ExecucaoPasso.execucao_teste_id == execucao_id)
+        return (await self.db.execute(query)).scalars().all()
+
+    async def update_passos_lote(
+        self, execucao_id: int, itens: List[Dict[str, Any]]
+    ) -> Optional[Tuple[StatusExecucaoEnum, Sequence[ExecucaoPasso]]]:
+        """
+        Grava vários passos de uma execução em um único UPDATE ... FROM (VALUES ...)
+        e consolida o status_geral uma vez, tudo em uma transação. Cada item tem
+        "id" e apenas os campos de CAMPOS_PASSO_LOTE a alterar (os ausentes ficam
+        como estão); com "versao", o passo só é gravado se ela ainda for a atual.
+        Se algum passo estiver desatualizado nada é gravado e ConflitoVersao traz
+        os passos em conflito. Os ids já devem ter sido validados contra a execução.
+        """
+        status_atual = await self._travar_execucao(execucao_id)
+        if status_atual is _SEM_EXECUCAO:
+            return None
+
+        contadores, alterados, contagem_mudou = await self._gravar_lote(execucao_id, itens)
+        ids = [item["id"] for item in itens]
+        if alterados < len(itens):
+            await self.db.rollback()
+            versoes = {item["id"]: item.get("versao") for item in itens}
+            raise ConflitoVersao([
+                passo for passo in await self._get_passos(ids)
+                if versoes[passo.id] is not None and versoes[passo.id] != passo.versao
+            ])
+        status_novo = await self._consolidar_status(execucao_id, status_atual, contadores, contagem_mudou)
+
+        await self.db.commit()
+
+        return status_novo, await self._get_passos(ids)
+
+    async def _gravar_lote(self, execucao_id: int, itens: List[Dict[str, Any]]) -> Tuple[Dict[str, int], int, bool]:
+        """
+        _gravar_passos com um item por passo (UPDATE ... FROM (VALUES ...)): só os
+        campos presentes em cada item mudam; com "versao", o passo só é gravado se
+        ela ainda for a atual. A execução deve estar travada. Não faz commit.
+        """
+        lote = values(
+            column("id", Integer),
+            column("versao", Integer),
+            *[column(campo, Text) for campo in CAMPOS_PASSO_LOTE],
+            *[column(f"definir_{campo}", Boolean) for campo in CAMPOS_PASSO_LOTE],
+            name="lote"
+        ).data([
+            (
+                item["id"],
+                item.get("versao"),
+                *[self._valor_passo(campo, item.get(campo)) for campo in CAMPOS_PASSO_LOTE],
+                *[campo in item for campo in CAMPOS_PASSO_LOTE],
             )
-            result = await self.db.execute(query)
-            return result.scalars().first()
-            
-        return None
+            for item in itens
+        ])
+
+        def novo_valor(campo: str):
+            valor = lote.c[campo]
+            if campo == "status":
+                valor = cast(valor, ExecucaoPasso.status.type)
+            return case((lote.c[f"definir_{campo}"], valor), else_=getattr(ExecucaoPasso, campo))
+
+        return await self._gravar_passos(
+            execucao_id,
+            [
+                ExecucaoPasso.id == lote.c.id,
+                or_(lote.c.versao.is_(None), ExecucaoPasso.versao == lote.c.versao),
+            ],
+            {campo: novo_valor(campo) for campo in CAMPOS_PASSO_LOTE}
+        )
+
+    async def aplicar_jornal(self, usuario_id: int, operacoes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Jornal offline (ver OperacaoJornal) aplicado em uma transação, na ordem.
+        Cada operação vem como dict com "op_id", "tipo", "execucao_id" e, se já
+        rejeitada pelo serviço, "motivo". Devolve op_id -> {"resultado", "motivo",
+        "atual", "repetida"}.
+
+        Operações já sincronizadas antes (operacoes_sincronizadas) não são
+        reaplicadas: devolvem o resultado gravado. A versão de cada operação é
+        comparada com a do início da sincronização. Cada execução recebe as
+        operações na ordem do jornal: os passos entre duas mudanças de status vão
+        num único UPDATE (campos mesclados), e cada mudança de status é gravada
+        entre eles (reteste seguido de passo aprovado termina consolidado a partir
+        do reteste, como online). Faz commit.
+        """
+        # Trava as execuções em ordem de id (sem deadlock entre sincronizações);
+        # o mesmo jornal reenviado em paralelo espera aqui e depois vê as operações gravadas
+        execucao_ids = sorted({op["execucao_id"] for op in operacoes})
+        execucoes = {
+            linha.id: linha for linha in (await self.db.execute(
+                select(ExecucaoTeste.id, ExecucaoTeste.status_geral, ExecucaoTeste.versao)
+                .where(ExecucaoTeste.id == any_(literal(execucao_ids, ARRAY(Integer))))
+                .order_by(ExecucaoTeste.id)
+                .with_for_update()
+            )).all()
+        }
+
+        resultados = {
+            linha.op_id: {**(linha.detalhe or {}), "resultado": linha.resultado, "repetida": True}
+            for linha in (await self.db.execute(
+                select(OperacaoSincronizada.op_id, OperacaoSincronizada.resultado, OperacaoSincronizada.detalhe)
+                .where(
+                    OperacaoSincronizada.usuario_id == usuario_id,
+                    OperacaoSincronizada.op_id == any_(literal([op["op_id"] for op in operacoes], ARRAY(Text))),
+                )
+            )).all()
+        }
+        novas = [op for op in operacoes if op["op_id"] not in resultados]
+
+        passo_ids = list({op["passo_id"] for op in novas if op.get("passo_id") is not None})
+        passos = {}
+        if passo_ids:
+            passos = {
+                linha.id: linha for linha in (await self.db.execute(
+                    select(
+                        ExecucaoPasso.id, ExecucaoPasso.execucao_teste_id, ExecucaoPasso.versao,
+                        ExecucaoPasso.status, ExecucaoPasso.resultado_obtido, ExecucaoPasso.evidencias,
+                    )
+                    .where(ExecucaoPasso.id == any_(literal(passo_ids, ARRAY(Integer))))
+                )).all()
+            }
+
+        # gravar_passos acumula os campos de todo o jornal (base das evidências acrescentadas);
+        # etapas guarda, por execução e na ordem do jornal, lotes {passo_id: campos} e status
+        gravar_passos: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        etapas: Dict[int, List[Any]] = {}
+        for op in novas:
+            resultado = self._avaliar_operacao(op, execucoes, passos, gravar_passos)
+            resultados[op["op_id"]] = resultado
+            if resultado["resultado"] != "aplicada":
+                continue
+            sequencia = etapas.setdefault(op["execucao_id"], [])
+            if op["tipo"] == "status":
+                sequencia.append(StatusExecucaoEnum(op["status"]))
+                continue
+            if not sequencia or not isinstance(sequencia[-1], dict):
+                sequencia.append({})
+            mesclados = gravar_passos[op["execucao_id"]][op["passo_id"]]
+            alterados = ["evidencias"] if op["tipo"] == "evidencia" else [
+                campo for campo in CAMPOS_PASSO_LOTE if op.get(campo) is not None
+            ]
+            sequencia[-1].setdefault(op["passo_id"], {}).update({campo: mesclados[campo] for campo in alterados})
+
+        for execucao_id in sorted(etapas):
+            status_atual = execucoes[execucao_id].status_geral
+            for etapa in etapas[execucao_id]:
+                if isinstance(etapa, dict):
+                    itens = [{"id": passo_id, **campos} for passo_id, campos in etapa.items()]
+                    contadores, _, contagem_mudou = await self._gravar_lote(execucao_id, itens)
+                    status_atual = await self._consolidar_status(execucao_id, status_atual, contadores, contagem_mudou)
+                else:
+                    await self._aplicar_status(execucao_id, status_atual, etapa)
+                    status_atual = etapa
+
+        if novas:
+            await self.db.execute(
+                pg_insert(OperacaoSincronizada)
+                .values([
+                    {
+                        "usuario_id": usuario_id,
+                        "op_id": op["op_id"],
+                        "tipo": op["tipo"],
+                        "execucao_teste_id": op["execucao_id"],
+                        "resultado": resultados[op["op_id"]]["resultado"],
+                        "detalhe": {
+                            chave: resultados[op["op_id"]][chave]
+                            for chave in ("motivo", "atual") if resultados[op["op_id"]].get(chave) is not None
+                        } or None,
+                    }
+                    for op in novas
+                ])
+                .on_conflict_do_nothing()
+            )
+        await self.db.commit()
+        return resultados
+
+    @staticmethod
+    def _avaliar_operacao(op: Dict[str, Any], execucoes: dict, passos: dict, gravar_passos: dict) -> Dict[str, Any]:
+        """
+        Resultado de uma operação do jornal contra o estado do início da
+        sincronização; se aplicada e for de passo, mescla os campos em
+        gravar_passos[execucao_id][passo_id].
+        """
+        if op.get("motivo"):
+            return {"resultado": "rejeitada", "motivo": op["motivo"]}
+        execucao = execucoes.get(op["execucao_id"])
+        if execucao is None:
+            return {"resultado": "rejeitada", "motivo": "Execução não encontrada"}
+
+        if op["tipo"] == "status":
+            if op.get("versao") is not None and op["versao"] != execucao.versao:
+                return {
+                    "resultado": "conflito",
+                    "motivo": "A execução foi alterada por outra pessoa.",
+                    "atual": {
+                        "id": execucao.id,
+                        "versao": execucao.versao,
+                        "status_geral": execucao.status_geral.value if execucao.status_geral else None,
+                    },
+                }
+            return {"resultado": "aplicada"}
+
+        passo = passos.get(op["passo_id"])
+        if passo is None or passo.execucao_teste_id != op["execucao_id"]:
+            return {"resultado": "rejeitada", "motivo": "Passo não pertence à execução"}
+        if op.get("versao") is not None and op["versao"] != passo.versao:
+            return {
+                "resultado": "conflito",
+                "motivo": "O passo foi alterado por outra pessoa.",
+                "atual": {
+                    "id": passo.id,
+                    "versao": passo.versao,
+                    "status": passo.status.value if passo.status else None,
+                    "resultado_obtido": passo.resultado_obtido,
+                    "evidencias": passo.evidencias,
+                },
+            }
+
+        campos = gravar_passos.setdefault(op["execucao_id"], {}).setdefault(passo.id, {})
+        if op["tipo"] == "evidencia":
+            # Acrescenta às evidências já gravadas (ou às que o jornal já definiu para o passo)
+            atuais = campos.get("evidencias", lista_evidencias(passo.evidencias))
+            campos["evidencias"] = atuais + [e for e in op["evidencias"] if e not in atuais]
+        else:
+            campos.update({campo: op[campo] for campo in CAMPOS_PASSO_LOTE if op.get(campo) is not None})
+        return {"resultado": "aplicada"}
+
+    async def gravar_textos_passos(self, textos: Dict[int, Tuple[str, int]]) -> int:
+        """
+        Autosave: grava resultado_obtido de vários passos (passo_id -> (texto,
+        versao do passo na captura)) num único UPDATE ... FROM unnest(...). O
+        autosave não sobe a versao; passo regravado depois da captura (mudança de
+        status, lote, em qualquer worker) fica como está. Renova a reserva das
+        execuções tocadas. Faz commit; devolve quantos passos gravou.
+        """
+        ids = list(textos)
+        # Execução antes dos passos, como em _travar_execucao, e em ordem de id entre
+        # as execuções do lote: sem isso o autosave e a gravação de status se travam mutuamente
+        await self.db.execute(
+            select(ExecucaoTeste.id)
+            .where(ExecucaoTeste.id.in_(
+                select(ExecucaoPasso.execucao_teste_id).where(ExecucaoPasso.id == any_(literal(ids, ARRAY(Integer))))
+            ))
+            .order_by(ExecucaoTeste.id)
+            .with_for_update()
+        )
+        lote = (
+            func.unnest(
+                literal(ids, ARRAY(Integer)),
+                literal([textos[i][0] for i in ids], ARRAY(Text)),
+                literal([textos[i][1] for i in ids], ARRAY(Integer)),
+            )
+            .table_valued(column("id", Integer), column("texto", Text), column("versao", Integer))
+            .render_derived(name="lote")
+        )
+        gravados = (
+            update(ExecucaoPasso)
+            .where(
+                ExecucaoPasso.id == lote.c.id,
+                ExecucaoPasso.versao == lote.c.versao,
+            )
+            .values(resultado_obtido=lote.c.texto)
+            .returning(ExecucaoPasso.execucao_teste_id)
+            .cte("gravados")
+        )
+        renovadas = (
+            update(ExecucaoTeste)
+            .where(
+                ExecucaoTeste.id.in_(select(gravados.c.execucao_teste_id)),
+                ExecucaoTeste.reservado_por_id.isnot(None),
+            )
+            .values(reservado_ate=fim_reserva(), updated_at=ExecucaoTeste.updated_at)
+            .returning(ExecucaoTeste.id)
+            .cte("renovadas")
+        )
+        stmt = select(
+            select(func.count()).select_from(gravados).scalar_subquery(),
+            select(func.count()).select_from(renovadas).scalar_subquery(),
+        )
+        total = (await self.db.execute(stmt)).scalar()
+        await self.db.commit()
+        return total
+
+    @staticmethod
+    def _valor_passo(campo: str, valor: Any) -> Any:
+        # Evidências em lista viram JSON
+        if campo == "evidencias" and isinstance(valor, list):
+            return json.dumps(valor)
+        return valor
+
+    async def _travar_execucao(self, execucao_id: int):
+        """
+        Trava a execução (FOR UPDATE) e devolve o status_geral atual, ou
+        _SEM_EXECUCAO. Toda gravação de passos passa por aqui antes, então os
+        contadores de uma execução nunca são ajustados em paralelo.
+        """
+        row = (await self.db.execute(
+            select(ExecucaoTeste.status_geral).where(ExecucaoTeste.id == execucao_id).with_for_update()
+        )).first()
+        return _SEM_EXECUCAO if row is None else row[0]
+
+    async def _gravar_passos(
+        self, execucao_id: int, condicoes: list, valores: Dict[str, Any], renovar_reserva: bool = True
+    ) -> Tuple[Dict[str, int], int, bool]:
+        """
+        UPDATE dos passos da execução que casam com `condicoes` (subindo a versao
+        de cada um) e, no mesmo statement, ajuste dos contadores de ExecucaoTeste
+        pela diferença entre o status anterior e o novo de cada passo (e renovação
+        da reserva, se houver). Se `valores` mexe nas evidências, ajusta também as
+        referências dos blobs. Devolve os contadores já atualizados, quantos
+        passos foram gravados e se algum contador mudou. A execução deve estar
+        travada. Não faz commit.
+        """
+        # O self-join enxerga a linha antes do UPDATE: é de onde sai o status anterior
+        antigo = aliased(ExecucaoPasso)
+        retorno = [antigo.status.label("anterior"), ExecucaoPasso.status.label("novo")]
+        troca_evidencias = "evidencias" in valores
+        if troca_evidencias:
+            retorno += [antigo.evidencias.label("evidencias_anteriores"), ExecucaoPasso.evidencias.label("evidencias_novas")]
+        alterados = (
+            update(ExecucaoPasso)
+            .where(
+                ExecucaoPasso.execucao_teste_id == execucao_id,
+                antigo.id == ExecucaoPasso.id,
+                *condicoes
+            )
+            .values({**valores, "versao": ExecucaoPasso.versao + 1})
+            .returning(*retorno)
+            .cte("passos_alterados")
+        )
+
+        def delta(status: StatusPassoEnum):
+            return (
+                select(
+                    func.count().filter(_status_passo(alterados.c.novo) == status)
+                    - func.count().filter(_status_passo(alterados.c.anterior) == status)
+                )
+                .select_from(alterados)
+                .scalar_subquery()
+            )
+
+        colunas = [getattr(ExecucaoTeste, coluna) for coluna in CONTADORES_PASSOS.values()]
+        novos_valores = {
+            coluna: getattr(ExecucaoTeste, coluna) + delta(status)
+            for status, coluna in CONTADORES_PASSOS.items()
+        }
+        if renovar_reserva:
+            # Atividade nos passos mantém a reserva de quem está executando
+            novos_valores["reservado_ate"] = case(
+                (ExecucaoTeste.reservado_por_id.isnot(None), fim_reserva()),
+                else_=ExecucaoTeste.reservado_ate
+            )
+        total_alterados = select(func.count()).select_from(alterados).scalar_subquery()
+        status_trocados = (
+            select(func.count().filter(_status_passo(alterados.c.novo) != _status_passo(alterados.c.anterior)))
+            .select_from(alterados)
+            .scalar_subquery()
+        )
+        trocas = null()
+        if troca_evidencias:
+            trocas = (
+                select(func.json_agg(
+                    func.json_build_array(alterados.c.evidencias_anteriores, alterados.c.evidencias_novas),
+                    type_=JSON
+                ))
+                .select_from(alterados)
+                .scalar_subquery()
+            )
+        stmt = (
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.id == execucao_id)
+            .values(novos_valores)
+            .returning(*colunas, total_alterados, status_trocados, trocas)
+            .execution_options(synchronize_session=False)
+        )
+        *row, total, trocados, evidencias = (await self.db.execute(stmt)).one()
+        if evidencias:
+            await self.evidencias.ajustar_referencias(delta_referencias(evidencias))
+        return dict(zip(CONTADORES_PASSOS.values(), row)), total, trocados > 0
+
+    async def _consolidar_status(
+        self, execucao_id: int, status_atual: Optional[StatusExecucaoEnum], contadores: Dict[str, int],
+        contagem_mudou: bool
+    ) -> Optional[StatusExecucaoEnum]:
+        """
+        Aplica status_consolidado a partir dos contadores; só grava se o status
+        mudar. Sem mudança de status, contadores alterados ainda sobem as versões
+        (ETag): o progresso dos passos é servido nas listas de ciclos e execuções.
+        """
+        status_novo = status_consolidado(
+            status_atual,
+            sum(contadores.values()),
+            contadores["passos_aprovados"],
+            contadores["passos_reprovados"]
+        )
+        if status_novo is None or status_novo == status_atual:
+            if contagem_mudou:
+                await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id == execucao_id))
+            return status_atual
+        await self._aplicar_status(execucao_id, status_atual, status_novo)
+        return status_novo
 
-    async def update_status_geral(self, exec_id: int, status: StatusExecucaoEnum) -> Optional[ExecucaoTeste]:
-        return await self.update_status(exec_id, status)
+    async def update_status_geral(
+        self, exec_id: int, status: StatusExecucaoEnum, versao: Optional[int] = None
+    ) -> Optional[ExecucaoTeste]:
+        return await self.update_status(exec_id, status, versao)
 
     async def listar_passos(self, execucao_id: int):
         query = select(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id == execucao_id)
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def update_status(self, id: int, status: StatusExecucaoEnum):
+    async def update_status(self, id: int, status: StatusExecucaoEnum, versao: Optional[int] = None):
+        """
+        Com `versao`, só grava se ela ainda for a atual; senão ConflitoVersao com
+        a execução atual. None se a execução não existe.
+        """
+        filtro = ExecucaoTeste.id == id
+        condicoes = [filtro]
+        if versao is not None:
+            condicoes.append(ExecucaoTeste.versao == versao)
+
+        # Trava a linha para que o delta do rollup saia do status realmente substituído
+        linha = (await self.db.execute(
+            select(ExecucaoTeste.status_geral).where(*condicoes).with_for_update()
+        )).first()
+        if linha is None:
+            if versao is None or not await self.existe(id):
+                return None
+            raise ConflitoVersao(await self.get_by_id(id))
+        await self._aplicar_status(id, linha[0], status)
+
+        await self.db.commit()
+        
+        return await self.get_by_id(id)
+
+    async def _aplicar_status(self, id: int, status_anterior: Optional[StatusExecucaoEnum], status: StatusExecucaoEnum):
+        """
+        Grava o novo status_geral com rollups, fato diário, histórico e aviso de
+        alteração. A linha já deve estar travada (FOR UPDATE). Não faz commit.
+        """
+        filtro = ExecucaoTeste.id == id
+        await self.rollup.registrar_execucoes(filtro, -1)
+
+        valores = {"status_geral": status, "versao": ExecucaoTeste.versao + 1}
+        if status in STATUS_FINAIS:
+            # Execução concluída sai da fila: a reserva acaba junto
+            valores.update(reservado_por_id=None, reservado_ate=None)
         stmt = (
             update(ExecucaoTeste)
             .where(ExecucaoTeste.id == id)
-            .values(status_geral=status)
+            .values(valores)
             .execution_options(synchronize_session="fetch")
         )
         await self.db.execute(stmt)
+        await self.rollup.registrar_execucoes(filtro, 1)
+        if status in STATUS_FINAIS and status_anterior not in STATUS_FINAIS:
+            await self.rollup.registrar_conclusao(filtro)
+        if status != status_anterior:
+            await self._registrar_transicao(id, status_anterior, status)
+        await publicar_alteracao(self.db, escopo_execucoes(filtro))
 
         if status == StatusExecucaoEnum.reteste:
-            stmt_passos = (
-                update(ExecucaoPasso)
-                .where(
-                    ExecucaoPasso.execucao_teste_id == id,
-                    ExecucaoPasso.status == StatusPassoEnum.reprovado
-                )
-                .values(
-                    status=StatusPassoEnum.pendente,
-                    resultado_obtido="",
-                    evidencias="[]"
-                )
+            await self._gravar_passos(id, [ExecucaoPasso.status == StatusPassoEnum.reprovado], {
+                "status": StatusPassoEnum.pendente,
+                "resultado_obtido": "",
+                "evidencias": "[]"
+            }, renovar_reserva=False)
+
+    async def _registrar_transicao(self, id: int, status_anterior: Optional[StatusExecucaoEnum], status: StatusExecucaoEnum):
+        """Acrescenta a transição ao histórico. Não faz commit."""
+        tipo_status = HistoricoStatusExecucao.status_novo.type
+
+        duracao = null()
+        if status in STATUS_FINAIS:
+            # Início = última entrada em em_progresso depois da conclusão anterior (se houver)
+            anterior = aliased(HistoricoStatusExecucao)
+            ultima_conclusao = (
+                select(func.max(anterior.id))
+                .where(anterior.execucao_teste_id == id, anterior.status_novo.in_(STATUS_FINAIS))
+                .scalar_subquery()
             )
-            await self.db.execute(stmt_passos)
+            desde_conclusao = and_(
+                HistoricoStatusExecucao.execucao_teste_id == id,
+                HistoricoStatusExecucao.id > func.coalesce(ultima_conclusao, 0)
+            )
+            em_progresso = (
+                select(func.max(HistoricoStatusExecucao.created_at))
+                .where(desde_conclusao, HistoricoStatusExecucao.status_novo == StatusExecucaoEnum.em_progresso)
+                .scalar_subquery()
+            )
+            # Sem em_progresso (caso de um passo, finalização manual, lote, jornal): a primeira
+            # entrada depois da conclusão anterior (ex.: o reteste) ou, na primeira rodada, a criação
+            primeira_entrada = (
+                select(func.min(HistoricoStatusExecucao.created_at)).where(desde_conclusao).scalar_subquery()
+            )
+            inicio = func.coalesce(
+                em_progresso,
+                primeira_entrada,
+                case((ultima_conclusao.is_(None), ExecucaoTeste.created_at), else_=null())
+            )
+            duracao = cast(func.extract("epoch", func.now() - inicio), Integer)
 
-        await self.db.commit()
-        
-        return await self.get_by_id(id)
+        origem = (
+            select(
+                ExecucaoTeste.id,
+                literal(status_anterior, tipo_status) if status_anterior is not None else null(),
+                literal(status, tipo_status),
+                duracao,
+                ExecucaoTeste.responsavel_id,
+                ExecucaoTeste.caso_teste_id,
+                ExecucaoTeste.ciclo_teste_id,
+                CasoTeste.projeto_id,
+                Projeto.modulo_id,
+            )
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .where(ExecucaoTeste.id == id)
+        )
+        await self.db.execute(
+            insert(HistoricoStatusExecucao).from_select(
+                [
+                    "execucao_teste_id", "status_anterior", "status_novo", "duracao_segundos",
+                    "responsavel_id", "caso_teste_id", "ciclo_teste_id", "projeto_id", "modulo_id",
+                ],
+                origem
+            )
+        )
 
-    async def atualizar_status_geral(self, execucao_id: int, novo_status: StatusExecucaoEnum):
-        return await self.update_status(execucao_id, novo_status)
\ No newline at end of file
+    async def atualizar_status_geral(
+        self, execucao_id: int, novo_status: StatusExecucaoEnum, versao: Optional[int] = None
+    ):
+        return await self.update_status(execucao_id, novo_status, versao)
\ No newline at end of file
@@ -8,15 +8,22 @@ from app.models.testing import (
     ExecucaoTeste, ExecucaoPasso, 
     Defeito
 )
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.core.eventos import publicar_alteracao, escopo_execucoes, escopo_projetos
 
 class ProjetoRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = DashboardRollupRepository(db)
+        self.evidencias = EvidenciaRepository(db)
 
     async def create(self, projeto_data: Projeto) -> Projeto:
         db_projeto = Projeto(**projeto_data.model_dump())
         
         self.db.add(db_projeto)
+        await self.db.flush()
+        await publicar_alteracao(self.db, escopo_projetos(Projeto.id == db_projeto.id))
         await self.db.commit()
         await self.db.refresh(db_projeto)
         return db_projeto
@@ -37,6 +44,10 @@ class ProjetoRepository:
         return result.scalars().first()
     
     async def update(self, id: int, update_data: dict) -> Optional[Projeto]:
+        # Mudando de sistema, o sistema de origem também precisa ser avisado
+        if "sistema_id" in update_data:
+            await publicar_alteracao(self.db, escopo_projetos(Projeto.id == id))
+
         query = (
             update(Projeto)
             .where(Projeto.id == id)
@@ -44,8 +55,16 @@ class ProjetoRepository:
             .returning(Projeto)
         )
         result = await self.db.execute(query)
+        projeto = result.scalars().first()
+
+        # Os rollups são chaveados por sistema/módulo: mover o projeto exige recalcular
+        if projeto and ({"modulo_id", "sistema_id"} & update_data.keys()):
+            await self.rollup.recalcular(projeto_id=id)
+
+        if projeto:
+            await publicar_alteracao(self.db, escopo_projetos(Projeto.id == id))
         await self.db.commit()
-        return result.scalars().first()
+        return projeto
 
     async def delete(self, id: int) -> bool:
         
@@ -63,14 +82,27 @@ class ProjetoRepository:
                 ExecucaoTeste.ciclo_teste_id.in_(ciclos_ids) if ciclos_ids else False
             )
         )
-        result_execs = await self.db.execute(query_execs)
+        result_execs = await self.db.execute(query_execs.with_for_update())
         execs_ids = result_execs.scalars().all()
         
         if execs_ids:
-            await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)))
+            await self.db.execute(
+                select(Defeito.id).where(Defeito.execucao_teste_id.in_(execs_ids)).with_for_update()
+            )
+            await self.rollup.registrar_defeitos(Defeito.execucao_teste_id.in_(execs_ids), -1)
+            await self.rollup.registrar_execucoes(ExecucaoTeste.id.in_(execs_ids), -1)
+            await publicar_alteracao(self.db, escopo_execucoes(ExecucaoTeste.id.in_(execs_ids)))
+            passos = await self.db.execute(
+                delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)).returning(ExecucaoPasso.evidencias)
+            )
+            defeitos = await self.db.execute(
+                delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)).returning(Defeito.evidencias)
+            )
+            await self.evidencias.liberar([*passos.scalars().all(), *defeitos.scalars().all()])
             await self.db.execute(delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)))
 
+        await publicar_alteracao(self.db, escopo_projetos(Projeto.id == id))
+
         if casos_ids:
             await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.caso_teste_id.in_(casos_ids)))
             await self.db.execute(delete(CasoTeste).where(CasoTeste.id.in_(casos_ids)))
@@ -87,4 +87,20 @@ class CasoTesteResponse(CasoTesteBase):
 
     passos: List[PassoCasoTesteResponse] = [] 
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class CasoTesteCompacto(CasoTesteBase):
+    """CasoTesteResponse sem os passos (na visão "full" eles vêm uma vez em passos_template)."""
+    id: int
+    projeto_id: int
+    responsavel_id: Optional[int] = None
+    ciclo_id: Optional[int] = None
+
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    projeto: Optional[ProjetoSimple] = None
+    responsavel: Optional[UsuarioSimple] = None
+    ciclo: Optional[CicloSimple] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -27,5 +27,7 @@ class CicloTesteResponse(CicloTesteBase):
     updated_at: Optional[datetime] = None
     total_testes: int = 0
     testes_concluidos: int = 0
+    passos_total: int = 0
+    passos_concluidos: int = 0
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -29,6 +29,8 @@ class DashboardCharts(BaseModel):
 class DashboardResponse(BaseModel):
     kpis: DashboardKPI
     charts: DashboardCharts
+    # Momento a que os dados se referem (último refresh, no modo de views materializadas)
+    as_of: Optional[datetime] = None
 
 # Schemas do Dashboard do Executor 
 
@@ -62,6 +64,25 @@ class RunnerDashboardCharts(BaseModel):
     ranking_produtividade: List[RunnerRankingData] = []
     status_distribuicao: List[StatusDistributionData] = []
     timeline: List[TimelineItem] = []
+    distribuicao_duracao: List[ChartDataPoint] = []
+
+class RunnerEquipeItem(BaseModel):
+    id: int
+    nome: str
+    kpis: RunnerKPI
+    status_distribuicao: List[StatusDistributionData] = []
+
+class EquipeRunnersResponse(BaseModel):
+    total: int
+    itens: List[RunnerEquipeItem] = []
+
+class DuracaoExecucaoData(BaseModel):
+    id: int
+    nome: str
+    total: int
+    media_minutos: float
+    p50_minutos: float
+    p95_minutos: float
 
 class RunnerDashboardResponse(BaseModel):
     kpis: RunnerKPI
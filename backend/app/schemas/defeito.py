@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import Optional, List, Union, Any
 import json
 from app.models.testing import StatusDefeitoEnum, SeveridadeDefeitoEnum
-from .execucao_teste import ExecucaoTesteResponse
+from .execucao_teste import ExecucaoTesteResponse, ExecucaoTesteCompleta
 
 class DefeitoBase(BaseModel):
     # Permite que o frontend envie campos extras (como 'files') sem dar erro 422
@@ -95,4 +95,32 @@ class DefeitoResponse(DefeitoBase):
     responsavel_teste_nome: Optional[str] = None
     responsavel_projeto_nome: Optional[str] = None
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class DefeitoResumo(DefeitoBase):
+    """Visão "summary": colunas do defeito e nomes, sem a execução."""
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    caso_teste_nome: Optional[str] = None
+    projeto_nome: Optional[str] = None
+    responsavel_teste_nome: Optional[str] = None
+    responsavel_projeto_nome: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DefeitoCompleto(DefeitoBase):
+    """Visão "full": defeito com a execução no formato normalizado."""
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    execucao: Optional[ExecucaoTesteCompleta] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def de_defeito(cls, defeito) -> "DefeitoCompleto":
+        completo = cls.model_validate(defeito)
+        if defeito.execucao is not None:
+            completo.execucao = ExecucaoTesteCompleta.de_execucao(defeito.execucao)
+        return completo
@@ -1,9 +1,13 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import List, Optional, Union # <--- Adicionado Union
+from enum import Enum
+from typing import Any, Dict, List, Literal, Optional, Union # <--- Adicionado Union
 
-from app.schemas.caso_teste import CasoTesteResponse, UsuarioSimple, PassoCasoTesteResponse
-from app.models.testing import StatusExecucaoEnum
+from app.schemas.caso_teste import CasoTesteResponse, CasoTesteCompacto, UsuarioSimple, PassoCasoTesteResponse
+from app.models.testing import StatusExecucaoEnum, PrioridadeEnum, StatusCasoTesteEnum
+
+# Formato da resposta (?view=); sem o parâmetro a resposta mantém o formato antigo
+VisaoExecucao = Literal["summary", "full"]
 
 class ExecucaoTesteBase(BaseModel):
     ciclo_teste_id: int
@@ -26,11 +30,27 @@ class ExecucaoPassoUpdate(BaseModel):
     resultado_obtido: Optional[str] = None
     # ALTERAÇÃO: Aceita Lista ou String
     evidencias: Optional[Union[List[str], str]] = None 
+    # Versão lida do passo; se informada, só grava se ainda for a atual (senão 409)
+    versao: Optional[int] = None
+
+class AutosavePasso(BaseModel):
+    resultado_obtido: str
+
+class AutosavePassoResponse(BaseModel):
+    passo_id: int
+    gravacao_em_ms: int # prazo máximo até o texto ser gravado
+
+class ExecucaoPassoLoteItem(ExecucaoPassoUpdate):
+    id: int # id do passo da execução (ExecucaoPasso)
+
+class ExecucaoPassosLote(BaseModel):
+    passos: List[ExecucaoPassoLoteItem] = Field(..., min_length=1, max_length=500)
 
 class ExecucaoPassoResponse(ExecucaoPassoBase):
     id: int
     execucao_teste_id: int
     passo_caso_teste_id: int
+    versao: int = 1
     
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -41,6 +61,8 @@ class ExecucaoPassoResponse(ExecucaoPassoBase):
 
 class ExecucaoTesteResponse(ExecucaoTesteBase):
     id: int
+    responsavel_id: Optional[int] = None # execuções do planejamento podem aguardar atribuição
+    versao: int = 1
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -48,4 +70,203 @@ class ExecucaoTesteResponse(ExecucaoTesteBase):
     responsavel: Optional[UsuarioSimple] = None
     passos_executados: List[ExecucaoPassoResponse] = []
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    # Progresso sem depender de passos_executados
+    passos_total: int = 0
+    passos_pendentes: int = 0
+    passos_aprovados: int = 0
+    passos_reprovados: int = 0
+    passos_bloqueados: int = 0
+
+    reservado_por_id: Optional[int] = None
+    reservado_ate: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ReservaExecucaoResponse(BaseModel):
+    execucao_id: int
+    reservado_ate: datetime
+
+class EvidenciaUploadResponse(BaseModel):
+    url: str
+    nome: str
+    sha256: str
+    tamanho: int # bytes
+    content_type: str
+    reaproveitada: bool = False # conteúdo já existia no repositório de blobs: nada foi gravado
+    previews: Dict[str, str] = {} # variante (miniatura, media) -> URL; só para imagens
+
+class EvidenciaUploadDiretoCreate(BaseModel):
+    sha256: str
+    tamanho: int = Field(..., gt=0) # bytes
+    content_type: str
+
+class EvidenciaUploadDiretoResponse(BaseModel):
+    # Conteúdo já existe: nada a enviar, `evidencia` já é o resultado final
+    evidencia: Optional[EvidenciaUploadResponse] = None
+    # Senão: PUT do arquivo em `url` com `headers`, até `expira_em`, e depois concluir com `caminho`
+    url: Optional[str] = None
+    metodo: str = "PUT"
+    headers: Dict[str, str] = {}
+    caminho: Optional[str] = None
+    expira_em: Optional[datetime] = None
+
+class EvidenciaUploadDiretoConcluir(BaseModel):
+    sha256: str
+    caminho: str
+    content_type: str
+
+class ExecucaoPassosLoteResponse(BaseModel):
+    execucao_id: int
+    status_geral: StatusExecucaoEnum
+    passos: List[ExecucaoPassoResponse]
+
+class TipoOperacaoJornalEnum(str, Enum):
+    passo = "passo"         # status/resultado_obtido/evidencias de um passo (os ausentes ficam como estão)
+    evidencia = "evidencia" # acrescenta referências às evidências do passo
+    status = "status"       # status_geral da execução
+
+class OperacaoJornal(BaseModel):
+    op_id: str = Field(..., min_length=1, max_length=64) # gerado no cliente (UUID); reenvio não reaplica
+    tipo: TipoOperacaoJornalEnum
+    execucao_id: int
+    passo_id: Optional[int] = None
+    status: Optional[str] = None
+    resultado_obtido: Optional[str] = None
+    evidencias: Optional[List[str]] = None
+    # Versão do passo (ou da execução, em "status") quando a operação foi capturada; diferente da atual, é conflito
+    versao: Optional[int] = None
+
+class JornalSincronizacao(BaseModel):
+    operacoes: List[OperacaoJornal] = Field(..., min_length=1, max_length=1000) # na ordem em que foram capturadas
+
+class ResultadoOperacaoEnum(str, Enum):
+    aplicada = "aplicada"
+    conflito = "conflito"   # versão desatualizada; `atual` traz o estado gravado
+    rejeitada = "rejeitada" # operação inválida (passo/execução inexistente, status inválido)
+
+class ResultadoOperacao(BaseModel):
+    op_id: str
+    resultado: ResultadoOperacaoEnum
+    motivo: Optional[str] = None
+    atual: Optional[Dict[str, Any]] = None
+    repetida: bool = False # já sincronizada antes: resultado da primeira vez, nada reaplicado
+
+class SincronizacaoResponse(BaseModel):
+    aplicadas: int
+    conflitos: int
+    rejeitadas: int
+    repetidas: int
+    operacoes: List[ResultadoOperacao]
+
+class ExecucaoTesteResumo(BaseModel):
+    """Visão "summary": colunas da execução e nomes, sem caso, passos ou resultados."""
+    id: int
+    ciclo_teste_id: int
+    caso_teste_id: int
+    responsavel_id: Optional[int] = None
+    status_geral: StatusExecucaoEnum
+    versao: int = 1
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    caso_teste_nome: Optional[str] = None
+    ciclo_nome: Optional[str] = None
+    projeto_id: Optional[int] = None
+    projeto_nome: Optional[str] = None
+    responsavel_nome: Optional[str] = None
+
+    passos_total: int = 0
+    passos_pendentes: int = 0
+    passos_aprovados: int = 0
+    passos_reprovados: int = 0
+    passos_bloqueados: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ExecucaoPassoCompacto(ExecucaoPassoBase):
+    """Resultado de um passo sem o template; liga-se a passos_template por passo_caso_teste_id."""
+    status: Optional[str] = None
+    id: int
+    passo_caso_teste_id: int
+    versao: int = 1
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ExecucaoTesteCompleta(ExecucaoTesteBase):
+    """
+    Visão "full" normalizada: o texto de cada passo do caso vem uma única vez em
+    passos_template, e passos_executados traz só os resultados.
+    """
+    id: int
+    versao: int = 1
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    caso_teste: Optional[CasoTesteCompacto] = None
+    responsavel: Optional[UsuarioSimple] = None
+    passos_template: List[PassoCasoTesteResponse] = []
+    passos_executados: List[ExecucaoPassoCompacto] = []
+
+    passos_total: int = 0
+    passos_pendentes: int = 0
+    passos_aprovados: int = 0
+    passos_reprovados: int = 0
+    passos_bloqueados: int = 0
+
+    reservado_por_id: Optional[int] = None
+    reservado_ate: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def de_execucao(cls, execucao) -> "ExecucaoTesteCompleta":
+        completa = cls.model_validate(execucao)
+        if execucao.caso_teste is not None:
+            completa.passos_template = [
+                PassoCasoTesteResponse.model_validate(p) for p in execucao.caso_teste.passos
+            ]
+        return completa
+
+class RegraAtribuicaoEnum(str, Enum):
+    responsavel_do_caso = "responsavel_do_caso" # responsavel_id do caso; responsavel_id do lote se o caso não tiver
+    fixo = "fixo"                               # todos para responsavel_id
+    rodizio = "rodizio"                         # alterna entre responsaveis_ids, na ordem dos casos
+    sem_responsavel = "sem_responsavel"         # nenhum: a carga do ciclo é distribuída depois (atribuir_ciclo)
+
+class PlanejamentoLote(BaseModel):
+    # Casos: lista explícita ou filtro sobre os casos do projeto do ciclo
+    caso_teste_ids: Optional[List[int]] = Field(None, max_length=20000)
+    prioridade: Optional[PrioridadeEnum] = None
+    status_caso: Optional[StatusCasoTesteEnum] = None
+    apenas_casos_do_ciclo: bool = False # só casos com ciclo_id igual ao ciclo planejado
+
+    regra: RegraAtribuicaoEnum = RegraAtribuicaoEnum.responsavel_do_caso
+    responsavel_id: Optional[int] = None
+    responsaveis_ids: List[int] = Field([], max_length=500)
+
+class PlanejamentoLoteResponse(BaseModel):
+    ciclo_teste_id: int
+    casos_selecionados: int
+    execucoes_criadas: int
+    passos_criados: int
+    ja_planejados: int = 0      # casos que já tinham execução no ciclo
+    sem_responsavel: int = 0    # sem responsável: ignorados (responsavel_do_caso) ou criados na fila (regra sem_responsavel)
+    por_responsavel: Dict[int, int] = {}
+
+class AtribuicaoCiclo(BaseModel):
+    usuarios_ids: List[int] = Field(..., min_length=1, max_length=500)
+    redistribuir: bool = False # também redistribui as pendentes já atribuídas (sem reserva ativa)
+    simular: bool = False      # só calcula a distribuição, sem gravar
+
+class CargaUsuario(BaseModel):
+    usuario_id: int
+    execucoes_novas: int
+    custo_novas_segundos: int
+    carga_total_segundos: int   # inclui o que o usuário já tinha pendente no ciclo
+
+class AtribuicaoCicloResponse(BaseModel):
+    ciclo_teste_id: int
+    simulacao: bool
+    execucoes_atribuidas: int
+    carga_por_usuario: List[CargaUsuario]
@@ -42,6 +42,7 @@ async def seed_execucoes(session: AsyncSession):
                     resultado_obtido=""
                 )
                 session.add(new_step)
+            new_exec.passos_pendentes = len(case.passos)
             
             count_exec += 1
 
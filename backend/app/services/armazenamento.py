@@ -0,0 +1,199 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+
+from app.core.config import settings
+
+class Armazenamento:
+    """
+    Onde ficam os arquivos de evidência (blobs e prévias), por caminho
+    relativo (blobs/ab/cd/<sha256><ext>). Os uploads que passam pela API
+    continuam chegando num temporário local (.parcial-* em EVIDENCIAS_DIR) e
+    são publicados aqui; o upload direto usa url_upload e a API só registra
+    o blob depois. Escolhido por EVIDENCIAS_ARMAZENAMENTO.
+    """
+
+    async def publicar(self, parcial: str, caminho: str, content_type: str):
+        """
+        Move o temporário local para `caminho` (o temporário deixa de existir).
+        `content_type` é o tipo já validado, gravado no objeto quando o
+        armazenamento guarda metadados (S3).
+        """
+        raise NotImplementedError
+
+    async def remover(self, caminho: str):
+        """Remove o arquivo; ausente não é erro."""
+        raise NotImplementedError
+
+    async def tamanho(self, caminho: str) -> Optional[int]:
+        """Bytes do arquivo, ou None se não existe."""
+        raise NotImplementedError
+
+    async def existe(self, caminho: str) -> bool:
+        return await self.tamanho(caminho) is not None
+
+    def arquivo_local(self, caminho: str):
+        """Context manager assíncrono com um caminho local legível do arquivo (prévias)."""
+        raise NotImplementedError
+
+    def url_download(self, caminho: str, nome_download: Optional[str] = None) -> str:
+        """URL de leitura de curta duração (EVIDENCIA_URL_EXPIRA_SEGUNDOS)."""
+        raise NotImplementedError
+
+    def url_upload(self, caminho: str, content_type: str, sha256: str) -> Tuple[str, Dict[str, str]]:
+        """URL para PUT direto de curta duração e os cabeçalhos que o cliente deve enviar junto."""
+        raise NotImplementedError
+
+def _remover_local(arquivo: str):
+    try:
+        os.remove(arquivo)
+    except FileNotFoundError:
+        pass
+
+def _publicar_local(parcial: str, destino: str):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(parcial, destino)
+
+def _tamanho_local(arquivo: str) -> Optional[int]:
+    try:
+        return os.stat(arquivo).st_size
+    except FileNotFoundError:
+        return None
+
+class ArmazenamentoLocal(Armazenamento):
+    """
+    Disco local (EVIDENCIAS_DIR), servido pela própria API em /evidencias. O
+    upload direto é um PUT em /evidencias/<caminho> com assinatura HMAC
+    (SECRET_KEY) e validade: mesmo protocolo do S3 para o cliente, embora os
+    bytes ainda passem pelo worker.
+    """
+
+    def arquivo(self, caminho: str) -> str:
+        return os.path.join(settings.EVIDENCIAS_DIR, caminho)
+
+    async def publicar(self, parcial: str, caminho: str, content_type: str):
+        await anyio.to_thread.run_sync(_publicar_local, parcial, self.arquivo(caminho))
+
+    async def remover(self, caminho: str):
+        await anyio.to_thread.run_sync(_remover_local, self.arquivo(caminho))
+
+    async def tamanho(self, caminho: str) -> Optional[int]:
+        return await anyio.to_thread.run_sync(_tamanho_local, self.arquivo(caminho))
+
+    @asynccontextmanager
+    async def arquivo_local(self, caminho: str) -> AsyncIterator[str]:
+        yield self.arquivo(caminho)
+
+    def url_download(self, caminho: str, nome_download: Optional[str] = None) -> str:
+        return f"{settings.PUBLIC_BASE_URL.rstrip('/')}/evidencias/{caminho}"
+
+    def _assinatura(self, caminho: str, content_type: str, expira: int) -> str:
+        mensagem = f"PUT\n{caminho}\n{content_type}\n{expira}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), mensagem, hashlib.sha256).hexdigest()
+
+    def url_upload(self, caminho: str, content_type: str, sha256: str) -> Tuple[str, Dict[str, str]]:
+        expira = int(time.time()) + settings.EVIDENCIA_URL_EXPIRA_SEGUNDOS
+        url = (
+            f"{settings.PUBLIC_BASE_URL.rstrip('/')}/evidencias/{caminho}"
+            f"?expira={expira}&assinatura={self._assinatura(caminho, content_type, expira)}"
+        )
+        return url, {"Content-Type": content_type}
+
+    def assinatura_valida(self, caminho: str, content_type: str, expira: str, assinatura: str) -> bool:
+        if not expira.isdigit() or int(expira) < time.time():
+            return False
+        return hmac.compare_digest(self._assinatura(caminho, content_type, int(expira)), assinatura)
+
+class ArmazenamentoS3(Armazenamento):
+    """
+    Bucket S3 ou compatível (S3_ENDPOINT_URL: MinIO do docker-compose, perfil
+    "s3"). Downloads e uploads diretos por URL pré-assinada; os bytes não
+    passam pela API. boto3 só é importado com este backend ativo.
+    """
+
+    def __init__(self):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = settings.S3_BUCKET
+        self.prefixo = settings.S3_PREFIXO
+        self.cliente = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGIAO,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            # Endpoint próprio (MinIO) costuma não ter DNS por bucket
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path" if settings.S3_ENDPOINT_URL else "auto"}),
+        )
+
+    def chave(self, caminho: str) -> str:
+        return f"{self.prefixo}{caminho}"
+
+    def _publicar(self, parcial: str, caminho: str, content_type: str):
+        # upload_file divide arquivos grandes em partes enviadas em paralelo
+        self.cliente.upload_file(parcial, self.bucket, self.chave(caminho), ExtraArgs={
+            "ContentType": content_type,
+            "CacheControl": "public, max-age=31536000, immutable",
+        })
+        _remover_local(parcial)
+
+    async def publicar(self, parcial: str, caminho: str, content_type: str):
+        await anyio.to_thread.run_sync(self._publicar, parcial, caminho, content_type)
+
+    async def remover(self, caminho: str):
+        await anyio.to_thread.run_sync(lambda: self.cliente.delete_object(Bucket=self.bucket, Key=self.chave(caminho)))
+
+    def _tamanho(self, caminho: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=self.chave(caminho))["ContentLength"]
+        except ClientError as erro:
+            if erro.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def tamanho(self, caminho: str) -> Optional[int]:
+        return await anyio.to_thread.run_sync(self._tamanho, caminho)
+
+    @asynccontextmanager
+    async def arquivo_local(self, caminho: str) -> AsyncIterator[str]:
+        temporario = os.path.join(settings.EVIDENCIAS_DIR, f".parcial-{uuid.uuid4()}")
+        try:
+            await anyio.to_thread.run_sync(self.cliente.download_file, self.bucket, self.chave(caminho), temporario)
+            yield temporario
+        finally:
+            await anyio.to_thread.run_sync(_remover_local, temporario)
+
+    def url_download(self, caminho: str, nome_download: Optional[str] = None) -> str:
+        parametros = {"Bucket": self.bucket, "Key": self.chave(caminho)}
+        if nome_download:
+            parametros["ResponseContentDisposition"] = f'attachment; filename="{nome_download}"'
+        return self.cliente.generate_presigned_url(
+            "get_object", Params=parametros, ExpiresIn=settings.EVIDENCIA_URL_EXPIRA_SEGUNDOS
+        )
+
+    def url_upload(self, caminho: str, content_type: str, sha256: str) -> Tuple[str, Dict[str, str]]:
+        # O checksum entra na assinatura: o S3 recusa o PUT se o conteúdo não tiver este SHA-256
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.cliente.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": self.chave(caminho), "ContentType": content_type, "ChecksumSHA256": checksum},
+            ExpiresIn=settings.EVIDENCIA_URL_EXPIRA_SEGUNDOS,
+        )
+        return url, {"Content-Type": content_type, "x-amz-checksum-sha256": checksum}
+
+def criar_armazenamento() -> Armazenamento:
+    if settings.EVIDENCIAS_ARMAZENAMENTO == "s3":
+        return ArmazenamentoS3()
+    return ArmazenamentoLocal()
+
+armazenamento = criar_armazenamento()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+
+logger = logging.getLogger(__name__)
+
+class BufferAutosavePassos:
+    """
+    Autosave do resultado_obtido dos passos (write-behind). Cada worker guarda
+    só o último texto de cada passo e grava todos num UPDATE em lote a cada
+    AUTOSAVE_INTERVALO_MS: uma rajada de digitação vira uma escrita por passo.
+
+    Mudança de status leva junto o texto pendente do passo (retirando) ou
+    descarrega o buffer antes (descarregar), e o shutdown descarrega o que
+    restar. Cada texto guarda a versao do passo lida no banco na captura: o
+    lote só grava se o passo ainda estiver nela, então uma gravação mais nova
+    feita em qualquer worker prevalece e o texto descartado é registrado no log.
+    Só se perde o que estava no buffer se o processo morrer sem shutdown.
+    """
+
+    def __init__(self):
+        self._pendentes: Dict[int, Tuple[str, int]] = {}
+        self._cheio = asyncio.Event()
+        self._trava = asyncio.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def registrar(self, passo_id: int, texto: str, versao: int):
+        # A versao da captura impede que o lote sobrescreva uma gravação mais nova do passo
+        self._pendentes[passo_id] = (texto, versao)
+        if len(self._pendentes) >= settings.AUTOSAVE_MAX_PENDENTES:
+            self._cheio.set()
+
+    @contextmanager
+    def retirando(self, passos_ids: Iterable[int]) -> Iterator[Dict[int, str]]:
+        """
+        Tira os textos pendentes dos passos para que a gravação explícita os leve
+        junto. Se a gravação falhar (conflito de versão, 404, erro do banco) eles
+        voltam para o buffer.
+        """
+        retirados = {passo_id: self._pendentes.pop(passo_id) for passo_id in passos_ids if passo_id in self._pendentes}
+        try:
+            yield {passo_id: texto for passo_id, (texto, _) in retirados.items()}
+        except BaseException:
+            self._devolver(retirados)
+            raise
+
+    def _devolver(self, lote: Dict[int, Tuple[str, int]]):
+        # O que foi digitado depois (registrar) prevalece sobre o texto devolvido
+        for passo_id, item in lote.items():
+            self._pendentes.setdefault(passo_id, item)
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        try:
+            await self.descarregar()
+        except Exception:
+            logger.exception("Erro ao descarregar o autosave dos passos no shutdown")
+
+    async def descarregar(self) -> int:
+        async with self._trava:
+            lote, self._pendentes = self._pendentes, {}
+            if not lote:
+                return 0
+            try:
+                async with AsyncSessionLocal() as sessao:
+                    gravados = await ExecucaoTesteRepository(sessao).gravar_textos_passos(lote)
+            except Exception:
+                self._devolver(lote)
+                raise
+            if gravados < len(lote):
+                logger.warning(
+                    "Autosave descartou %d de %d textos: passos regravados depois da captura",
+                    len(lote) - gravados, len(lote)
+                )
+            return gravados
+
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), timeout=settings.AUTOSAVE_INTERVALO_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+            try:
+                await self.descarregar()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao gravar o autosave dos passos")
+
+buffer_autosave = BufferAutosavePassos()
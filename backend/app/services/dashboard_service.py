@@ -1,14 +1,47 @@
 from typing import Optional, List, Dict, Any
+from datetime import date, datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.cache import CacheTTL
+from app.core.fanout import ConsultasParalelas
 from app.repositories.dashboard_repository import DashboardRepository
 from app.models.testing import StatusExecucaoEnum, SeveridadeDefeitoEnum
 from app.schemas.dashboard import (
     DashboardResponse, DashboardKPI, DashboardCharts, ChartDataPoint,
     RunnerDashboardResponse, RunnerKPI, RunnerRankingData, 
     StatusDistributionData, TimelineItem, RunnerDashboardCharts,
-    PerformanceResponse, TeamStats, TesterStats
+    PerformanceResponse, TeamStats, TesterStats, DuracaoExecucaoData,
+    RunnerEquipeItem, EquipeRunnersResponse
 )
 
+cache_dashboard = CacheTTL(
+    ttl_segundos=settings.DASHBOARD_CACHE_TTL_SEGUNDOS,
+    max_itens=settings.DASHBOARD_CACHE_MAX_ITENS
+)
+
+def invalidar_cache_dashboard(evento: Dict[str, Any]):
+    """
+    Callback do ouvinte de alterações. As chaves são (tipo, escopo, ...):
+    ("dashboard", sistema_id) e ("performance", user_id); o escopo None
+    (visão geral) é afetado por qualquer alteração, e o refresh das views
+    materializadas afeta todos os "dashboard".
+    """
+    if evento.get("tudo"):
+        cache_dashboard.limpar()
+        return
+    if evento.get("materializado"):
+        # Refresh das views: muda o dashboard geral de todos os escopos
+        cache_dashboard.invalidar(lambda chave: chave[0] == "dashboard")
+        return
+
+    afetados = {
+        "dashboard": set(evento.get("sistemas") or []),
+        "performance": set(evento.get("usuarios") or []),
+    }
+    cache_dashboard.invalidar(
+        lambda chave: chave[1] is None or chave[1] in afetados.get(chave[0], ())
+    )
+
 class DashboardService:
     STATUS_COLORS = {
         "pendente": "#94a3b8",      
@@ -27,14 +60,29 @@ class DashboardService:
         "baixo": "#3b82f6"
     }
 
+    # Uma faixa a mais que FAIXAS_DURACAO_SEGUNDOS (width_bucket devolve 0..n)
+    FAIXAS_DURACAO_ROTULOS = ["< 5 min", "5-15 min", "15-30 min", "30-60 min", "1-2 h", "> 2 h"]
+
     def __init__(self, db: AsyncSession):
         self.repo = DashboardRepository(db)
+        self.paralelo = ConsultasParalelas(db)
 
     async def get_dashboard_data(self, sistema_id: int = None) -> DashboardResponse:
-        kpis_data = await self.repo.get_kpis_gerais(sistema_id)
-        exec_status_data = await self.repo.get_status_execucao_geral(sistema_id)
-        severity_data = await self.repo.get_defeitos_por_severidade(sistema_id)
-        modules_data = await self.repo.get_modulos_com_mais_defeitos(limit=5, sistema_id=sistema_id)
+        return await cache_dashboard.obter_ou_calcular(
+            ("dashboard", sistema_id), lambda: self._calcular_dashboard_data(sistema_id)
+        )
+
+    async def _calcular_dashboard_data(self, sistema_id: int = None) -> DashboardResponse:
+        if settings.DASHBOARD_USAR_MATVIEWS:
+            snapshot = await self.repo.get_snapshot_materializado(sistema_id)
+        elif settings.DASHBOARD_USAR_ROLLUPS:
+            snapshot = await self.repo.get_snapshot_consolidado(sistema_id, limit_modulos=5)
+        else:
+            snapshot = await self.repo.get_dashboard_snapshot(sistema_id, limit_modulos=5)
+        kpis_data = snapshot["kpis"]
+        exec_status_data = snapshot["status_execucao"]
+        severity_data = snapshot["defeitos_por_severidade"]
+        modules_data = snapshot["modulos_com_mais_defeitos"]
 
         # kpis
         kpis = DashboardKPI(
@@ -56,12 +104,21 @@ class DashboardService:
             top_modulos_defeitos=[ChartDataPoint(label=nome, name=nome, value=count) for nome, count in modules_data]
         )
 
-        return DashboardResponse(kpis=kpis, charts=charts)
+        # Nos modos em tempo real os dados valem para o momento do cálculo
+        as_of = snapshot.get("as_of") or datetime.now(timezone.utc)
+        return DashboardResponse(kpis=kpis, charts=charts, as_of=as_of)
 
     async def get_runner_dashboard_data(self, runner_id: Optional[int] = None) -> RunnerDashboardResponse:
-        raw_kpis = await self.repo.get_runner_kpis(runner_id)
-        status_dist = await self.repo.get_status_distribution(runner_id)
-        raw_timeline = await self.repo.get_runner_timeline(runner_id)
+        consultas = [
+            lambda s: DashboardRepository(s).get_runner_kpis(runner_id),
+            lambda s: DashboardRepository(s).get_status_distribution(runner_id),
+            lambda s: DashboardRepository(s).get_runner_timeline(runner_id),
+            lambda s: DashboardRepository(s).get_distribuicao_duracao(runner_id),
+        ]
+        if not runner_id:
+            consultas.append(lambda s: DashboardRepository(s).get_ranking_runners())
+
+        raw_kpis, status_dist, raw_timeline, duracao_dist, *ranking = await self.paralelo.executar(*consultas)
 
         kpis = RunnerKPI(
             total_execucoes_concluidas=raw_kpis.get("total_concluidos", 0),
@@ -73,17 +130,10 @@ class DashboardService:
 
         ranking_data = []
         if not runner_id:
-            ranking_raw = await self.repo.get_ranking_runners()
+            ranking_raw = ranking[0]
             ranking_data = [RunnerRankingData(label=name, value=total, color="#3b82f6") for name, total in ranking_raw]
 
-        dist_data = [
-            StatusDistributionData(
-                name=self._normalize_key(status).upper().replace("_", " "),
-                value=count,
-                color=self.STATUS_COLORS.get(self._normalize_key(status), "#94a3b8")
-            )
-            for status, count in status_dist
-        ]
+        dist_data = self._formatar_distribuicao_status(status_dist)
 
         timeline_data = [
             TimelineItem(
@@ -96,18 +146,52 @@ class DashboardService:
             for execution in raw_timeline
         ]
 
+        totais_por_faixa = dict(duracao_dist)
+        duracao_data = [
+            ChartDataPoint(label=rotulo, value=totais_por_faixa.get(indice, 0), color="#8b5cf6")
+            for indice, rotulo in enumerate(self.FAIXAS_DURACAO_ROTULOS)
+        ]
+
         charts = RunnerDashboardCharts(
             ranking_produtividade=ranking_data,
             status_distribuicao=dist_data,
-            timeline=timeline_data
+            timeline=timeline_data,
+            distribuicao_duracao=duracao_data
         )
 
         return RunnerDashboardResponse(kpis=kpis, charts=charts)
 
     
-    async def get_performance_analytics(self, user_id: Optional[int] = None) -> PerformanceResponse:
-        velocity_data = await self.repo.get_performance_velocity(user_id)
-        modules_data = await self.repo.get_top_offending_modules_perf(user_id)
+    async def get_performance_analytics(
+        self,
+        user_id: Optional[int] = None,
+        granularidade: str = "dia",
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> PerformanceResponse:
+        return await cache_dashboard.obter_ou_calcular(
+            ("performance", user_id, granularidade, data_inicio, data_fim),
+            lambda: self._calcular_performance_analytics(user_id, granularidade, data_inicio, data_fim)
+        )
+
+    async def _calcular_performance_analytics(
+        self,
+        user_id: Optional[int] = None,
+        granularidade: str = "dia",
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> PerformanceResponse:
+        if user_id:
+            consulta_stats = lambda s: DashboardRepository(s).get_user_stats_aggregates(user_id)
+        else:
+            consulta_stats = lambda s: DashboardRepository(s).get_team_stats_aggregates()
+
+        velocity_data, modules_data, stats, dist_data = await self.paralelo.executar(
+            lambda s: DashboardRepository(s).get_performance_velocity(user_id, granularidade, data_inicio, data_fim),
+            lambda s: DashboardRepository(s).get_top_offending_modules_perf(user_id),
+            consulta_stats,
+            lambda s: DashboardRepository(s).get_status_distribution(user_id),
+        )
 
         team_stats = None
         tester_stats = None
@@ -115,8 +199,6 @@ class DashboardService:
 
         if user_id:
             # logica para visao individual
-            stats = await self.repo.get_user_stats_aggregates(user_id)
-            
             total = stats["total_executions"]
             blocked = stats["blocked_executions"]
             
@@ -130,12 +212,9 @@ class DashboardService:
                 taxa_bloqueio=block_rate
             )
 
-            dist_data = await self.repo.get_status_distribution(user_id)
             rigor_chart = self._format_chart_data(dist_data, self.STATUS_COLORS)
 
         else:
-            stats = await self.repo.get_team_stats_aggregates()
-            
             total_exec = stats["total_executions"]
             passed = stats["passed_executions"]
             defects = stats["total_defects"]
@@ -152,13 +231,13 @@ class DashboardService:
                 densidade_defeitos=defect_density
             )
 
-            dist_data = await self.repo.get_status_distribution(None)
             rigor_chart = self._format_chart_data(dist_data, self.STATUS_COLORS)
 
         # CORREÇÃO AQUI: item já é um objeto date, removemos o .date
+        formato_rotulo = "%m/%Y" if granularidade == "mes" else "%d/%m"
         velocity_chart = [
             ChartDataPoint(
-                label=item.strftime("%d/%m"), 
+                label=item.strftime(formato_rotulo), 
                 value=count,
                 color="#3b82f6"
             ) for item, count in velocity_data
@@ -180,6 +259,70 @@ class DashboardService:
             grafico_rigor=rigor_chart
         )
 
+    async def get_kpis_equipe(
+        self,
+        ordenar_por: str = "total_execucoes_concluidas",
+        decrescente: bool = True,
+        skip: int = 0,
+        limit: int = 20
+    ) -> EquipeRunnersResponse:
+        rows, total = await self.repo.get_kpis_equipe(ordenar_por, decrescente, skip, limit)
+
+        itens = []
+        for row in rows:
+            tempo_medio = row.tempo_medio_segundos
+            kpis = RunnerKPI(
+                total_execucoes_concluidas=row.total_concluidos,
+                total_defeitos_reportados=row.total_defeitos,
+                tempo_medio_execucao_minutos=round(float(tempo_medio) / 60, 1) if tempo_medio else 0.0,
+                testes_em_fila=row.total_fila,
+                ultima_atividade=row.ultima_atividade
+            )
+            status_dist = [
+                (status, getattr(row, f"exec_{status.value}"))
+                for status in StatusExecucaoEnum
+                if getattr(row, f"exec_{status.value}")
+            ]
+            itens.append(RunnerEquipeItem(
+                id=row.id,
+                nome=row.nome,
+                kpis=kpis,
+                status_distribuicao=self._formatar_distribuicao_status(status_dist)
+            ))
+
+        return EquipeRunnersResponse(total=total, itens=itens)
+
+    async def get_duracoes_execucao(
+        self,
+        agrupar_por: str = "runner",
+        user_id: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        limit: int = 50
+    ) -> List[DuracaoExecucaoData]:
+        rows = await self.repo.get_duracoes_execucao(agrupar_por, user_id, data_inicio, data_fim, limit)
+        return [
+            DuracaoExecucaoData(
+                id=chave,
+                nome=nome,
+                total=total,
+                media_minutos=round(float(media) / 60, 1),
+                p50_minutos=round(float(p50) / 60, 1),
+                p95_minutos=round(float(p95) / 60, 1)
+            )
+            for chave, nome, total, media, p50, p95 in rows
+        ]
+
+    def _formatar_distribuicao_status(self, status_dist: List[tuple]) -> List[StatusDistributionData]:
+        return [
+            StatusDistributionData(
+                name=self._normalize_key(status).upper().replace("_", " "),
+                value=count,
+                color=self.STATUS_COLORS.get(self._normalize_key(status), "#94a3b8")
+            )
+            for status, count in status_dist
+        ]
+
     def _normalize_key(self, item: Any) -> str:
         if hasattr(item, 'value'): return str(item.value).lower()
         return str(item).lower()
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.dashboard_service import DashboardService
+
+logger = logging.getLogger(__name__)
+
+# Chaves usadas para casar itens de gráficos entre dois snapshots
+_CHAVES_PONTO = ("label", "name")
+
+def calcular_delta(anterior: Any, atual: Any) -> Any:
+    """
+    Diferença entre dois snapshots (JSON) do dashboard. Retorna None se não mudou.
+
+    - dicts: apenas as chaves alteradas (recursivo);
+    - listas de pontos de gráfico (itens com label/name):
+      {"alterados": [pontos novos ou com valor diferente], "removidos": [labels]};
+    - demais valores/listas (ex.: timeline): o valor novo inteiro.
+    """
+    if anterior == atual:
+        return None
+
+    if isinstance(anterior, dict) and isinstance(atual, dict):
+        delta = {}
+        for chave, valor in atual.items():
+            diferenca = calcular_delta(anterior.get(chave), valor)
+            if diferenca is not None:
+                delta[chave] = diferenca
+        return delta or None
+
+    if isinstance(anterior, list) and isinstance(atual, list) and atual + anterior:
+        chave = next(
+            (c for c in _CHAVES_PONTO if all(isinstance(p, dict) and c in p for p in atual + anterior)),
+            None
+        )
+        if chave:
+            antigos = {p[chave]: p for p in anterior}
+            novos = {p[chave]: p for p in atual}
+            return {
+                "alterados": [p for k, p in novos.items() if antigos.get(k) != p],
+                "removidos": [k for k in antigos if k not in novos],
+            }
+
+    return atual
+
+def formatar_evento(evento: str, dados: Any) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, default=str, separators=(',', ':'))}\n\n"
+
+class CanalDashboard:
+    """
+    Um escopo assinado (ex.: dashboard de um sistema). Calcula o snapshot uma vez
+    para todos os assinantes e, a cada alteração, envia só o delta, no máximo
+    uma vez por `DASHBOARD_STREAM_INTERVALO_SEGUNDOS`.
+    """
+
+    def __init__(self, escopo: Hashable, calcular: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.escopo = escopo
+        self._calcular = calcular
+        self.assinantes: Set[asyncio.Queue] = set()
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._trava = asyncio.Lock()
+        self._sujo = asyncio.Event()
+        self._ultimo_envio = 0.0
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def obter_snapshot(self) -> Dict[str, Any]:
+        async with self._trava:
+            if self.snapshot is None:
+                self.snapshot = await self._calcular()
+            return self.snapshot
+
+    def marcar_alterado(self):
+        self._sujo.set()
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    def _enviar(self, mensagem: str):
+        for fila in list(self.assinantes):
+            try:
+                fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o que acumulou e manda um snapshot completo no lugar
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait(formatar_evento("snapshot", self.snapshot))
+
+    async def _executar(self):
+        intervalo = settings.DASHBOARD_STREAM_INTERVALO_SEGUNDOS
+        while True:
+            try:
+                # Sem LISTEN/NOTIFY (ou com eventos perdidos), o TTL do cache também força uma revisão
+                await asyncio.wait_for(self._sujo.wait(), timeout=settings.DASHBOARD_CACHE_TTL_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+            espera = self._ultimo_envio + intervalo - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            self._sujo.clear()
+
+            try:
+                async with self._trava:
+                    anterior = self.snapshot
+                    self.snapshot = await self._calcular()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao recalcular o dashboard %s para o stream", self.escopo)
+                continue
+
+            self._ultimo_envio = time.monotonic()
+            if anterior is None:
+                self._enviar(formatar_evento("snapshot", self.snapshot))
+            else:
+                delta = calcular_delta(anterior, self.snapshot)
+                if delta:
+                    self._enviar(formatar_evento("delta", delta))
+
+class HubDashboard:
+    """
+    Mantém um CanalDashboard por escopo enquanto houver assinantes e marca os
+    canais afetados pelos eventos de alteração (mesmo payload do cache).
+    """
+
+    def __init__(self):
+        self.canais: Dict[Hashable, CanalDashboard] = {}
+
+    def _calculadora(self, escopo: Hashable) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        tipo, valor = escopo
+
+        async def calcular() -> Dict[str, Any]:
+            async with AsyncSessionLocal() as sessao:
+                service = DashboardService(sessao)
+                if tipo == "dashboard":
+                    resposta = await service.get_dashboard_data(sistema_id=valor)
+                else:
+                    resposta = await service.get_runner_dashboard_data(runner_id=valor)
+            return resposta.model_dump(mode="json")
+
+        return calcular
+
+    def ao_alterar(self, evento: Dict[str, Any]):
+        sistemas = set(evento.get("sistemas") or [])
+        usuarios = set(evento.get("usuarios") or [])
+        for (tipo, valor), canal in self.canais.items():
+            afetados = sistemas if tipo == "dashboard" else usuarios
+            if evento.get("materializado"):
+                if tipo == "dashboard":
+                    canal.marcar_alterado()
+            elif evento.get("tudo") or valor is None or valor in afetados:
+                canal.marcar_alterado()
+
+    async def assinar(self, escopo: Hashable, max_fila: int = 16) -> asyncio.Queue:
+        canal = self.canais.get(escopo)
+        if canal is None:
+            canal = self.canais[escopo] = CanalDashboard(escopo, self._calculadora(escopo))
+            canal.iniciar()
+
+        fila: asyncio.Queue = asyncio.Queue(maxsize=max_fila)
+        canal.assinantes.add(fila)
+        try:
+            fila.put_nowait(formatar_evento("snapshot", await canal.obter_snapshot()))
+        except BaseException:
+            await self.cancelar(escopo, fila)
+            raise
+        return fila
+
+    async def cancelar(self, escopo: Hashable, fila: asyncio.Queue):
+        canal = self.canais.get(escopo)
+        if canal is None:
+            return
+        canal.assinantes.discard(fila)
+        if not canal.assinantes:
+            del self.canais[escopo]
+            await canal.parar()
+
+    async def transmitir(self, escopo: Hashable):
+        """Gerador de texto SSE para um assinante: snapshot, deltas e heartbeats."""
+        fila = await self.assinar(escopo)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(fila.get(), timeout=settings.DASHBOARD_STREAM_HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém proxies e o navegador com a conexão aberta
+                    yield ": ping\n\n"
+        finally:
+            await self.cancelar(escopo, fila)
+
+    async def parar(self):
+        for escopo in list(self.canais):
+            canal = self.canais.pop(escopo)
+            await canal.parar()
+
+hub_dashboard = HubDashboard()
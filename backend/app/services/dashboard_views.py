@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+
+logger = logging.getLogger(__name__)
+
+class AtualizadorViewsDashboard:
+    """
+    Atualiza as views materializadas do dashboard (modo DASHBOARD_USAR_MATVIEWS)
+    a cada DASHBOARD_MATVIEWS_INTERVALO_SEGUNDOS. Eventos de alteração antecipam
+    o refresh, respeitando o intervalo mínimo: uma rajada de escritas vira um
+    refresh só. Todos os workers rodam o laço; o advisory lock do repositório
+    deixa apenas um atualizar por vez.
+    """
+
+    def __init__(self):
+        self._alterado = asyncio.Event()
+        self._ultimo_refresh = 0.0
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def ao_alterar(self, evento: Dict[str, Any]):
+        # O próprio refresh publica {"materializado": true}; não pode reagendar outro
+        if not evento.get("materializado"):
+            self._alterado.set()
+
+    def iniciar(self):
+        if not settings.DASHBOARD_USAR_MATVIEWS:
+            return
+        if not settings.ASYNC_DATABASE_URL.startswith("postgresql"):
+            logger.info("Views materializadas exigem Postgres; refresh desativado.")
+            return
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def atualizar(self) -> bool:
+        async with AsyncSessionLocal() as sessao:
+            atualizou = await DashboardRollupRepository(sessao).atualizar_views()
+            await sessao.commit()
+        return atualizou
+
+    async def _executar(self):
+        intervalo_minimo = settings.DASHBOARD_MATVIEWS_INTERVALO_MINIMO_SEGUNDOS
+        while True:
+            try:
+                await asyncio.wait_for(self._alterado.wait(), timeout=settings.DASHBOARD_MATVIEWS_INTERVALO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+            espera = self._ultimo_refresh + intervalo_minimo - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            self._alterado.clear()
+
+            inicio = time.monotonic()
+            try:
+                if await self.atualizar():
+                    logger.info("Views do dashboard atualizadas em %.0f ms", (time.monotonic() - inicio) * 1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao atualizar as views materializadas do dashboard")
+            self._ultimo_refresh = time.monotonic()
+
+atualizador_views = AtualizadorViewsDashboard()
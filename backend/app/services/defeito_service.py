@@ -1,11 +1,12 @@
-from typing import List, Optional, Sequence
+from typing import List, Optional, Sequence, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.usuario import Usuario
 from app.models.testing import StatusExecucaoEnum, StatusDefeitoEnum 
 from app.models.nivel_acesso import NivelAcessoEnum
 from app.repositories.defeito_repository import DefeitoRepository
 from app.repositories.execucao_teste_repository import ExecucaoTesteRepository 
-from app.schemas.defeito import DefeitoCreate, DefeitoUpdate, DefeitoResponse
+from app.schemas.defeito import DefeitoCreate, DefeitoUpdate, DefeitoResponse, DefeitoResumo, DefeitoCompleto
+from app.schemas.execucao_teste import VisaoExecucao
 
 class DefeitoService:
     def __init__(self, db: AsyncSession):
@@ -15,16 +16,36 @@ class DefeitoService:
     async def registrar_defeito(self, dados: DefeitoCreate):
         return await self.repo.create(dados)
 
-    async def listar_todos(self, current_user: Usuario, filtro_responsavel_id: Optional[int] = None):
+    async def listar_por_execucao(
+        self, execucao_id: int, view: Optional[VisaoExecucao] = None
+    ) -> List[Union[DefeitoResponse, DefeitoResumo, DefeitoCompleto]]:
+        if view == "summary":
+            linhas = await self.repo.get_all_with_details(execucao_id=execucao_id)
+            return [DefeitoResumo.model_validate(dict(linha)) for linha in linhas]
+
+        defeitos = await self.repo.get_by_execucao(execucao_id, compacta=view == "full")
+        if view == "full":
+            return [DefeitoCompleto.de_defeito(d) for d in defeitos]
+        return [DefeitoResponse.model_validate(d) for d in defeitos]
+
+    async def listar_todos(
+        self, current_user: Usuario, filtro_responsavel_id: Optional[int] = None,
+        view: Optional[VisaoExecucao] = None
+    ) -> List[Union[DefeitoResponse, DefeitoResumo, DefeitoCompleto]]:
         
         is_admin = False
         if current_user.nivel_acesso:
              is_admin = current_user.nivel_acesso.nome == NivelAcessoEnum.admin or current_user.nivel_acesso.nome == "admin"
 
-        if not is_admin:
-            return await self.repo.get_all_with_details(responsavel_id=current_user.id)
-        
-        return await self.repo.get_all_with_details(responsavel_id=filtro_responsavel_id)
+        responsavel_id = filtro_responsavel_id if is_admin else current_user.id
+
+        if view == "full":
+            defeitos = await self.repo.get_all_completos(responsavel_id=responsavel_id)
+            return [DefeitoCompleto.de_defeito(d) for d in defeitos]
+
+        linhas = await self.repo.get_all_with_details(responsavel_id=responsavel_id)
+        schema = DefeitoResumo if view == "summary" else DefeitoResponse
+        return [schema.model_validate(dict(linha)) for linha in linhas]
 
     async def atualizar_defeito(self, id: int, dados: DefeitoUpdate):
         defeito_atualizado = await self.repo.update(id, dados)
@@ -0,0 +1,125 @@
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from typing import AsyncIterator, BinaryIO, NamedTuple, Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.models.evidencia_blob import EvidenciaBlob
+from app.schemas.execucao_teste import EvidenciaUploadResponse
+from app.services.previews import urls_previews
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_CAMINHO_BLOB = re.compile(r"blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{1,10}")
+
+class EvidenciaRecebida(NamedTuple):
+    parcial: str # arquivo temporário em EVIDENCIAS_DIR, ainda sem nome definitivo
+    sha256: str
+    tamanho: int
+
+def normalizar_tipo(content_type: Optional[str]) -> str:
+    """Content-Type sem parâmetros (charset, boundary), recusado com 415 se não estiver na lista permitida."""
+    tipo = (content_type or "").split(";")[0].strip().lower()
+    if tipo not in settings.EVIDENCIA_TIPOS_PERMITIDOS:
+        raise HTTPException(status_code=415, detail=f"Tipo de evidência não permitido: {tipo or 'desconhecido'}")
+    return tipo
+
+def validar_tamanho(tamanho: Optional[int]):
+    """Recusa antes de gravar qualquer byte quando o tamanho já é conhecido (Content-Length, arquivo do multipart)."""
+    if tamanho is not None and tamanho > settings.EVIDENCIA_MAX_BYTES:
+        raise HTTPException(
+            status_code=413, detail=f"Evidência maior que o limite de {settings.EVIDENCIA_MAX_BYTES} bytes"
+        )
+
+def extensao_evidencia(tipo: str) -> str:
+    # Só do tipo já validado (normalizar_tipo), nunca do nome enviado: a extensão
+    # vira parte do caminho do blob e decide como o arquivo é servido
+    return mimetypes.guess_extension(tipo) or ".bin"
+
+def url_evidencia(caminho: str) -> str:
+    return f"{settings.PUBLIC_BASE_URL.rstrip('/')}/evidencias/{caminho}"
+
+def validar_sha256(sha256: str) -> str:
+    sha256 = sha256.strip().lower()
+    if not _SHA256.fullmatch(sha256):
+        raise HTTPException(status_code=422, detail="SHA-256 inválido (64 dígitos hexadecimais)")
+    return sha256
+
+def caminho_blob(sha256: str, extensao: str) -> str:
+    """blobs/ab/cd/<sha256><ext>, relativo ao armazenamento: no máximo 65536 diretórios, poucos arquivos em cada."""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao}"
+
+def validar_caminho_blob(sha256: str, caminho: str) -> str:
+    """Caminho devolvido ao cliente no upload direto: tem de ser o do próprio hash (só muda a extensão)."""
+    if not _CAMINHO_BLOB.fullmatch(caminho) or not caminho.startswith(caminho_blob(sha256, "")):
+        raise HTTPException(status_code=422, detail="Caminho de evidência inválido para este SHA-256")
+    return caminho
+
+def resposta_blob(blob: EvidenciaBlob, reaproveitada: bool) -> EvidenciaUploadResponse:
+    return EvidenciaUploadResponse(
+        url=url_evidencia(blob.caminho),
+        nome=os.path.basename(blob.caminho),
+        sha256=blob.sha256,
+        tamanho=blob.tamanho,
+        content_type=blob.content_type,
+        reaproveitada=reaproveitada,
+        previews=urls_previews(blob.sha256, blob.content_type),
+    )
+
+async def blocos_upload(arquivo: UploadFile) -> AsyncIterator[bytes]:
+    """Lê o arquivo do multipart em blocos (o UploadFile lê em thread quando está em disco)."""
+    await arquivo.seek(0)
+    while bloco := await arquivo.read(settings.EVIDENCIA_BLOCO_BYTES):
+        yield bloco
+
+def _gravar_bloco(destino: BinaryIO, sha256, bloco: bytes):
+    # Roda em thread: hashlib solta o GIL em blocos grandes, a escrita não prende o loop
+    sha256.update(bloco)
+    destino.write(bloco)
+
+def _remover(caminho: str):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+async def descartar(caminho: str):
+    await anyio.to_thread.run_sync(_remover, caminho)
+
+async def receber_evidencia(blocos: AsyncIterator[bytes]) -> EvidenciaRecebida:
+    """
+    Grava o stream num arquivo temporário em EVIDENCIAS_DIR calculando SHA-256
+    e tamanho no caminho. Os blocos são acumulados até EVIDENCIA_BLOCO_BYTES e
+    gravados em thread; passou de EVIDENCIA_MAX_BYTES, o arquivo parcial é
+    descartado (413). Quem chama publica (armazenamento.publicar) ou descarta o
+    temporário.
+    """
+    parcial = os.path.join(settings.EVIDENCIAS_DIR, f".parcial-{uuid.uuid4()}")
+
+    sha256 = hashlib.sha256()
+    tamanho = 0
+    pendente = bytearray()
+    arquivo = await anyio.to_thread.run_sync(open, parcial, "wb")
+    try:
+        async for bloco in blocos:
+            tamanho += len(bloco)
+            validar_tamanho(tamanho)
+            pendente += bloco
+            if len(pendente) >= settings.EVIDENCIA_BLOCO_BYTES:
+                await anyio.to_thread.run_sync(_gravar_bloco, arquivo, sha256, bytes(pendente))
+                pendente.clear()
+        if pendente:
+            await anyio.to_thread.run_sync(_gravar_bloco, arquivo, sha256, bytes(pendente))
+        await anyio.to_thread.run_sync(arquivo.close)
+    except BaseException:
+        # Inclui cliente que desconectou no meio (cancelamento)
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(arquivo.close)
+            await descartar(parcial)
+        raise
+
+    return EvidenciaRecebida(parcial, sha256.hexdigest(), tamanho)
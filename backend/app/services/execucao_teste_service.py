@@ -1,126 +1,530 @@
-from typing import List, Optional
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 
-from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository, ConflitoVersao
 from app.repositories.caso_teste_repository import CasoTesteRepository
 from app.repositories.defeito_repository import DefeitoRepository
-from app.schemas.execucao_teste import ExecucaoTesteResponse, ExecucaoPassoUpdate, ExecucaoPassoResponse
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.schemas.execucao_teste import (
+    ExecucaoTesteResponse, ExecucaoPassoUpdate, ExecucaoPassoResponse,
+    ExecucaoPassosLote, ExecucaoPassosLoteResponse,
+    ExecucaoTesteResumo, ExecucaoTesteCompleta, VisaoExecucao,
+    PlanejamentoLote, PlanejamentoLoteResponse, RegraAtribuicaoEnum,
+    ReservaExecucaoResponse, AtribuicaoCiclo, AtribuicaoCicloResponse, CargaUsuario,
+    AutosavePasso, AutosavePassoResponse,
+    JornalSincronizacao, SincronizacaoResponse, ResultadoOperacao, TipoOperacaoJornalEnum,
+    EvidenciaUploadResponse, EvidenciaUploadDiretoCreate, EvidenciaUploadDiretoResponse, EvidenciaUploadDiretoConcluir
+)
 from app.schemas.defeito import DefeitoCreate
 from app.models.testing import StatusExecucaoEnum, StatusPassoEnum
+from app.core.paginacao import codificar_cursor, decodificar_cursor
+from app.core.config import settings
+from app.services.autosave_passos import buffer_autosave
+from app.services.evidencias import (
+    normalizar_tipo, validar_tamanho, validar_sha256, extensao_evidencia, caminho_blob, validar_caminho_blob,
+    receber_evidencia, descartar, resposta_blob
+)
+from app.services.armazenamento import armazenamento
+from app.services.previews import gerador_previews, caminho_preview, VARIANTES, TIPOS_COM_PREVIEW
+
+# Custo de um passo quando nenhum caso do ciclo tem duração histórica
+SEGUNDOS_POR_PASSO_PADRAO = 60
+
+def balancear_carga(custos: List[Tuple[int, float]], cargas: Dict[int, float]) -> Dict[int, int]:
+    """
+    LPT (longest processing time): execuções em ordem decrescente de custo, cada
+    uma para o usuário com menor carga no momento (heap). `cargas` traz a carga
+    inicial de cada usuário. Devolve execucao_id -> usuario_id.
+    """
+    heap = [(carga, usuario_id) for usuario_id, carga in cargas.items()]
+    heapq.heapify(heap)
+    destino = {}
+    for execucao_id, custo in sorted(custos, key=lambda item: (-item[1], item[0])):
+        carga, usuario_id = heapq.heappop(heap)
+        destino[execucao_id] = usuario_id
+        heapq.heappush(heap, (carga + custo, usuario_id))
+    return destino
 
 class ExecucaoTesteService:
     def __init__(self, db: AsyncSession):
         self.repo = ExecucaoTesteRepository(db)
         self.caso_repo = CasoTesteRepository(db)
         self.defeito_repo = DefeitoRepository(db)
+        self.evidencias = EvidenciaRepository(db)
 
     async def alocar_teste(self, ciclo_id: int, caso_id: int, responsavel_id: int) -> ExecucaoTesteResponse:
-        nova_exec = await self.repo.create(ciclo_id, caso_id, responsavel_id)
+        nova_exec = await self.repo.criar_planejamento(ciclo_id, caso_id, responsavel_id)
         return ExecucaoTesteResponse.model_validate(nova_exec)
 
-    async def listar_tarefas_usuario(self, usuario_id: int, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[ExecucaoTesteResponse]:
+    async def planejar_ciclo(self, ciclo_id: int, dados: PlanejamentoLote) -> PlanejamentoLoteResponse:
+        projeto_id = await self.repo.get_projeto_do_ciclo(ciclo_id)
+        if projeto_id is None:
+            raise HTTPException(status_code=404, detail="Ciclo de teste não encontrado.")
+
+        if dados.caso_teste_ids is None and not (dados.prioridade or dados.status_caso or dados.apenas_casos_do_ciclo):
+            raise HTTPException(status_code=422, detail="Informe caso_teste_ids ou ao menos um filtro de casos.")
+
+        if dados.regra == RegraAtribuicaoEnum.fixo:
+            if dados.responsavel_id is None:
+                raise HTTPException(status_code=422, detail="A regra 'fixo' exige responsavel_id.")
+            usuarios = [dados.responsavel_id]
+        elif dados.regra == RegraAtribuicaoEnum.rodizio:
+            if not dados.responsaveis_ids:
+                raise HTTPException(status_code=422, detail="A regra 'rodizio' exige responsaveis_ids.")
+            usuarios = dados.responsaveis_ids
+        else:
+            usuarios = [dados.responsavel_id] if dados.responsavel_id is not None else []
+
+        if usuarios:
+            inexistentes = set(usuarios) - await self.repo.get_usuarios_existentes(usuarios)
+            if inexistentes:
+                raise HTTPException(status_code=404, detail=f"Usuários não encontrados: {sorted(inexistentes)}")
+
+        resumo = await self.repo.planejar_lote(ciclo_id, projeto_id, dados)
+        return PlanejamentoLoteResponse(**resumo)
+
+    async def atribuir_ciclo(self, ciclo_id: int, dados: AtribuicaoCiclo) -> AtribuicaoCicloResponse:
+        if await self.repo.get_projeto_do_ciclo(ciclo_id) is None:
+            raise HTTPException(status_code=404, detail="Ciclo de teste não encontrado.")
+
+        usuarios = list(dict.fromkeys(dados.usuarios_ids))
+        inativos = set(usuarios) - await self.repo.get_usuarios_existentes(usuarios, apenas_ativos=True)
+        if inativos:
+            raise HTTPException(status_code=422, detail=f"Usuários inexistentes ou inativos: {sorted(inativos)}")
+
+        linhas = await self.repo.get_carga_ciclo(ciclo_id, usuarios)
+
+        # Custo: duração média do caso; sem histórico, passos x média por passo dos casos que têm
+        com_historico = [(float(l.media), l.passos) for l in linhas if l.media is not None and l.passos]
+        por_passo = (
+            sum(media for media, _ in com_historico) / sum(passos for _, passos in com_historico)
+            if com_historico else SEGUNDOS_POR_PASSO_PADRAO
+        )
+
+        def custo(linha) -> float:
+            return float(linha.media) if linha.media is not None else max(linha.passos, 1) * por_passo
+
+        cargas: Dict[int, float] = {usuario_id: 0.0 for usuario_id in usuarios}
+        candidatas, anteriores = [], {}
+        for linha in linhas:
+            redistribuivel = (
+                dados.redistribuir and linha.status_geral == StatusExecucaoEnum.pendente and not linha.reservada
+            )
+            if linha.responsavel_id is None or redistribuivel:
+                candidatas.append((linha.id, custo(linha)))
+                anteriores[linha.id] = linha.responsavel_id
+            else:
+                cargas[linha.responsavel_id] += custo(linha)
+
+        destino = balancear_carga(candidatas, cargas)
+
+        custo_por_execucao = dict(candidatas)
+        resumo = {usuario_id: [0, 0.0] for usuario_id in usuarios}
+        for execucao_id, usuario_id in destino.items():
+            resumo[usuario_id][0] += 1
+            resumo[usuario_id][1] += custo_por_execucao[execucao_id]
+            cargas[usuario_id] += custo_por_execucao[execucao_id]
+
+        atribuicoes = [
+            (execucao_id, anteriores[execucao_id], usuario_id)
+            for execucao_id, usuario_id in destino.items()
+            if usuario_id != anteriores[execucao_id]
+        ]
+        if dados.simular:
+            atribuidas = len(atribuicoes)
+        else:
+            atribuidas = await self.repo.atribuir_lote(ciclo_id, atribuicoes)
+
+        return AtribuicaoCicloResponse(
+            ciclo_teste_id=ciclo_id,
+            simulacao=dados.simular,
+            execucoes_atribuidas=atribuidas,
+            carga_por_usuario=[
+                CargaUsuario(
+                    usuario_id=usuario_id,
+                    execucoes_novas=resumo[usuario_id][0],
+                    custo_novas_segundos=round(resumo[usuario_id][1]),
+                    carga_total_segundos=round(cargas[usuario_id]),
+                )
+                for usuario_id in usuarios
+            ]
+        )
+
+    async def listar_tarefas_usuario(
+        self, usuario_id: int, status: Optional[str] = None, skip: int = 0, limit: int = 20,
+        view: Optional[VisaoExecucao] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[Union[ExecucaoTesteResponse, ExecucaoTesteResumo, ExecucaoTesteCompleta]], Optional[str]]:
+        """Devolve a página e o cursor da próxima (None na última página)."""
         status_enum = None
         if status:
             try:
                 status_enum = StatusExecucaoEnum(status)
             except ValueError:
                 pass 
-        execucoes = await self.repo.get_minhas_execucoes(usuario_id, status_enum, skip, limit)
-        
-        return [ExecucaoTesteResponse.model_validate(e) for e in execucoes]
+        posicao = None
+        if cursor:
+            try:
+                posicao = decodificar_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
 
-    async def obter_execucao(self, execucao_id: int) -> Optional[ExecucaoTesteResponse]:
-        execucao = await self.repo.get_by_id(execucao_id)
+        # Um item a mais só para saber se existe próxima página
+        if view == "summary":
+            itens = await self.repo.get_minhas_execucoes_resumo(usuario_id, status_enum, skip, limit + 1, cursor=posicao)
+            pagina = [ExecucaoTesteResumo.model_validate(linha) for linha in itens[:limit]]
+        else:
+            itens = await self.repo.get_minhas_execucoes(
+                usuario_id, status_enum, skip, limit + 1, compacta=view == "full", cursor=posicao
+            )
+            schema = ExecucaoTesteCompleta.de_execucao if view == "full" else ExecucaoTesteResponse.model_validate
+            pagina = [schema(e) for e in itens[:limit]]
+
+        proximo = None
+        if len(itens) > limit and pagina:
+            proximo = codificar_cursor(pagina[-1].updated_at, pagina[-1].id)
+        return pagina, proximo
+
+    async def obter_execucao(
+        self, execucao_id: int, view: Optional[VisaoExecucao] = None
+    ) -> Optional[Union[ExecucaoTesteResponse, ExecucaoTesteResumo, ExecucaoTesteCompleta]]:
+        if view == "summary":
+            linha = await self.repo.get_resumo_by_id(execucao_id)
+            return ExecucaoTesteResumo.model_validate(linha) if linha else None
+
+        execucao = await self.repo.get_by_id(execucao_id, compacta=view == "full")
         if execucao:
+            if view == "full":
+                return ExecucaoTesteCompleta.de_execucao(execucao)
             return ExecucaoTesteResponse.model_validate(execucao)
         return None
 
+    # Frontend envia: "passou", "falhou"
+    # Banco espera: "aprovado", "reprovado" (Conforme seu models/testing.py)
+    STATUS_PASSO_MAP = {
+        "passou": "aprovado",
+        "sucesso": "aprovado",
+        "passed": "aprovado",
+        
+        "falhou": "reprovado",
+        "falha": "reprovado",
+        "failed": "reprovado"
+    }
+
+    async def agendar_autosave(self, passo_id: int, dados: AutosavePasso) -> AutosavePassoResponse:
+        versao = await self.repo.get_versao_passo(passo_id)
+        if versao is None:
+            raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
+        buffer_autosave.registrar(passo_id, dados.resultado_obtido, versao)
+        return AutosavePassoResponse(passo_id=passo_id, gravacao_em_ms=settings.AUTOSAVE_INTERVALO_MS)
+
     async def registrar_resultado_passo(self, passo_id: int, dados: ExecucaoPassoUpdate) -> ExecucaoPassoResponse:
         # --- MAPPER DE STATUS PARA CORRIGIR O ERRO DE ENUM ---
-        # Frontend envia: "passou", "falhou"
-        # Banco espera: "aprovado", "reprovado" (Conforme seu models/testing.py)
-        
-        status_map = {
-            "passou": "aprovado",
-            "sucesso": "aprovado",
-            "passed": "aprovado",
-            
-            "falhou": "reprovado",
-            "falha": "reprovado",
-            "failed": "reprovado"
-        }
-        
         # Tenta traduzir, se não conseguir, mantém o original (pode ser que já esteja certo)
-        status_convertido = status_map.get(dados.status, dados.status)
+        # (só se veio status: atribuir marca o campo como enviado e gravaria NULL)
+        if "status" in dados.model_fields_set:
+            status_convertido = self.STATUS_PASSO_MAP.get(dados.status, dados.status)
 
-        # Atualiza o DTO com o valor correto
-        dados.status = status_convertido
+            # Atualiza o DTO com o valor correto
+            dados.status = status_convertido
 
-        # Validação extra antes de enviar pro banco
-        try:
-            StatusPassoEnum(dados.status)
-        except ValueError:
-            # Se ainda assim falhar, loga ou lança erro mais claro, mas vamos tentar prosseguir
-            pass
-        
-        passo_atual = await self.repo.get_execucao_passo(passo_id)
-        if not passo_atual:
-            raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
+            # Validação extra antes de enviar pro banco
+            try:
+                StatusPassoEnum(dados.status)
+            except ValueError:
+                # Se ainda assim falhar, loga ou lança erro mais claro, mas vamos tentar prosseguir
+                pass
+
+        # Texto ainda no buffer do autosave vai junto (o que vier no PUT prevalece); volta ao buffer se falhar
+        with buffer_autosave.retirando([passo_id]) as textos:
+            if passo_id in textos and "resultado_obtido" not in dados.model_fields_set:
+                dados.resultado_obtido = textos[passo_id]
+
+            # Grava o passo (condicionado à versão, se veio) e consolida o status geral na mesma transação
+            try:
+                atualizado = await self.repo.update_passo(passo_id, dados)
+            except ConflitoVersao as conflito:
+                self._erro_conflito("O passo foi alterado por outra pessoa.", ExecucaoPassoResponse.model_validate(conflito.atual))
+            if not atualizado:
+                raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
 
-        atualizado = await self.repo.update_passo(passo_id, dados)
-        
-        # Atualiza status geral da execução
-        await self._atualizar_status_execucao(passo_atual.execucao_teste_id)
-        
         return ExecucaoPassoResponse.model_validate(atualizado)
 
-    async def _atualizar_status_execucao(self, execucao_id: int):
-        execucao = await self.repo.get_by_id(execucao_id)
-        if not execucao:
-            return
+    async def registrar_resultados_passos(self, execucao_id: int, dados: ExecucaoPassosLote) -> ExecucaoPassosLoteResponse:
+        """
+        Vários passos de uma execução de uma vez: valida tudo antes, grava em uma
+        transação e consolida o status geral uma única vez.
+        """
+        ids = [item.id for item in dados.passos]
+        if len(set(ids)) != len(ids):
+            raise HTTPException(status_code=422, detail="Passo informado mais de uma vez no lote")
 
-        passos = execucao.passos_executados # Corrigido nome do relacionamento
-        todos_status = [p.status for p in passos]
-        
-        # Lógica de consolidação baseada no seu Enum (aprovado/reprovado)
-        if all(s == StatusPassoEnum.aprovado for s in todos_status):
-             await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.fechado) 
-        elif any(s == StatusPassoEnum.reprovado for s in todos_status): 
-             await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.em_progresso) # Ou outro status de falha geral
+        ids_validos = set(await self.repo.get_ids_passos(execucao_id))
+        if not ids_validos:
+            raise HTTPException(status_code=404, detail="Execução não encontrada ou sem passos")
+        invalidos = sorted(set(ids) - ids_validos)
+        if invalidos:
+            raise HTTPException(status_code=404, detail=f"Passos não pertencem à execução: {invalidos}")
+
+        itens = []
+        for item in dados.passos:
+            valores = item.model_dump(exclude_unset=True)
+            if "status" in valores:
+                valores["status"] = self.STATUS_PASSO_MAP.get(valores["status"], valores["status"])
+                try:
+                    StatusPassoEnum(valores["status"])
+                except ValueError:
+                    # No lote um status inválido derrubaria todos os passos: recusa antes de gravar
+                    raise HTTPException(status_code=422, detail=f"Status inválido para o passo {item.id}: {valores['status']}")
+            itens.append(valores)
+
+        with buffer_autosave.retirando(ids) as textos:
+            for valores in itens:
+                if valores["id"] in textos and "resultado_obtido" not in valores:
+                    valores["resultado_obtido"] = textos[valores["id"]]
+
+            try:
+                resultado = await self.repo.update_passos_lote(execucao_id, itens)
+            except ConflitoVersao as conflito:
+                self._erro_conflito(
+                    "Passos alterados por outra pessoa; nada foi gravado.",
+                    [ExecucaoPassoResponse.model_validate(p) for p in conflito.atual]
+                )
+            if resultado is None:
+                raise HTTPException(status_code=404, detail="Execução não encontrada")
+
+        status_geral, passos = resultado
+        return ExecucaoPassosLoteResponse(
+            execucao_id=execucao_id,
+            status_geral=status_geral,
+            passos=[ExecucaoPassoResponse.model_validate(p) for p in passos]
+        )
+
+    async def sincronizar_jornal(self, usuario_id: int, dados: JornalSincronizacao) -> SincronizacaoResponse:
+        """
+        Jornal capturado offline: uma requisição, uma transação. Operação
+        inválida não derruba o jornal; sai como "rejeitada" no relatório.
+        """
+        op_ids = [op.op_id for op in dados.operacoes]
+        if len(set(op_ids)) != len(op_ids):
+            raise HTTPException(status_code=422, detail="op_id repetido no jornal")
+
+        operacoes = []
+        for op in dados.operacoes:
+            valores = op.model_dump(exclude_none=True)
+            valores["tipo"] = op.tipo.value
+            valores["motivo"] = self._validar_operacao(valores)
+            operacoes.append(valores)
+
+        resultados = await self.repo.aplicar_jornal(usuario_id, operacoes)
+
+        relatorio = [ResultadoOperacao(op_id=op_id, **resultados[op_id]) for op_id in op_ids]
+
+        def total(resultado: str) -> int:
+            return sum(1 for r in relatorio if r.resultado == resultado and not r.repetida)
+        return SincronizacaoResponse(
+            aplicadas=total("aplicada"),
+            conflitos=total("conflito"),
+            rejeitadas=total("rejeitada"),
+            repetidas=sum(1 for r in relatorio if r.repetida),
+            operacoes=relatorio
+        )
+
+    def _validar_operacao(self, op: dict) -> Optional[str]:
+        """Normaliza o status da operação; devolve o motivo da rejeição, se houver."""
+        if op["tipo"] == TipoOperacaoJornalEnum.status:
+            try:
+                op["status"] = StatusExecucaoEnum(op.get("status")).value
+            except ValueError:
+                return f"Status de execução inválido: {op.get('status')}"
+            return None
+
+        if op.get("passo_id") is None:
+            return "passo_id é obrigatório"
+        if op["tipo"] == TipoOperacaoJornalEnum.evidencia:
+            return None if op.get("evidencias") else "Nenhuma evidência informada"
+        if "status" in op:
+            op["status"] = self.STATUS_PASSO_MAP.get(op["status"], op["status"])
+            try:
+                StatusPassoEnum(op["status"])
+            except ValueError:
+                return f"Status de passo inválido: {op['status']}"
+        if not any(campo in op for campo in ("status", "resultado_obtido", "evidencias")):
+            return "Operação sem alterações"
+        return None
+
+    async def reservar_proxima(
+        self, usuario_id: int, ciclo_id: Optional[int] = None, projeto_id: Optional[int] = None
+    ) -> Optional[ExecucaoTesteResponse]:
+        execucao_id = await self.repo.reservar_proxima(usuario_id, ciclo_id, projeto_id)
+        if execucao_id is None:
+            return None
+        return ExecucaoTesteResponse.model_validate(await self.repo.get_by_id(execucao_id))
+
+    async def renovar_reserva(self, execucao_id: int, usuario_id: int) -> ReservaExecucaoResponse:
+        reservado_ate = await self.repo.renovar_reserva(execucao_id, usuario_id)
+        if reservado_ate is None:
+            await self._erro_reserva(execucao_id)
+        return ReservaExecucaoResponse(execucao_id=execucao_id, reservado_ate=reservado_ate)
+
+    async def liberar_reserva(self, execucao_id: int, usuario_id: int):
+        if not await self.repo.liberar_reserva(execucao_id, usuario_id):
+            await self._erro_reserva(execucao_id)
+
+    @staticmethod
+    def _erro_conflito(mensagem: str, atual):
+        """409 com o estado atual, para o cliente reaplicar a alteração sobre ele."""
+        if isinstance(atual, list):
+            atual = [item.model_dump(mode="json") for item in atual]
         else:
-             if execucao.status_geral == StatusExecucaoEnum.pendente:
-                 await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.em_progresso)
+            atual = atual.model_dump(mode="json")
+        raise HTTPException(status_code=409, detail={"mensagem": mensagem, "atual": atual})
 
-    async def finalizar_execucao(self, execucao_id: int, status_final: StatusExecucaoEnum) -> Optional[ExecucaoTesteResponse]:
-        execucao = await self.repo.update_status_geral(execucao_id, status_final)
+    async def _erro_reserva(self, execucao_id: int):
+        if not await self.repo.existe(execucao_id):
+            raise HTTPException(status_code=404, detail="Execução de teste não encontrada")
+        raise HTTPException(status_code=409, detail="A execução não está reservada para você.")
+
+    async def finalizar_execucao(
+        self, execucao_id: int, status_final: StatusExecucaoEnum, versao: Optional[int] = None
+    ) -> Optional[ExecucaoTesteResponse]:
+        # A execução concluída não pode ficar sem os textos que ainda estão no autosave
+        await buffer_autosave.descarregar()
+        try:
+            execucao = await self.repo.update_status_geral(execucao_id, status_final, versao)
+        except ConflitoVersao as conflito:
+            self._erro_conflito("A execução foi alterada por outra pessoa.", ExecucaoTesteResponse.model_validate(conflito.atual))
         if execucao:
             return ExecucaoTesteResponse.model_validate(execucao)
         return None
 
-    async def upload_evidencia(self, passo_id: int, file: UploadFile) -> dict:
-        import shutil
-        import os
-        import uuid
-        
-        os.makedirs("evidencias", exist_ok=True)
-        
-        # 1. Gerar nome seguro (UUID) para evitar caracteres inválidos na URL
-        extension = os.path.splitext(file.filename)[1]
-        if not extension:
-            extension = ".jpg"
-            
-        safe_filename = f"{passo_id}_{uuid.uuid4()}{extension}"
-        file_path = f"evidencias/{safe_filename}"
-        
-        # 2. Resetar o ponteiro do arquivo antes de ler
-        await file.seek(0)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # 3. Retornar Dicionário compatível com o Frontend
-        # O Frontend espera: response.data.url
-        full_url = f"http://localhost:8000/evidencias/{safe_filename}"
-        
-        return {"url": full_url}
\ No newline at end of file
+    async def upload_evidencia(
+        self,
+        passo_id: int,
+        blocos: AsyncIterator[bytes],
+        content_type: Optional[str],
+        tamanho: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> EvidenciaUploadResponse:
+        """
+        Evidência endereçada pelo conteúdo: mesmo arquivo enviado de novo (outro
+        passo, o defeito) devolve o blob existente sem gravar nada. Com `sha256`
+        informado pelo cliente e blob já existente, o corpo nem é lido. Passo
+        inexistente responde 404 antes de ler o corpo.
+        """
+        if not await self.repo.existe_passo(passo_id):
+            raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
+
+        # Tipo e tamanho declarados são conferidos antes de gravar; o tamanho real, durante
+        tipo = normalizar_tipo(content_type)
+        validar_tamanho(tamanho)
+        if sha256:
+            sha256 = validar_sha256(sha256)
+            blob = await self.evidencias.tocar(sha256)
+            if blob:
+                return resposta_blob(blob, reaproveitada=True)
+
+        recebida = await receber_evidencia(blocos)
+        if sha256 and recebida.sha256 != sha256:
+            await descartar(recebida.parcial)
+            raise HTTPException(status_code=400, detail="Conteúdo recebido não confere com o SHA-256 informado")
+
+        blob = await self.evidencias.tocar(recebida.sha256)
+        if blob:
+            await descartar(recebida.parcial)
+            return resposta_blob(blob, reaproveitada=True)
+
+        caminho = caminho_blob(recebida.sha256, extensao_evidencia(tipo))
+        await armazenamento.publicar(recebida.parcial, caminho, tipo)
+        return await self._registrar_blob(recebida.sha256, caminho, tipo, recebida.tamanho)
+
+    async def _registrar_blob(self, sha256: str, caminho: str, tipo: str, tamanho: int) -> EvidenciaUploadResponse:
+        """Cadastra o blob já publicado em `caminho` e agenda as prévias."""
+        blob = await self.evidencias.registrar(sha256, caminho, tipo, tamanho)
+        if blob.caminho != caminho:
+            # Upload simultâneo do mesmo conteúdo com outra extensão venceu: fica o dele
+            await armazenamento.remover(caminho)
+        else:
+            # Miniaturas já começam a ser geradas; a resposta não espera por elas
+            gerador_previews.agendar(blob.sha256, blob.caminho, blob.content_type)
+        return resposta_blob(blob, reaproveitada=blob.caminho != caminho)
+
+    async def iniciar_upload_direto(self, dados: EvidenciaUploadDiretoCreate) -> EvidenciaUploadDiretoResponse:
+        """
+        Upload direto para o armazenamento: devolve uma URL de PUT de curta
+        duração (o arquivo não passa pela API) ou, se o conteúdo já existe, a
+        evidência pronta.
+        """
+        tipo = normalizar_tipo(dados.content_type)
+        validar_tamanho(dados.tamanho)
+        sha256 = validar_sha256(dados.sha256)
+        blob = await self.evidencias.tocar(sha256)
+        if blob:
+            return EvidenciaUploadDiretoResponse(evidencia=resposta_blob(blob, reaproveitada=True))
+
+        caminho = caminho_blob(sha256, extensao_evidencia(tipo))
+        url, headers = armazenamento.url_upload(caminho, tipo, sha256)
+        return EvidenciaUploadDiretoResponse(
+            url=url,
+            headers=headers,
+            caminho=caminho,
+            expira_em=datetime.now(timezone.utc) + timedelta(seconds=settings.EVIDENCIA_URL_EXPIRA_SEGUNDOS),
+        )
+
+    async def concluir_upload_direto(self, dados: EvidenciaUploadDiretoConcluir) -> EvidenciaUploadResponse:
+        """
+        Registra o blob enviado pela URL de iniciar_upload_direto. O conteúdo já
+        foi conferido pelo armazenamento (checksum assinado no S3, hash no PUT
+        local); aqui só se confere que o arquivo chegou e o tamanho.
+        """
+        tipo = normalizar_tipo(dados.content_type)
+        sha256 = validar_sha256(dados.sha256)
+        caminho = validar_caminho_blob(sha256, dados.caminho)
+        if caminho != caminho_blob(sha256, extensao_evidencia(tipo)):
+            raise HTTPException(status_code=422, detail="Caminho de evidência não corresponde ao tipo informado")
+
+        blob = await self.evidencias.tocar(sha256)
+        if blob:
+            if blob.caminho != caminho:
+                await armazenamento.remover(caminho)
+            return resposta_blob(blob, reaproveitada=True)
+
+        tamanho = await armazenamento.tamanho(caminho)
+        if tamanho is None:
+            raise HTTPException(status_code=409, detail="O arquivo ainda não foi enviado para a URL de upload")
+        if tamanho > settings.EVIDENCIA_MAX_BYTES:
+            await armazenamento.remover(caminho)
+            validar_tamanho(tamanho)
+        return await self._registrar_blob(sha256, caminho, tipo, tamanho)
+
+    async def obter_evidencia(self, sha256: str) -> EvidenciaUploadResponse:
+        """Anexo por hash: se o blob já existe, o cliente usa a URL sem enviar o arquivo."""
+        blob = await self.evidencias.tocar(validar_sha256(sha256))
+        if not blob:
+            raise HTTPException(status_code=404, detail="Evidência não encontrada")
+        return resposta_blob(blob, reaproveitada=True)
+
+    async def obter_preview(self, sha256: str, variante: str) -> str:
+        """
+        Caminho da variante no armazenamento. Já gerada, nem consulta o banco;
+        senão gera agora (evidência anterior ao pipeline, ou upload cuja geração
+        ainda roda).
+        """
+        if variante not in VARIANTES:
+            raise HTTPException(status_code=404, detail="Variante de prévia desconhecida")
+        sha256 = validar_sha256(sha256)
+        caminho = caminho_preview(sha256, variante)
+        if await armazenamento.existe(caminho):
+            return caminho
+
+        blob = await self.evidencias.get(sha256)
+        if not blob or blob.content_type not in TIPOS_COM_PREVIEW:
+            raise HTTPException(status_code=404, detail="Evidência sem prévia")
+        try:
+            await gerador_previews.gerar(blob.sha256, blob.caminho)
+        except Exception:
+            # Imagem corrompida ou arquivo ausente: a galeria mostra o ícone genérico
+            raise HTTPException(status_code=404, detail="Não foi possível gerar a prévia da evidência")
+        return caminho
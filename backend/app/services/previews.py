@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.armazenamento import armazenamento
+
+logger = logging.getLogger(__name__)
+
+# Variante -> maior lado em pixels (a imagem nunca é ampliada)
+VARIANTES: Dict[str, int] = {"miniatura": 256, "media": 1280}
+TIPOS_COM_PREVIEW = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+
+def caminho_preview(sha256: str, variante: str) -> str:
+    """previews/ab/cd/<sha256>-<variante>.webp, relativo ao armazenamento (mesmo shard do blob)."""
+    return f"previews/{sha256[:2]}/{sha256[2:4]}/{sha256}-{variante}.webp"
+
+def url_preview(sha256: str, variante: str) -> str:
+    return f"{settings.PUBLIC_BASE_URL.rstrip('/')}{settings.API_V1_STR}/testes/evidencias/previews/{sha256}/{variante}"
+
+def urls_previews(sha256: str, content_type: str) -> Dict[str, str]:
+    if content_type not in TIPOS_COM_PREVIEW:
+        return {}
+    return {variante: url_preview(sha256, variante) for variante in VARIANTES}
+
+def _gerar_variantes(origem: str, destinos: List[Tuple[int, str]]):
+    """
+    Roda no processo do pool: abre a imagem uma vez e grava cada variante em
+    WebP (da maior para a menor, cada uma reduzida a partir da anterior) nos
+    temporários `destinos`, que o processo da API publica no armazenamento.
+    """
+    from PIL import Image, ImageOps
+
+    # Acima do limite o Pillow só avisa (até o dobro): aqui vira erro antes de decodificar
+    Image.MAX_IMAGE_PIXELS = settings.PREVIEW_MAX_PIXELS
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+    with Image.open(origem) as imagem:
+        maior = max(lado for lado, _ in destinos)
+        imagem.draft("RGB", (maior, maior)) # JPEG: decodifica já reduzido
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode not in ("RGB", "RGBA"):
+            imagem = imagem.convert("RGBA" if "transparency" in imagem.info or imagem.mode in ("LA", "PA") else "RGB")
+
+        for lado, destino in sorted(destinos, reverse=True):
+            imagem.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            imagem.save(destino, "WEBP", quality=80, method=4)
+
+def _remover_parciais(parciais: List[str]):
+    for parcial in parciais:
+        try:
+            os.remove(parcial)
+        except FileNotFoundError:
+            pass
+
+class GeradorPreviews:
+    """
+    Miniaturas e prévias médias das evidências de imagem, geradas num pool de
+    processos (PREVIEW_PROCESSOS) para não disputar CPU nem GIL com as
+    requisições. As variantes ficam no armazenamento ao lado dos blobs; como o
+    blob é endereçado pelo conteúdo, cada variante é imutável e nunca é regerada.
+    Processo do pool que morre no meio (imagem que estoura a memória, decoder
+    que falha) quebra o pool inteiro: ele é recriado e a geração tentada de novo
+    uma vez.
+
+    O upload agenda a geração (agendar); quem pede a variante antes de ela
+    ficar pronta espera a mesma geração (gerar), nunca uma segunda.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._em_andamento: Dict[str, asyncio.Future] = {}
+        self._tarefas: Set[asyncio.Task] = set()
+
+    def iniciar(self):
+        if self._executor is None:
+            # spawn: o filho não herda o event loop nem as conexões do pool do processo da API
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PREVIEW_PROCESSOS, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def _recriar(self, quebrado: ProcessPoolExecutor):
+        # Várias gerações recebem BrokenProcessPool do mesmo pool: só a primeira o troca
+        if self._executor is quebrado:
+            self._executor = None
+            quebrado.shutdown(wait=False, cancel_futures=True)
+            self.iniciar()
+
+    async def parar(self):
+        for tarefa in list(self._tarefas):
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        if self._executor:
+            await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
+            self._executor = None
+
+    def agendar(self, sha256: str, caminho: str, content_type: str):
+        """Gera as variantes em segundo plano logo após o upload (erros só vão para o log)."""
+        if content_type not in TIPOS_COM_PREVIEW:
+            return
+        tarefa = asyncio.create_task(self.gerar(sha256, caminho))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._concluida)
+
+    def _concluida(self, tarefa: asyncio.Task):
+        self._tarefas.discard(tarefa)
+        if not tarefa.cancelled() and tarefa.exception():
+            logger.warning("Falha ao gerar as prévias da evidência: %s", tarefa.exception())
+
+    async def gerar(self, sha256: str, caminho: str):
+        """Gera todas as variantes do blob em `caminho`, ou espera a geração que já está em andamento."""
+        geracao = self._em_andamento.get(sha256)
+        if geracao is None:
+            geracao = asyncio.ensure_future(self._gerar(sha256, caminho))
+            self._em_andamento[sha256] = geracao
+            geracao.add_done_callback(lambda _: self._em_andamento.pop(sha256, None))
+        # shield: quem desistiu de esperar (cliente desconectou) não cancela a geração dos outros
+        await asyncio.shield(geracao)
+
+    async def _gerar(self, sha256: str, caminho: str):
+        self.iniciar()
+        # Temporários locais (.parcial-*: o coletor limpa se o processo morrer no meio)
+        parciais = {
+            variante: os.path.join(settings.EVIDENCIAS_DIR, f".parcial-{uuid.uuid4()}.webp") for variante in VARIANTES
+        }
+        destinos = [(VARIANTES[variante], parcial) for variante, parcial in parciais.items()]
+        try:
+            # No S3 o original é baixado para um temporário antes
+            async with armazenamento.arquivo_local(caminho) as origem:
+                for tentativa in range(2):
+                    executor = self._executor
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(executor, _gerar_variantes, origem, destinos)
+                        break
+                    except BrokenProcessPool:
+                        self._recriar(executor)
+                        if tentativa:
+                            raise
+            for variante, parcial in parciais.items():
+                await armazenamento.publicar(parcial, caminho_preview(sha256, variante), "image/webp")
+        finally:
+            await asyncio.to_thread(_remover_parciais, list(parciais.values()))
+
+gerador_previews = GeradorPreviews()
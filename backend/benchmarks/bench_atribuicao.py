@@ -0,0 +1,70 @@
+"""
+Atribuição balanceada de um ciclo: todas as execuções geradas por `popular`
+são movidas para um ciclo só, ficam sem responsável e em status pendente, e
+então são distribuídas entre os runners do sistema por atribuir_ciclo
+(simulação e gravação). Mede o tempo total e mostra o desequilíbrio de carga
+(maior carga / menor carga).
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_atribuicao --execucoes 50000 --runners 100
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.execucao_teste import AtribuicaoCiclo
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def preparar(engine, sistema_id: int):
+    async with engine.begin() as conn:
+        ciclo_id = (await conn.execute(text("""
+            SELECT min(ci.id) FROM ciclos_teste ci JOIN projetos p ON p.id = ci.projeto_id WHERE p.sistema_id = :s
+        """), {"s": sistema_id})).scalar()
+        runners = (await conn.execute(text("""
+            SELECT DISTINCT e.responsavel_id FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s
+        """), {"s": sistema_id})).scalars().all()
+        await conn.execute(text("""
+            UPDATE execucoes_teste SET ciclo_teste_id = :ciclo, responsavel_id = NULL, status_geral = 'pendente'
+            WHERE caso_teste_id IN (
+                SELECT c.id FROM casos_teste c JOIN projetos p ON p.id = c.projeto_id WHERE p.sistema_id = :s
+            )
+        """), {"ciclo": ciclo_id, "s": sistema_id})
+    return ciclo_id, list(runners)
+
+async def rodar(volume: int, runners: int):
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(engine)
+    sistema_id = await popular(engine, volume, total_runners=runners)
+    try:
+        ciclo_id, usuarios = await preparar(engine, sistema_id)
+        print(f"{'modo':>9} | {'total ms':>9} | {'atribuídas':>10} | {'statements':>10} | {'desequilíbrio':>13}")
+        for simular in (True, False):
+            contador.zerar()
+            inicio = time.perf_counter()
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                r = await ExecucaoTesteService(session).atribuir_ciclo(
+                    ciclo_id, AtribuicaoCiclo(usuarios_ids=usuarios, simular=simular)
+                )
+            total = (time.perf_counter() - inicio) * 1000
+            cargas = [c.carga_total_segundos for c in r.carga_por_usuario]
+            desequilibrio = max(cargas) / max(min(cargas), 1)
+            modo = "simulação" if simular else "gravação"
+            print(f"{modo:>9} | {total:>9.0f} | {r.execucoes_atribuidas:>10} | {contador.statements:>10} | {desequilibrio:>13.3f}")
+    finally:
+        await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=50_000)
+    parser.add_argument("--runners", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.runners))
@@ -0,0 +1,93 @@
+"""
+Autosave de resultado_obtido durante a digitação: cada runner envia o texto
+do passo a cada --intervalo-digitacao-ms, trocando de passo a cada
+--eventos-por-passo envios. Compara o PUT direto por envio
+(registrar_resultado_passo) com o buffer write-behind (buffer_autosave,
+descarregado a cada AUTOSAVE_INTERVALO_MS). Mede statements, commits e
+tempo de banco gastos em cada caminho durante a mesma janela de digitação.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_autosave --runners 50 --duracao 10 --intervalo-digitacao-ms 150
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.core import database
+from app.core.config import settings
+from app.schemas.execucao_teste import AutosavePasso, ExecucaoPassoUpdate
+from app.services.autosave_passos import buffer_autosave
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def passos_por_runner(engine, sistema_id: int, runners: int, por_runner: int):
+    async with engine.connect() as conn:
+        ids = (await conn.execute(text("""
+            SELECT ep.id FROM execucoes_passos ep
+            JOIN execucoes_teste e ON e.id = ep.execucao_teste_id
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s ORDER BY ep.id LIMIT :n
+        """), {"s": sistema_id, "n": runners * por_runner})).scalars().all()
+    return [ids[i::runners] for i in range(runners)]
+
+async def digitar(passos, duracao: float, intervalo: float, eventos_por_passo: int, enviar):
+    fim = time.monotonic() + duracao
+    texto, evento = "", 0
+    while time.monotonic() < fim:
+        passo_id = passos[(evento // eventos_por_passo) % len(passos)]
+        texto = texto[-200:] + "digitando "
+        await enviar(passo_id, texto)
+        evento += 1
+        await asyncio.sleep(intervalo)
+    return evento
+
+async def direto(passo_id: int, texto: str):
+    async with database.AsyncSessionLocal() as sessao:
+        await ExecucaoTesteService(sessao).registrar_resultado_passo(
+            passo_id, ExecucaoPassoUpdate(status="pendente", resultado_obtido=texto)
+        )
+
+async def bufferizado(passo_id: int, texto: str):
+    # Como o endpoint: lê a versao do passo e deixa o texto no buffer
+    async with database.AsyncSessionLocal() as sessao:
+        await ExecucaoTesteService(sessao).agendar_autosave(passo_id, AutosavePasso(resultado_obtido=texto))
+
+async def rodar(volume: int, runners: int, duracao: float, intervalo_ms: int, eventos_por_passo: int):
+    database.engine.sync_engine.echo = False
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(database.engine)
+    sistema_id = await popular(engine, volume, gerar_passos_execucao=True)
+    try:
+        passos = await passos_por_runner(engine, sistema_id, runners, 20)
+        print(f"flush a cada {settings.AUTOSAVE_INTERVALO_MS} ms")
+        print(f"{'caminho':>8} | {'envios':>7} | {'statements':>10} | {'commits':>7} | {'db ms':>9}")
+        for nome, enviar in (("direto", direto), ("buffer", bufferizado)):
+            if enviar is bufferizado:
+                buffer_autosave.iniciar()
+            contador.zerar()
+            envios = await asyncio.gather(*(
+                digitar(p, duracao, intervalo_ms / 1000, eventos_por_passo, enviar) for p in passos
+            ))
+            if enviar is bufferizado:
+                await buffer_autosave.parar()
+            print(
+                f"{nome:>8} | {sum(envios):>7} | {contador.statements:>10} | "
+                f"{contador.commits:>7} | {contador.tempo_ms:>9.0f}"
+            )
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+        await database.engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=10_000)
+    parser.add_argument("--runners", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=10, help="segundos de digitação por caminho")
+    parser.add_argument("--intervalo-digitacao-ms", type=int, default=150)
+    parser.add_argument("--eventos-por-passo", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.runners, args.duracao, args.intervalo_digitacao_ms, args.eventos_por_passo))
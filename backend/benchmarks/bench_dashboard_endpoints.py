@@ -0,0 +1,72 @@
+"""
+Latência dos três dashboards (geral, runner e performance) com as consultas
+em sequência na sessão da requisição ("sequencial", comportamento anterior)
+e com o fan-out em conexões separadas (ConsultasParalelas).
+
+O cache de respostas é ignorado (chama os métodos _calcular_*) para medir só o banco.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_dashboard_endpoints --execucoes 100000 1000000
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import database
+from app.core.fanout import ConsultasParalelas
+from app.services.dashboard_service import DashboardService
+from benchmarks.dados import criar_engine, limpar, medir, popular
+
+class ConsultasSequenciais(ConsultasParalelas):
+    def _paralelo_disponivel(self) -> bool:
+        return False
+
+async def runner_do_sistema(engine, sistema_id: int) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("""
+            SELECT min(e.responsavel_id) FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s
+        """), {"s": sistema_id})).scalar()
+
+async def rodar(volumes, repeticoes: int):
+    # As sessões do fan-out usam o engine da aplicação; o echo distorceria as medições
+    database.engine.sync_engine.echo = False
+    engine = criar_engine()
+
+    print(f"{'execucoes':>10} | {'endpoint':>22} | {'sequencial ms':>13} | {'paralelo ms':>11} | {'p95 seq':>8} | {'p95 par':>8}")
+    for volume in volumes:
+        sistema_id = await popular(engine, volume)
+        runner_id = await runner_do_sistema(engine, sistema_id)
+        try:
+            async with AsyncSession(engine) as session:
+                service = DashboardService(session)
+                endpoints = {
+                    "/dashboard": lambda: service._calcular_dashboard_data(sistema_id),
+                    "/dashboard-runners": lambda: service.get_runner_dashboard_data(runner_id),
+                    "/dashboard-runners/perf": lambda: service._calcular_performance_analytics(None),
+                }
+                for nome, chamada in endpoints.items():
+                    service.paralelo = ConsultasSequenciais(session)
+                    antes = await medir(chamada, repeticoes)
+                    service.paralelo = ConsultasParalelas(session)
+                    depois = await medir(chamada, repeticoes)
+                    print(
+                        f"{volume:>10} | {nome:>22} | {antes['mediana_ms']:>13} | {depois['mediana_ms']:>11} | "
+                        f"{antes['p95_ms']:>8} | {depois['p95_ms']:>8}"
+                    )
+        finally:
+            await limpar(engine, sistema_id)
+
+    await engine.dispose()
+    await database.engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.repeticoes))
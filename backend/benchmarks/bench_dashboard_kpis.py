@@ -0,0 +1,71 @@
+"""
+Compara o caminho antigo do dashboard geral (7 queries de KPI + 3 de gráficos)
+com o snapshot agregado (DashboardRepository.get_dashboard_snapshot) e com a
+leitura das tabelas de rollup (get_snapshot_consolidado) e da view
+materializada (get_snapshot_materializado; o tempo do refresh sai à parte).
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_dashboard_kpis --execucoes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.dashboard_repository import DashboardRepository
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, medir, popular
+
+async def caminho_antigo(repo: DashboardRepository, sistema_id: int):
+    await repo.get_kpis_gerais(sistema_id)
+    await repo.get_status_execucao_geral(sistema_id)
+    await repo.get_defeitos_por_severidade(sistema_id)
+    await repo.get_modulos_com_mais_defeitos(limit=5, sistema_id=sistema_id)
+
+async def caminho_snapshot(repo: DashboardRepository, sistema_id: int):
+    await repo.get_dashboard_snapshot(sistema_id, limit_modulos=5)
+
+async def caminho_rollup(repo: DashboardRepository, sistema_id: int):
+    await repo.get_snapshot_consolidado(sistema_id, limit_modulos=5)
+
+async def caminho_matview(repo: DashboardRepository, sistema_id: int):
+    await repo.get_snapshot_materializado(sistema_id)
+
+async def rodar(volumes, repeticoes: int):
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(engine)
+
+    print(f"{'execucoes':>10} | {'caminho':>9} | {'queries':>7} | {'mediana ms':>10} | {'p95 ms':>8}")
+    for volume in volumes:
+        sistema_id = await popular(engine, volume)
+        try:
+            async with AsyncSession(engine) as session:
+                inicio = time.perf_counter()
+                await DashboardRollupRepository(session).atualizar_views()
+                await session.commit()
+                print(f"{volume:>10} | refresh da view: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+                repo = DashboardRepository(session)
+                caminhos = (
+                    ("antigo", caminho_antigo), ("snapshot", caminho_snapshot),
+                    ("rollup", caminho_rollup), ("matview", caminho_matview),
+                )
+                for nome, caminho in caminhos:
+                    contador.zerar()
+                    await caminho(repo, sistema_id)
+                    queries = contador.statements
+
+                    tempos = await medir(lambda: caminho(repo, sistema_id), repeticoes)
+                    print(f"{volume:>10} | {nome:>9} | {queries:>7} | {tempos['mediana_ms']:>10} | {tempos['p95_ms']:>8}")
+        finally:
+            await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.repeticoes))
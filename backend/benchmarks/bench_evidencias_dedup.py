@@ -0,0 +1,93 @@
+"""
+Evidência repetida (a mesma captura anexada a vários passos e ao defeito):
+--arquivos distintos de --tamanho-mb MB, cada um enviado --repeticoes vezes.
+Compara o armazenamento plano anterior (um arquivo novo por envio) com o
+repositório endereçado pelo conteúdo (upload_evidencia), com e sem o hash
+informado pelo cliente (X-Content-SHA256). Mede tempo e bytes gravados.
+
+Os arquivos vão para um EVIDENCIAS_DIR temporário, removido no final; os
+blobs cadastrados também são removidos. Exige EVIDENCIAS_ARMAZENAMENTO=local
+(os bytes em disco são medidos no diretório).
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado
+e um passo de execução existente):
+    python -m benchmarks.bench_evidencias_dedup --passo-id 1 --arquivos 20 --repeticoes 5 --tamanho-mb 2
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.evidencia_blob import EvidenciaBlob
+from app.services.armazenamento import armazenamento
+from app.services.evidencias import receber_evidencia
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import criar_engine
+
+async def blocos(conteudo: bytes):
+    for inicio in range(0, len(conteudo), 64 * 1024):
+        yield conteudo[inicio:inicio + 64 * 1024]
+
+def bytes_em_disco() -> int:
+    return sum(
+        os.path.getsize(os.path.join(raiz, nome))
+        for raiz, _, nomes in os.walk(settings.EVIDENCIAS_DIR) for nome in nomes
+    )
+
+async def plano(engine, passo_id: int, conteudo: bytes, _):
+    recebida = await receber_evidencia(blocos(conteudo))
+    await armazenamento.publicar(recebida.parcial, f"{os.urandom(8).hex()}.png", "image/png")
+
+async def enderecado(engine, passo_id: int, conteudo: bytes, sha256):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await ExecucaoTesteService(session).upload_evidencia(
+            passo_id, blocos(conteudo), "image/png", len(conteudo), sha256
+        )
+
+async def rodar(passo_id: int, arquivos: int, repeticoes: int, tamanho_mb: float):
+    engine = criar_engine()
+    conteudos = [os.urandom(int(tamanho_mb * 1024 * 1024)) for _ in range(arquivos)]
+    hashes = [hashlib.sha256(c).hexdigest() for c in conteudos]
+    diretorio_original = settings.EVIDENCIAS_DIR
+
+    print(f"{'caminho':>16} | {'envios':>6} | {'s':>7} | {'MB em disco':>11}")
+    try:
+        for nome, caminho, com_hash in (
+            ("plano", plano, False),
+            ("por conteúdo", enderecado, False),
+            ("conteúdo + hash", enderecado, True),
+        ):
+            settings.EVIDENCIAS_DIR = tempfile.mkdtemp(prefix="bench_evidencias_")
+            async with engine.begin() as conn:
+                await conn.execute(delete(EvidenciaBlob).where(EvidenciaBlob.sha256.in_(hashes)))
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                for conteudo, sha256 in zip(conteudos, hashes):
+                    await caminho(engine, passo_id, conteudo, sha256 if com_hash else None)
+            duracao = time.perf_counter() - inicio
+            print(
+                f"{nome:>16} | {arquivos * repeticoes:>6} | {duracao:>7.2f} | "
+                f"{bytes_em_disco() / 1024 / 1024:>11.1f}"
+            )
+            shutil.rmtree(settings.EVIDENCIAS_DIR, ignore_errors=True)
+    finally:
+        settings.EVIDENCIAS_DIR = diretorio_original
+        async with engine.begin() as conn:
+            await conn.execute(delete(EvidenciaBlob).where(EvidenciaBlob.sha256.in_(hashes)))
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passo-id", type=int, default=1, help="passo de execução existente que recebe os envios")
+    parser.add_argument("--arquivos", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--tamanho-mb", type=float, default=2)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.passo_id, args.arquivos, args.repeticoes, args.tamanho_mb))
@@ -0,0 +1,92 @@
+"""
+Fila de reservas sob concorrência: N runners simultâneos chamando
+reservar_proxima (FOR UPDATE SKIP LOCKED) até o número de reservas pedido.
+Mede reservas por segundo e latência, e confere que nenhuma execução foi
+reservada duas vezes.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado;
+o Postgres precisa aceitar --runners conexões):
+    python -m benchmarks.bench_fila_reservas --execucoes 100000 --runners 50 200 --reservas 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from benchmarks.dados import criar_engine, limpar, popular
+
+async def runners_do_sistema(engine, sistema_id: int):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("""
+            SELECT DISTINCT e.responsavel_id FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s
+        """), {"s": sistema_id})).scalars().all()
+
+async def liberar_todas(engine, sistema_id: int):
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            UPDATE execucoes_teste SET reservado_por_id = NULL, reservado_ate = NULL
+            WHERE caso_teste_id IN (
+                SELECT c.id FROM casos_teste c JOIN projetos p ON p.id = c.projeto_id WHERE p.sistema_id = :s
+            )
+        """), {"s": sistema_id})
+
+async def rodada(engine, usuarios, runners: int, reservas: int, projeto_ids):
+    reservadas, tempos = [], []
+    restantes = [reservas]
+
+    async def runner(usuario_id: int):
+        while restantes[0] > 0:
+            restantes[0] -= 1
+            inicio = time.perf_counter()
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                execucao_id = await ExecucaoTesteRepository(session).reservar_proxima(usuario_id, projeto_id=projeto_ids[0])
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            if execucao_id is None:
+                return
+            reservadas.append(execucao_id)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(runner(usuarios[i % len(usuarios)]) for i in range(runners)))
+    total = time.perf_counter() - inicio
+    tempos.sort()
+    return {
+        "por_segundo": len(reservadas) / total if total else 0,
+        "mediana_ms": statistics.median(tempos) if tempos else 0,
+        "p95_ms": tempos[int(len(tempos) * 0.95) - 1] if tempos else 0,
+        "duplicadas": len(reservadas) - len(set(reservadas)),
+    }
+
+async def rodar(volume: int, concorrencias, reservas: int):
+    engine = criar_engine(pool_size=max(concorrencias))
+    sistema_id = await popular(engine, volume, passos_por_caso=0)
+    try:
+        usuarios = await runners_do_sistema(engine, sistema_id)
+        async with engine.connect() as conn:
+            projeto_ids = (await conn.execute(
+                text("SELECT id FROM projetos WHERE sistema_id = :s ORDER BY id"), {"s": sistema_id}
+            )).scalars().all()
+
+        print(f"{'runners':>7} | {'reservas/s':>10} | {'mediana ms':>10} | {'p95 ms':>8} | {'duplicadas':>10}")
+        for runners in concorrencias:
+            await liberar_todas(engine, sistema_id)
+            r = await rodada(engine, usuarios, runners, reservas, projeto_ids)
+            print(f"{runners:>7} | {r['por_segundo']:>10.0f} | {r['mediana_ms']:>10.2f} | {r['p95_ms']:>8.2f} | {r['duplicadas']:>10}")
+    finally:
+        await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=100_000)
+    parser.add_argument("--runners", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--reservas", type=int, default=500, help="reservas por rodada, todas no mesmo projeto")
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.runners, args.reservas))
@@ -0,0 +1,74 @@
+"""
+Páginas profundas de /testes/minhas-tarefas para um runner com muitas
+execuções: offset/limit (skip) contra keyset (cursor de updated_at, id),
+com e sem filtro de status. A posição do cursor de cada página é lida antes
+da medição.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_minhas_tarefas --execucoes 50000 --paginas 1 100 1000 2400
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.testing import StatusExecucaoEnum
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from benchmarks.dados import criar_engine, limpar, medir, popular
+
+TAMANHO_PAGINA = 20
+
+async def runner_do_sistema(engine, sistema_id: int) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("""
+            SELECT e.responsavel_id FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s LIMIT 1
+        """), {"s": sistema_id})).scalar()
+
+async def posicao_antes(engine, runner_id: int, status, skip: int):
+    if skip == 0:
+        return None
+    filtro = "AND status_geral = :status" if status else ""
+    async with engine.connect() as conn:
+        return tuple((await conn.execute(text(f"""
+            SELECT updated_at, id FROM execucoes_teste
+            WHERE responsavel_id = :r {filtro}
+            ORDER BY updated_at DESC, id DESC OFFSET :o LIMIT 1
+        """), {"r": runner_id, "status": status.value if status else None, "o": skip - 1})).one())
+
+async def rodar(volume: int, paginas, repeticoes: int):
+    engine = criar_engine()
+    # Um único runner: todas as execuções geradas são dele
+    sistema_id = await popular(engine, volume, passos_por_caso=0, total_runners=1)
+    try:
+        runner_id = await runner_do_sistema(engine, sistema_id)
+        print(f"{'status':>8} | {'pagina':>6} | {'caminho':>6} | {'mediana ms':>10} | {'p95 ms':>8}")
+        for status in (None, StatusExecucaoEnum.fechado):
+            for pagina in paginas:
+                skip = (pagina - 1) * TAMANHO_PAGINA
+                cursor = await posicao_antes(engine, runner_id, status, skip)
+                async with AsyncSession(engine) as session:
+                    repo = ExecucaoTesteRepository(session)
+                    caminhos = {
+                        "offset": lambda: repo.get_minhas_execucoes_resumo(runner_id, status, skip, TAMANHO_PAGINA),
+                        "cursor": lambda: repo.get_minhas_execucoes_resumo(runner_id, status, 0, TAMANHO_PAGINA, cursor=cursor),
+                    }
+                    for nome, caminho in caminhos.items():
+                        tempos = await medir(caminho, repeticoes)
+                        rotulo = status.value if status else "todos"
+                        print(f"{rotulo:>8} | {pagina:>6} | {nome:>6} | {tempos['mediana_ms']:>10} | {tempos['p95_ms']:>8}")
+    finally:
+        await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=50_000)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1, 100, 1000, 2400])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.paginas, args.repeticoes))
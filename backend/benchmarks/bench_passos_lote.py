@@ -0,0 +1,83 @@
+"""
+Registro de todos os passos de uma execução: um PUT por passo
+(registrar_resultado_passo, caminho atual) contra um único PUT com o lote
+(registrar_resultados_passos). Mede tempo, statements e commits por execução.
+
+Cada caminho usa execuções pendentes diferentes, para que ambos partam do mesmo estado.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_passos_lote --passos 10 40 --execucoes-medidas 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.execucao_teste import ExecucaoPassoLoteItem, ExecucaoPassosLote, ExecucaoPassoUpdate
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def execucoes_pendentes(engine, sistema_id: int, quantidade: int):
+    async with engine.connect() as conn:
+        linhas = (await conn.execute(text("""
+            SELECT e.id, array_agg(ep.id ORDER BY ep.id)
+            FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            JOIN execucoes_passos ep ON ep.execucao_teste_id = e.id
+            WHERE p.sistema_id = :s AND e.status_geral = 'pendente'
+            GROUP BY e.id
+            ORDER BY e.id
+            LIMIT :n
+        """), {"s": sistema_id, "n": quantidade})).all()
+    return [(execucao_id, list(passos)) for execucao_id, passos in linhas]
+
+async def por_passo(engine, execucao_id: int, passos):
+    for passo_id in passos:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            dados = ExecucaoPassoUpdate(status="passou", resultado_obtido="ok")
+            await ExecucaoTesteService(session).registrar_resultado_passo(passo_id, dados)
+
+async def em_lote(engine, execucao_id: int, passos):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        dados = ExecucaoPassosLote(passos=[
+            ExecucaoPassoLoteItem(id=passo_id, status="passou", resultado_obtido="ok") for passo_id in passos
+        ])
+        await ExecucaoTesteService(session).registrar_resultados_passos(execucao_id, dados)
+
+async def rodar(passos_por_caso, volume: int, medidas: int):
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(engine)
+
+    print(f"{'passos':>6} | {'caminho':>9} | {'mediana ms':>10} | {'statements':>10} | {'commits':>7}")
+    for passos in passos_por_caso:
+        sistema_id = await popular(engine, volume, passos_por_caso=passos, gerar_passos_execucao=True)
+        try:
+            alvos = await execucoes_pendentes(engine, sistema_id, medidas * 2)
+            for nome, caminho, lote in (("por passo", por_passo, alvos[::2]), ("lote", em_lote, alvos[1::2])):
+                tempos = []
+                contador.zerar()
+                for execucao_id, ids in lote:
+                    inicio = time.perf_counter()
+                    await caminho(engine, execucao_id, ids)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                n = max(len(lote), 1)
+                print(
+                    f"{passos:>6} | {nome:>9} | {statistics.median(tempos) if tempos else 0:>10.2f} | "
+                    f"{contador.statements / n:>10.1f} | {contador.commits / n:>7.1f}"
+                )
+        finally:
+            await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passos", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--execucoes", type=int, default=10_000, help="volume de execuções gerado por rodada")
+    parser.add_argument("--execucoes-medidas", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.passos, args.execucoes, args.execucoes_medidas))
@@ -0,0 +1,92 @@
+"""
+Planejamento de ciclo: um POST /testes/execucoes/ por caso (alocar_teste,
+medido numa amostra e extrapolado) contra um único planejamento em lote
+(planejar_ciclo) com todos os casos, num ciclo novo.
+
+Os casos gerados por `popular` ficam espalhados em vários projetos; antes de
+medir, todos são movidos para o primeiro projeto do sistema.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_planejamento --casos 2000 10000 --passos 10
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.execucao_teste import PlanejamentoLote, RegraAtribuicaoEnum
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def preparar(engine, sistema_id: int):
+    async with engine.begin() as conn:
+        projeto_id = (await conn.execute(
+            text("SELECT min(id) FROM projetos WHERE sistema_id = :s"), {"s": sistema_id}
+        )).scalar()
+        await conn.execute(text("""
+            UPDATE casos_teste SET projeto_id = :p
+            WHERE projeto_id IN (SELECT id FROM projetos WHERE sistema_id = :s)
+        """), {"p": projeto_id, "s": sistema_id})
+        ciclos = [
+            (await conn.execute(text("""
+                INSERT INTO ciclos_teste (projeto_id, nome, numero, status)
+                VALUES (:p, :nome, 2, 'planejado') RETURNING id
+            """), {"p": projeto_id, "nome": nome})).scalar()
+            for nome in ("bench-por-caso", "bench-lote")
+        ]
+        casos = (await conn.execute(
+            text("SELECT id FROM casos_teste WHERE projeto_id = :p ORDER BY id"), {"p": projeto_id}
+        )).scalars().all()
+        runners = (await conn.execute(text("""
+            SELECT DISTINCT e.responsavel_id FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id WHERE c.projeto_id = :p
+        """), {"p": projeto_id})).scalars().all()
+    return ciclos, list(casos), list(runners)
+
+async def rodar(volumes, passos: int, amostra: int):
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(engine)
+
+    print(f"{'casos':>6} | {'caminho':>20} | {'total s':>8} | {'statements':>10} | {'commits':>7}")
+    for casos_alvo in volumes:
+        sistema_id = await popular(engine, casos_alvo * 10, passos_por_caso=passos)
+        try:
+            (ciclo_por_caso, ciclo_lote), casos, runners = await preparar(engine, sistema_id)
+
+            contador.zerar()
+            inicio = time.perf_counter()
+            for i, caso_id in enumerate(casos[:amostra]):
+                async with AsyncSession(engine, expire_on_commit=False) as session:
+                    await ExecucaoTesteService(session).alocar_teste(ciclo_por_caso, caso_id, runners[i % len(runners)])
+            por_caso = (time.perf_counter() - inicio) / amostra
+            fator = len(casos) / amostra
+            print(
+                f"{len(casos):>6} | {'por caso (estimado)':>20} | {por_caso * len(casos):>8.1f} | "
+                f"{contador.statements * fator:>10.0f} | {contador.commits * fator:>7.0f}"
+            )
+
+            contador.zerar()
+            inicio = time.perf_counter()
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                resumo = await ExecucaoTesteService(session).planejar_ciclo(ciclo_lote, PlanejamentoLote(
+                    caso_teste_ids=casos, regra=RegraAtribuicaoEnum.rodizio, responsaveis_ids=runners
+                ))
+            print(
+                f"{len(casos):>6} | {'lote':>20} | {time.perf_counter() - inicio:>8.1f} | "
+                f"{contador.statements:>10} | {contador.commits:>7}"
+            )
+            print(f"         execuções: {resumo.execucoes_criadas}, passos: {resumo.passos_criados}")
+        finally:
+            await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", type=int, nargs="+", default=[2000, 10_000])
+    parser.add_argument("--passos", type=int, default=10)
+    parser.add_argument("--amostra", type=int, default=200, help="casos planejados um a um para a estimativa")
+    args = parser.parse_args()
+    asyncio.run(rodar(args.casos, args.passos, args.amostra))
@@ -0,0 +1,99 @@
+"""
+Replay de um workload de polling (painéis consultando /dashboard, casos,
+ciclos e defeitos a cada ciclo) com e sem GET condicional.
+
+Cada cliente guarda o ETag da última resposta e o reenvia em If-None-Match;
+a cada `--escrita-a-cada` polls uma execução muda de status (o que invalida
+as versões do sistema/projeto). Compara bytes de payload recebidos, número
+de statements e tempo de banco gasto pelos endpoints.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_polling_condicional --execucoes 100000 --polls 2000
+"""
+import argparse
+import asyncio
+import random
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import database, security
+from app.main import app
+from app.models.testing import StatusExecucaoEnum
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.services.dashboard_service import invalidar_cache_dashboard
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def alvos_do_sistema(engine, sistema_id: int):
+    async with engine.connect() as conn:
+        projeto_id = (await conn.execute(
+            text("SELECT min(id) FROM projetos WHERE sistema_id = :s"), {"s": sistema_id}
+        )).scalar()
+        runner_id, execucoes = (await conn.execute(text("""
+            SELECT min(e.responsavel_id), array_agg(e.id)
+            FROM execucoes_teste e JOIN casos_teste c ON c.id = e.caso_teste_id
+            WHERE c.projeto_id = :p
+        """), {"p": projeto_id})).one()
+    return projeto_id, runner_id, execucoes
+
+async def replay(client, urls, execucoes, polls: int, escrita_a_cada: int, condicional: bool, contador):
+    etags = {}
+    resultado = {"bytes": 0, "304": 0, "200": 0}
+    aleatorio = random.Random(42)
+    contador.zerar()
+
+    for i in range(polls):
+        if escrita_a_cada and i and i % escrita_a_cada == 0:
+            async with database.AsyncSessionLocal() as sessao:
+                status = aleatorio.choice([StatusExecucaoEnum.em_progresso, StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha])
+                await ExecucaoTesteRepository(sessao).update_status(aleatorio.choice(execucoes), status)
+            # Sem o lifespan não há LISTEN: invalida o cache como o ouvinte faria
+            invalidar_cache_dashboard({"tudo": True})
+
+        url = urls[i % len(urls)]
+        headers = {"If-None-Match": etags[url]} if condicional and url in etags else {}
+        resposta = await client.get(url, headers=headers)
+        resultado["bytes"] += len(resposta.content)
+        resultado[str(resposta.status_code)] = resultado.get(str(resposta.status_code), 0) + 1
+        if "etag" in resposta.headers:
+            etags[url] = resposta.headers["etag"]
+
+    resultado["statements"] = contador.statements
+    resultado["db_ms"] = round(contador.tempo_ms, 1)
+    return resultado
+
+async def rodar(volume: int, polls: int, escrita_a_cada: int):
+    database.engine.sync_engine.echo = False
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(database.engine)
+
+    sistema_id = await popular(engine, volume)
+    try:
+        projeto_id, runner_id, execucoes = await alvos_do_sistema(engine, sistema_id)
+        token = security.create_access_token({"sub": str(runner_id)})
+        urls = [
+            f"/api/v1/dashboard/?sistema_id={sistema_id}",
+            f"/api/v1/testes/projetos/{projeto_id}/casos",
+            f"/api/v1/testes/projetos/{projeto_id}/ciclos",
+            "/api/v1/defeitos/",
+        ]
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}) as client:
+            print(f"{'modo':>12} | {'200':>6} | {'304':>6} | {'bytes':>12} | {'statements':>10} | {'db ms':>10}")
+            for nome, condicional in (("sem ETag", False), ("com ETag", True)):
+                invalidar_cache_dashboard({"tudo": True})
+                r = await replay(client, urls, execucoes, polls, escrita_a_cada, condicional, contador)
+                print(f"{nome:>12} | {r.get('200', 0):>6} | {r.get('304', 0):>6} | {r['bytes']:>12} | {r['statements']:>10} | {r['db_ms']:>10}")
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+        await database.engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=100_000)
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--escrita-a-cada", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.polls, args.escrita_a_cada))
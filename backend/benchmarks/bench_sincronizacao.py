@@ -0,0 +1,114 @@
+"""
+Sincronização do jornal offline de um runner: as mesmas operações (resultado
+de passo, evidência, status de execução) aplicadas uma requisição por
+operação (registrar_resultado_passo / finalizar_execucao) contra um único
+POST /testes/sincronizacao (sincronizar_jornal). Mede tempo, statements e
+commits; depois reenvia o jornal para conferir que nada é reaplicado.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_sincronizacao --operacoes 200 --passos 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.testing import StatusExecucaoEnum
+from app.schemas.execucao_teste import ExecucaoPassoUpdate, JornalSincronizacao, OperacaoJornal
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def execucoes_pendentes(engine, sistema_id: int, quantidade: int):
+    async with engine.connect() as conn:
+        linhas = (await conn.execute(text("""
+            SELECT e.id, e.responsavel_id, array_agg(ep.id ORDER BY ep.id)
+            FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            JOIN execucoes_passos ep ON ep.execucao_teste_id = e.id
+            WHERE p.sistema_id = :s AND e.status_geral = 'pendente' AND e.responsavel_id IS NOT NULL
+            GROUP BY e.id
+            ORDER BY e.id
+            LIMIT :n
+        """), {"s": sistema_id, "n": quantidade})).all()
+    return [(execucao_id, responsavel_id, list(passos)) for execucao_id, responsavel_id, passos in linhas]
+
+def montar_jornal(execucoes, total: int):
+    """Por execução: resultado de cada passo, uma evidência no primeiro e o fechamento."""
+    operacoes = []
+    for execucao_id, _, passos in execucoes:
+        for passo_id in passos:
+            operacoes.append(OperacaoJornal(
+                op_id=str(uuid.uuid4()), tipo="passo", execucao_id=execucao_id,
+                passo_id=passo_id, status="passou", resultado_obtido="ok offline"
+            ))
+        operacoes.append(OperacaoJornal(
+            op_id=str(uuid.uuid4()), tipo="evidencia", execucao_id=execucao_id,
+            passo_id=passos[0], evidencias=[f"evidencias/{uuid.uuid4().hex}.jpg"]
+        ))
+        operacoes.append(OperacaoJornal(
+            op_id=str(uuid.uuid4()), tipo="status", execucao_id=execucao_id, status="fechado"
+        ))
+        if len(operacoes) >= total:
+            break
+    return operacoes[:total]
+
+async def uma_a_uma(engine, usuario_id: int, operacoes):
+    for op in operacoes:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            service = ExecucaoTesteService(session)
+            if op.tipo == "status":
+                await service.finalizar_execucao(op.execucao_id, StatusExecucaoEnum(op.status))
+            elif op.tipo == "evidencia":
+                await service.registrar_resultado_passo(op.passo_id, ExecucaoPassoUpdate(evidencias=op.evidencias))
+            else:
+                await service.registrar_resultado_passo(
+                    op.passo_id, ExecucaoPassoUpdate(status=op.status, resultado_obtido=op.resultado_obtido)
+                )
+
+async def jornal(engine, usuario_id: int, operacoes):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        return await ExecucaoTesteService(session).sincronizar_jornal(
+            usuario_id, JornalSincronizacao(operacoes=operacoes)
+        )
+
+async def rodar(volume: int, passos: int, total: int):
+    engine = criar_engine()
+    contador = ContadorIdasAoBanco(engine)
+    sistema_id = await popular(engine, volume, passos_por_caso=passos, gerar_passos_execucao=True)
+    try:
+        por_execucao = passos + 2
+        alvos = await execucoes_pendentes(engine, sistema_id, 2 * (total // por_execucao + 1))
+        usuario_id = alvos[0][1]
+
+        print(f"{'caminho':>10} | {'operacoes':>9} | {'ms':>9} | {'statements':>10} | {'commits':>7}")
+        for nome, caminho, lote in (("uma a uma", uma_a_uma, alvos[::2]), ("jornal", jornal, alvos[1::2])):
+            operacoes = montar_jornal(lote, total)
+            contador.zerar()
+            inicio = time.perf_counter()
+            await caminho(engine, usuario_id, operacoes)
+            print(
+                f"{nome:>10} | {len(operacoes):>9} | {(time.perf_counter() - inicio) * 1000:>9.1f} | "
+                f"{contador.statements:>10} | {contador.commits:>7}"
+            )
+            if caminho is jornal:
+                contador.zerar()
+                reenvio = await jornal(engine, usuario_id, operacoes)
+                print(
+                    f"{'reenvio':>10} | {len(operacoes):>9} | {'':>9} | {contador.statements:>10} | "
+                    f"{contador.commits:>7}  (aplicadas={reenvio.aplicadas}, repetidas={reenvio.repetidas})"
+                )
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=10_000, help="volume de execuções gerado")
+    parser.add_argument("--passos", type=int, default=10, help="passos por caso")
+    parser.add_argument("--operacoes", type=int, default=200, help="tamanho do jornal")
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.passos, args.operacoes))
@@ -0,0 +1,60 @@
+"""
+Gráfico de velocidade de 365 dias: agrupamento por date(updated_at) sobre
+execucoes_teste (consulta antiga) contra a leitura do fato diário
+(DashboardRepository.get_performance_velocity), por dia, semana e mês.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_velocidade --execucoes 1000000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.testing import ExecucaoTeste, STATUS_FINAIS
+from app.repositories.dashboard_repository import DashboardRepository
+from benchmarks.dados import criar_engine, limpar, medir, popular
+
+async def velocidade_antiga(session: AsyncSession, dias: int):
+    dia = func.date(ExecucaoTeste.updated_at)
+    query = (
+        select(dia, func.count(ExecucaoTeste.id))
+        .where(ExecucaoTeste.updated_at >= datetime.now() - timedelta(days=dias))
+        .where(ExecucaoTeste.status_geral.in_(STATUS_FINAIS))
+        .group_by(dia)
+        .order_by(dia)
+    )
+    return (await session.execute(query)).all()
+
+async def rodar(volumes, repeticoes: int):
+    engine = criar_engine()
+
+    print(f"{'execucoes':>10} | {'caminho':>12} | {'mediana ms':>10} | {'p95 ms':>8}")
+    for volume in volumes:
+        sistema_id = await popular(engine, volume)
+        try:
+            async with AsyncSession(engine) as session:
+                repo = DashboardRepository(session)
+                caminhos = {
+                    "antigo": lambda: velocidade_antiga(session, 365),
+                    "fato/dia": lambda: repo.get_performance_velocity(granularidade="dia", days=365),
+                    "fato/semana": lambda: repo.get_performance_velocity(granularidade="semana", days=365),
+                    "fato/mes": lambda: repo.get_performance_velocity(granularidade="mes", days=365),
+                }
+                for nome, caminho in caminhos.items():
+                    tempos = await medir(caminho, repeticoes)
+                    print(f"{volume:>10} | {nome:>12} | {tempos['mediana_ms']:>10} | {tempos['p95_ms']:>8}")
+        finally:
+            await limpar(engine, sistema_id)
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.repeticoes))
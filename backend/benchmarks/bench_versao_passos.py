@@ -0,0 +1,96 @@
+"""
+Edição concorrente do mesmo passo com concorrência otimista: --abas clientes
+leem o passo (versao) e gravam ao mesmo tempo informando a versão lida. Só uma
+gravação por rodada pode vencer; as demais recebem 409 com o estado atual, em
+vez de sobrescrever em silêncio. Mede também statements por PUT de passo, com
+e sem versao (o PUT não lê mais o passo antes de gravar).
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco migrado):
+    python -m benchmarks.bench_versao_passos --abas 4 --rodadas 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.execucao_teste import ExecucaoPassoUpdate
+from app.services.execucao_teste_service import ExecucaoTesteService
+from benchmarks.dados import ContadorIdasAoBanco, criar_engine, limpar, popular
+
+async def passos_da_massa(engine, sistema_id: int, quantidade: int):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("""
+            SELECT ep.id FROM execucoes_passos ep
+            JOIN execucoes_teste e ON e.id = ep.execucao_teste_id
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s ORDER BY ep.id LIMIT :n
+        """), {"s": sistema_id, "n": quantidade})).scalars().all()
+
+async def versao_atual(engine, passo_id: int) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(
+            text("SELECT versao FROM execucoes_passos WHERE id = :id"), {"id": passo_id}
+        )).scalar_one()
+
+async def gravar(engine, passo_id: int, dados: ExecucaoPassoUpdate) -> int:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        try:
+            await ExecucaoTesteService(session).registrar_resultado_passo(passo_id, dados)
+            return 200
+        except HTTPException as erro:
+            return erro.status_code
+
+async def rodar(volume: int, abas: int, rodadas: int, medidas: int):
+    engine = criar_engine(pool_size=abas)
+    contador = ContadorIdasAoBanco(engine)
+    sistema_id = await popular(engine, volume, gerar_passos_execucao=True)
+    try:
+        passos = await passos_da_massa(engine, sistema_id, rodadas + 2 * medidas)
+        disputados, simples = passos[:rodadas], passos[rodadas:]
+
+        print(f"{'PUT':>12} | {'mediana ms':>10} | {'statements':>10} | {'commits':>7}")
+        for nome, com_versao, alvos in (("sem versao", False, simples[::2]), ("com versao", True, simples[1::2])):
+            # A versão é lida antes, como o cliente faria: não entra na conta do PUT
+            versoes = {p: (await versao_atual(engine, p) if com_versao else None) for p in alvos}
+            tempos = []
+            contador.zerar()
+            for passo_id in alvos:
+                dados = ExecucaoPassoUpdate(status="passou", resultado_obtido="ok", versao=versoes[passo_id])
+                inicio = time.perf_counter()
+                await gravar(engine, passo_id, dados)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            n = max(len(alvos), 1)
+            print(
+                f"{nome:>12} | {statistics.median(tempos) if tempos else 0:>10.2f} | "
+                f"{contador.statements / n:>10.1f} | {contador.commits / n:>7.1f}"
+            )
+
+        respostas = {}
+        for passo_id in disputados:
+            versao = await versao_atual(engine, passo_id)
+            resultado = await asyncio.gather(*(
+                gravar(engine, passo_id, ExecucaoPassoUpdate(resultado_obtido=f"aba {aba}", versao=versao))
+                for aba in range(abas)
+            ))
+            for codigo in resultado:
+                respostas[codigo] = respostas.get(codigo, 0) + 1
+        print(f"\n{rodadas} rodadas x {abas} abas no mesmo passo: " + ", ".join(
+            f"{codigo}: {total}" for codigo, total in sorted(respostas.items())
+        ))
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--execucoes", type=int, default=10_000)
+    parser.add_argument("--abas", type=int, default=4)
+    parser.add_argument("--rodadas", type=int, default=50)
+    parser.add_argument("--execucoes-medidas", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(rodar(args.execucoes, args.abas, args.rodadas, args.execucoes_medidas))
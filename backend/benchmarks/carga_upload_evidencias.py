@@ -0,0 +1,107 @@
+"""
+Teste de carga do upload de evidências contra um servidor rodando: mede a
+latência de outros endpoints (--sondas) sozinhos e depois durante --uploads
+envios simultâneos de --tamanho-mb MB cada (PUT /testes/passos/{id}/evidencia,
+corpo em stream). Com a gravação fora do event loop as latências das sondas
+devem ficar praticamente iguais nas duas fases.
+
+Os bytes enviados são gerados na hora (um bloco repetido), então o cliente
+não precisa de 50 MB em memória por upload. Os arquivos ficam em
+EVIDENCIAS_DIR no servidor; apague-os depois se quiser.
+
+Uso (servidor em outro terminal, usuário existente):
+    python -m benchmarks.carga_upload_evidencias --base-url http://localhost:8000 \\
+        --email runner@exemplo.com --senha ... --uploads 8 --tamanho-mb 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+BLOCO = 256 * 1024
+
+async def login(cliente: httpx.AsyncClient, email: str, senha: str) -> str:
+    resposta = await cliente.post("/api/v1/login/", data={"username": email, "password": senha})
+    resposta.raise_for_status()
+    return resposta.json()["access_token"]
+
+async def corpo(tamanho: int):
+    bloco = os.urandom(BLOCO)
+    enviados = 0
+    while enviados < tamanho:
+        parte = bloco[: min(BLOCO, tamanho - enviados)]
+        enviados += len(parte)
+        yield parte
+
+async def enviar(cliente: httpx.AsyncClient, passo_id: int, tamanho: int) -> float:
+    inicio = time.perf_counter()
+    resposta = await cliente.put(
+        f"/api/v1/testes/passos/{passo_id}/evidencia",
+        content=corpo(tamanho),
+        headers={"Content-Type": "video/mp4", "Content-Length": str(tamanho)},
+    )
+    resposta.raise_for_status()
+    return time.perf_counter() - inicio
+
+async def sondar(cliente: httpx.AsyncClient, caminhos, parar: asyncio.Event, intervalo: float):
+    tempos = {caminho: [] for caminho in caminhos}
+    while not parar.is_set():
+        for caminho in caminhos:
+            inicio = time.perf_counter()
+            (await cliente.get(caminho)).raise_for_status()
+            tempos[caminho].append((time.perf_counter() - inicio) * 1000)
+        await asyncio.sleep(intervalo)
+    return tempos
+
+def resumo(tempos):
+    if not tempos:
+        return "sem amostras"
+    tempos = sorted(tempos)
+    p95 = tempos[min(len(tempos) - 1, int(round(len(tempos) * 0.95)) - 1)]
+    return f"n={len(tempos):>4}  mediana={statistics.median(tempos):7.1f} ms  p95={p95:7.1f} ms  max={tempos[-1]:7.1f} ms"
+
+async def rodar(args):
+    limites = httpx.Limits(max_connections=args.uploads + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=300, limits=limites) as cliente:
+        cliente.headers["Authorization"] = f"Bearer {await login(cliente, args.email, args.senha)}"
+
+        parar = asyncio.Event()
+        sondas = asyncio.create_task(sondar(cliente, args.sondas, parar, args.intervalo))
+        await asyncio.sleep(args.duracao_base)
+        parar.set()
+        base = await sondas
+
+        parar = asyncio.Event()
+        sondas = asyncio.create_task(sondar(cliente, args.sondas, parar, args.intervalo))
+        tamanho = args.tamanho_mb * 1024 * 1024
+        inicio = time.perf_counter()
+        duracoes = await asyncio.gather(*(enviar(cliente, args.passo_id, tamanho) for _ in range(args.uploads)))
+        total = time.perf_counter() - inicio
+        parar.set()
+        carga = await sondas
+
+    print(f"{args.uploads} uploads de {args.tamanho_mb} MB em {total:.1f} s "
+          f"({args.uploads * args.tamanho_mb / total:.0f} MB/s; mais lento {max(duracoes):.1f} s)")
+    for caminho in args.sondas:
+        print(f"\n{caminho}")
+        print(f"  sem uploads:  {resumo(base[caminho])}")
+        print(f"  com uploads:  {resumo(carga[caminho])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--senha", required=True)
+    parser.add_argument("--passo-id", type=int, default=1, help="passo de execução existente que recebe os envios")
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--tamanho-mb", type=int, default=50)
+    parser.add_argument("--duracao-base", type=float, default=5, help="segundos de sondagem sem uploads")
+    parser.add_argument("--intervalo", type=float, default=0.05, help="pausa entre rodadas de sondagem")
+    parser.add_argument(
+        "--sondas", nargs="+",
+        default=["/health", "/api/v1/testes/minhas-tarefas?view=summary&limit=1"],
+    )
+    asyncio.run(rodar(parser.parse_args()))
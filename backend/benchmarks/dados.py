@@ -0,0 +1,237 @@
+"""
+Geração de massa de dados para os benchmarks.
+
+Todos os registros ficam presos a um Sistema próprio ("bench<hex>"), então o
+benchmark pode rodar em um banco de desenvolvimento já migrado
+(alembic upgrade head) e limpar tudo no final com `limpar`.
+Os INSERTs usam generate_series, então 1M de execuções leva segundos.
+"""
+import time
+import uuid
+import statistics
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.models.projeto import Projeto
+from app.models.testing import CasoTeste, ExecucaoTeste
+from app.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from app.repositories.execucao_teste_repository import recontar_passos
+
+def criar_engine(pool_size: int = 10) -> AsyncEngine:
+    # Sem echo: o log de SQL distorce completamente as medições
+    return create_async_engine(settings.ASYNC_DATABASE_URL, echo=False, pool_size=pool_size, max_overflow=10)
+
+class ContadorIdasAoBanco:
+    """Conta statements e commits enviados pelo engine (round trips) e o tempo gasto neles."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.statements = 0
+        self.commits = 0
+        self.tempo_ms = 0.0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._on_executed)
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        conn.info["inicio_statement"] = time.perf_counter()
+
+    def _on_executed(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info.pop("inicio_statement", None)
+        if inicio is not None:
+            self.tempo_ms += (time.perf_counter() - inicio) * 1000
+
+    def _on_commit(self, *args, **kwargs):
+        self.commits += 1
+
+    def zerar(self):
+        self.statements = 0
+        self.commits = 0
+        self.tempo_ms = 0.0
+
+async def medir(func: Callable[[], Awaitable], repeticoes: int) -> Dict[str, float]:
+    """Executa `func` algumas vezes e devolve mediana/p95 em milissegundos."""
+    await func()  # aquecimento (cache de planos e de páginas)
+    tempos: List[float] = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await func()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p95 = tempos[min(len(tempos) - 1, int(round(len(tempos) * 0.95)) - 1)]
+    return {"mediana_ms": round(statistics.median(tempos), 2), "p95_ms": round(p95, 2)}
+
+async def popular(
+    engine: AsyncEngine,
+    total_execucoes: int,
+    passos_por_caso: int = 5,
+    gerar_passos_execucao: bool = False,
+    total_runners: int = 20,
+) -> int:
+    """Cria sistema, módulos, projetos, ciclos, casos, execuções e defeitos. Retorna o sistema_id."""
+    tag = f"bench{uuid.uuid4().hex[:8]}"
+    total_casos = max(total_execucoes // 10, 50)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO niveis_acesso (nome, descricao) VALUES ('user', 'Usuário') ON CONFLICT (nome) DO NOTHING"
+        ))
+        nivel_id = (await conn.execute(text("SELECT id FROM niveis_acesso WHERE nome = 'user'"))).scalar()
+
+        sistema_id = (await conn.execute(
+            text("INSERT INTO sistemas (nome, descricao, ativo) VALUES (:nome, 'benchmark', true) RETURNING id"),
+            {"nome": tag}
+        )).scalar()
+
+        await conn.execute(text("""
+            INSERT INTO modulos (sistema_id, nome, ordem, ativo)
+            SELECT :s, 'modulo-' || g, g, true FROM generate_series(1, 10) g
+        """), {"s": sistema_id})
+
+        await conn.execute(text("""
+            INSERT INTO usuarios (nome, username, email, senha_hash, nivel_acesso_id, ativo)
+            SELECT 'Runner ' || g, :tag || '_u' || g, :tag || '_u' || g || '@bench.local', 'x', :nivel, true
+            FROM generate_series(1, :n) g
+        """), {"tag": tag, "nivel": nivel_id, "n": total_runners})
+
+        await conn.execute(text("""
+            INSERT INTO projetos (nome, modulo_id, sistema_id, status)
+            SELECT 'projeto-' || g, m.id, :s, 'ativo'
+            FROM modulos m CROSS JOIN generate_series(1, 5) g
+            WHERE m.sistema_id = :s
+        """), {"s": sistema_id})
+
+        await conn.execute(text("""
+            INSERT INTO ciclos_teste (projeto_id, nome, numero, status)
+            SELECT p.id, 'ciclo-1', 1, 'em_execucao' FROM projetos p WHERE p.sistema_id = :s
+        """), {"s": sistema_id})
+
+        await conn.execute(text("""
+            WITH p AS (
+                SELECT array_agg(p.id ORDER BY p.id) AS projetos, array_agg(c.id ORDER BY p.id) AS ciclos
+                FROM projetos p JOIN ciclos_teste c ON c.projeto_id = p.id
+                WHERE p.sistema_id = :s
+            )
+            INSERT INTO casos_teste (projeto_id, ciclo_id, nome, prioridade, status)
+            SELECT p.projetos[1 + g % cardinality(p.projetos)],
+                   p.ciclos[1 + g % cardinality(p.ciclos)],
+                   'caso-' || g,
+                   (ARRAY['alta', 'media', 'baixa'])[1 + g % 3]::prioridade_enum,
+                   'ativo'
+            FROM p CROSS JOIN generate_series(1, :n) g
+        """), {"s": sistema_id, "n": total_casos})
+
+        if passos_por_caso:
+            await conn.execute(text("""
+                INSERT INTO passos_caso_teste (caso_teste_id, ordem, acao, resultado_esperado)
+                SELECT c.id, o, 'Ação ' || o, 'Resultado ' || o
+                FROM casos_teste c JOIN projetos p ON p.id = c.projeto_id
+                CROSS JOIN generate_series(1, :k) o
+                WHERE p.sistema_id = :s
+            """), {"s": sistema_id, "k": passos_por_caso})
+
+        await conn.execute(text("""
+            WITH c AS (
+                SELECT array_agg(c.id ORDER BY c.id) AS casos, array_agg(c.ciclo_id ORDER BY c.id) AS ciclos
+                FROM casos_teste c JOIN projetos p ON p.id = c.projeto_id
+                WHERE p.sistema_id = :s
+            ),
+            u AS (
+                SELECT array_agg(id ORDER BY id) AS runners FROM usuarios WHERE username LIKE :tag || '_u%'
+            )
+            INSERT INTO execucoes_teste (ciclo_teste_id, caso_teste_id, responsavel_id, status_geral, created_at, updated_at)
+            SELECT c.ciclos[1 + g % cardinality(c.casos)],
+                   c.casos[1 + g % cardinality(c.casos)],
+                   u.runners[1 + g % cardinality(u.runners)],
+                   (ARRAY['pendente', 'em_progresso', 'reteste', 'fechado', 'bloqueado', 'falha'])[1 + (g * 7) % 6]::status_execucao_enum,
+                   now() - ((g % 365) * interval '1 day'),
+                   now() - ((g % 365) * interval '1 day')
+            FROM c CROSS JOIN u CROSS JOIN generate_series(1, :n) g
+        """), {"s": sistema_id, "tag": tag, "n": total_execucoes})
+
+        if gerar_passos_execucao:
+            await conn.execute(text("""
+                INSERT INTO execucoes_passos (execucao_teste_id, passo_caso_teste_id, status, resultado_obtido)
+                SELECT e.id, pc.id, 'pendente', ''
+                FROM execucoes_teste e
+                JOIN casos_teste c ON c.id = e.caso_teste_id
+                JOIN projetos p ON p.id = c.projeto_id
+                JOIN passos_caso_teste pc ON pc.caso_teste_id = c.id
+                WHERE p.sistema_id = :s
+            """), {"s": sistema_id})
+
+        await conn.execute(text("""
+            INSERT INTO defeitos (execucao_teste_id, titulo, descricao, evidencias, severidade, status)
+            SELECT e.id, 'Defeito ' || e.id, 'benchmark', '[]',
+                   (ARRAY['critico', 'alto', 'medio', 'baixo'])[1 + e.id % 4]::severidade_defeito_enum,
+                   (ARRAY['aberto', 'em_teste', 'corrigido', 'fechado'])[1 + (e.id / 20) % 4]::status_defeito_enum
+            FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s AND e.id % 20 = 0
+        """), {"s": sistema_id})
+
+        # Mesma carga inicial da migration do fato diário
+        await conn.execute(text("""
+            INSERT INTO fato_execucoes_diarias (dia, responsavel_id, projeto_id, status, total)
+            SELECT e.updated_at::date, e.responsavel_id, c.projeto_id, e.status_geral, count(*)
+            FROM execucoes_teste e
+            JOIN casos_teste c ON c.id = e.caso_teste_id
+            JOIN projetos p ON p.id = c.projeto_id
+            WHERE p.sistema_id = :s AND e.status_geral IN ('fechado', 'falha', 'bloqueado')
+            GROUP BY e.updated_at::date, e.responsavel_id, c.projeto_id, e.status_geral
+        """), {"s": sistema_id})
+
+    # Os INSERTs acima não passam pelos repositórios
+    async with AsyncSession(engine) as session:
+        await DashboardRollupRepository(session).recalcular()
+        if gerar_passos_execucao:
+            casos_do_sistema = select(CasoTeste.id).join(Projeto, CasoTeste.projeto_id == Projeto.id).where(Projeto.sistema_id == sistema_id)
+            await recontar_passos(session, ExecucaoTeste.caso_teste_id.in_(casos_do_sistema))
+        await session.commit()
+
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+    return sistema_id
+
+async def limpar(engine: AsyncEngine, sistema_id: int):
+    """Remove tudo o que `popular` criou para o sistema informado."""
+    escopo_execucoes = """
+        SELECT e.id FROM execucoes_teste e
+        JOIN casos_teste c ON c.id = e.caso_teste_id
+        JOIN projetos p ON p.id = c.projeto_id
+        WHERE p.sistema_id = :s
+    """
+    async with engine.begin() as conn:
+        tag = (await conn.execute(text("SELECT nome FROM sistemas WHERE id = :s"), {"s": sistema_id})).scalar()
+        await conn.execute(text(
+            "DELETE FROM fato_execucoes_diarias WHERE projeto_id IN (SELECT id FROM projetos WHERE sistema_id = :s)"
+        ), {"s": sistema_id})
+        await conn.execute(text(f"DELETE FROM execucoes_passos WHERE execucao_teste_id IN ({escopo_execucoes})"), {"s": sistema_id})
+        await conn.execute(text(f"DELETE FROM defeitos WHERE execucao_teste_id IN ({escopo_execucoes})"), {"s": sistema_id})
+        await conn.execute(text(f"DELETE FROM execucoes_teste WHERE id IN ({escopo_execucoes})"), {"s": sistema_id})
+        await conn.execute(text("""
+            DELETE FROM passos_caso_teste WHERE caso_teste_id IN (
+                SELECT c.id FROM casos_teste c JOIN projetos p ON p.id = c.projeto_id WHERE p.sistema_id = :s
+            )
+        """), {"s": sistema_id})
+        await conn.execute(text(
+            "DELETE FROM casos_teste WHERE projeto_id IN (SELECT id FROM projetos WHERE sistema_id = :s)"
+        ), {"s": sistema_id})
+        await conn.execute(text(
+            "DELETE FROM ciclos_teste WHERE projeto_id IN (SELECT id FROM projetos WHERE sistema_id = :s)"
+        ), {"s": sistema_id})
+        await conn.execute(text("""
+            DELETE FROM versoes_escopo
+            WHERE escopo = 'sistema:' || :s
+               OR escopo IN (SELECT 'projeto:' || id FROM projetos WHERE sistema_id = :s)
+        """), {"s": sistema_id})
+        await conn.execute(text("DELETE FROM projetos WHERE sistema_id = :s"), {"s": sistema_id})
+        await conn.execute(text("DELETE FROM modulos WHERE sistema_id = :s"), {"s": sistema_id})
+        await conn.execute(text("DELETE FROM sistemas WHERE id = :s"), {"s": sistema_id})
+        if tag:
+            await conn.execute(text("DELETE FROM usuarios WHERE username LIKE :tag || '_u%'"), {"tag": tag})
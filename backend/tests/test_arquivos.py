@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.arquivos import _intervalo, tipo_por_extensao
+
+@pytest.mark.parametrize("cabecalho, esperado", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),      # sufixo maior que o arquivo: o arquivo todo
+    ("bytes=900-5000", (900, 999)), # fim além do arquivo é cortado
+    ("BYTES = 10-20", (10, 20)),
+])
+def test_intervalo_valido(cabecalho, esperado):
+    assert _intervalo(cabecalho, 1000) == esperado
+
+@pytest.mark.parametrize("cabecalho", [
+    "items=0-99",
+    "bytes=0-9,20-29", # vários intervalos: responde o arquivo inteiro
+    "bytes=50-10",
+    "bytes=-",
+    "bytes=abc",
+    "bytes=1-x",
+    "bytes",
+])
+def test_intervalo_nao_entendido_vira_arquivo_inteiro(cabecalho):
+    assert _intervalo(cabecalho, 1000) is None
+
+@pytest.mark.parametrize("cabecalho", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_intervalo_fora_do_arquivo(cabecalho):
+    with pytest.raises(HTTPException) as erro:
+        _intervalo(cabecalho, 1000)
+    assert erro.value.status_code == 416
+    assert erro.value.headers["Content-Range"] == "bytes */1000"
+
+def test_tipo_por_extensao_so_tipos_permitidos():
+    assert tipo_por_extensao("antigo/captura.png") == "image/png"
+    assert tipo_por_extensao("antigo/pagina.html") == "application/octet-stream"
+    assert tipo_por_extensao("antigo/sem_extensao") == "application/octet-stream"
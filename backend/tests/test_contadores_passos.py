@@ -0,0 +1,110 @@
+"""
+Os contadores de passos da execução (passos_pendentes, passos_aprovados, ...)
+mantidos pelas gravações incrementais têm de bater com a recontagem do zero
+(recontar_passos) depois de cada tipo de gravação. Precisa de um Postgres
+migrado (alembic upgrade head) em TEST_DATABASE_URL; sem ele, é pulado. Os
+dados são criados e removidos como nos benchmarks (benchmarks.dados).
+"""
+import os
+import uuid
+from typing import Dict, List, Tuple
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.projeto import Projeto
+from app.models.testing import CONTADORES_PASSOS, CasoTeste, ExecucaoPasso, ExecucaoTeste, StatusExecucaoEnum
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository, recontar_passos
+from app.schemas.execucao_teste import ExecucaoPassoUpdate
+from benchmarks.dados import criar_engine, limpar, popular
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL não definido"),
+]
+
+COLUNAS = [getattr(ExecucaoTeste, coluna) for coluna in CONTADORES_PASSOS.values()]
+
+@pytest.fixture
+async def banco():
+    engine = criar_engine(pool_size=2)
+    sistema_id = await popular(engine, total_execucoes=20, passos_por_caso=4, gerar_passos_execucao=True, total_runners=2)
+    try:
+        yield engine, sistema_id
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+
+async def execucao_pendente(engine, sistema_id: int) -> Tuple[int, int, List[int]]:
+    async with AsyncSession(engine) as session:
+        execucao = (await session.execute(
+            select(ExecucaoTeste.id, ExecucaoTeste.responsavel_id)
+            .join(CasoTeste, CasoTeste.id == ExecucaoTeste.caso_teste_id)
+            .join(Projeto, Projeto.id == CasoTeste.projeto_id)
+            .where(Projeto.sistema_id == sistema_id, ExecucaoTeste.status_geral == StatusExecucaoEnum.pendente)
+            .order_by(ExecucaoTeste.id)
+            .limit(1)
+        )).one()
+        passos = (await session.execute(
+            select(ExecucaoPasso.id).where(ExecucaoPasso.execucao_teste_id == execucao.id).order_by(ExecucaoPasso.id)
+        )).scalars().all()
+    return execucao.id, execucao.responsavel_id, list(passos)
+
+async def contadores(engine, execucao_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """(gravados, recontados); a recontagem é desfeita no rollback."""
+    consulta = select(*COLUNAS).where(ExecucaoTeste.id == execucao_id)
+    async with AsyncSession(engine) as session:
+        gravados = (await session.execute(consulta)).one()
+        await recontar_passos(session, ExecucaoTeste.id == execucao_id)
+        recontados = (await session.execute(consulta)).one()
+        await session.rollback()
+    return dict(zip(CONTADORES_PASSOS.values(), gravados)), dict(zip(CONTADORES_PASSOS.values(), recontados))
+
+async def status_geral(engine, execucao_id: int) -> StatusExecucaoEnum:
+    async with AsyncSession(engine) as session:
+        return (await session.execute(select(ExecucaoTeste.status_geral).where(ExecucaoTeste.id == execucao_id))).scalar()
+
+async def test_contadores_batem_com_recontagem(banco):
+    engine, sistema_id = banco
+    execucao_id, usuario_id, passos = await execucao_pendente(engine, sistema_id)
+    assert len(passos) == 4
+
+    async def conferir(**esperado):
+        gravados, recontados = await contadores(engine, execucao_id)
+        assert gravados == recontados
+        assert {coluna: gravados[coluna] for coluna in esperado} == esperado
+
+    # Passo a passo
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await ExecucaoTesteRepository(session).update_passo(passos[0], ExecucaoPassoUpdate(status="aprovado"))
+    await conferir(passos_pendentes=3, passos_aprovados=1)
+    assert await status_geral(engine, execucao_id) == StatusExecucaoEnum.em_progresso
+
+    # Lote (inclui um item só com texto: o status do passo não muda)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await ExecucaoTesteRepository(session).update_passos_lote(execucao_id, [
+            {"id": passos[1], "status": "reprovado"},
+            {"id": passos[2], "status": "bloqueado"},
+            {"id": passos[0], "resultado_obtido": "ok"},
+        ])
+    await conferir(passos_pendentes=1, passos_aprovados=1, passos_reprovados=1, passos_bloqueados=1)
+
+    # Reteste da execução não mexe nos passos
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await ExecucaoTesteRepository(session).update_status(execucao_id, StatusExecucaoEnum.reteste)
+    await conferir(passos_pendentes=1, passos_aprovados=1, passos_reprovados=1, passos_bloqueados=1)
+
+    # Jornal offline: o status vem antes dos passos, que fecham a execução
+    operacoes = [
+        {"op_id": uuid.uuid4().hex, "tipo": "status", "execucao_id": execucao_id, "status": "em_progresso"},
+        *[
+            {"op_id": uuid.uuid4().hex, "tipo": "passo", "execucao_id": execucao_id, "passo_id": passo_id, "status": "aprovado"}
+            for passo_id in passos[1:]
+        ],
+    ]
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        resultados = await ExecucaoTesteRepository(session).aplicar_jornal(usuario_id, operacoes)
+    assert {resultado["resultado"] for resultado in resultados.values()} == {"aplicada"}
+    await conferir(passos_pendentes=0, passos_aprovados=4, passos_reprovados=0, passos_bloqueados=0)
+    assert await status_geral(engine, execucao_id) == StatusExecucaoEnum.fechado
@@ -0,0 +1,38 @@
+import json
+
+from app.repositories.evidencia_repository import delta_referencias, hashes_evidencias, lista_evidencias
+
+A, B, C = "a" * 64, "b" * 64, "c" * 64
+
+def url(sha256: str, extensao: str = ".png") -> str:
+    return f"http://api/evidencias/blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao}"
+
+def test_lista_evidencias_aceita_json_lista_e_referencia_solta():
+    assert lista_evidencias(None) == []
+    assert lista_evidencias("") == []
+    assert lista_evidencias([url(A)]) == [url(A)]
+    assert lista_evidencias(json.dumps([url(A), url(B)])) == [url(A), url(B)]
+    assert lista_evidencias(url(A)) == [url(A)]
+
+def test_hashes_evidencias_ignora_urls_que_nao_sao_blobs():
+    valor = json.dumps([url(A), url(A, ".jpg"), "http://externo/imagem.png", "evidencias/antigo.png"])
+    assert hashes_evidencias(valor) == {A}
+
+def test_delta_referencias_anexar_e_remover():
+    assert delta_referencias([(None, [url(A)])]) == {A: 1}
+    assert delta_referencias([([url(A)], None)]) == {A: -1}
+    assert delta_referencias([([url(A)], json.dumps([url(B)]))]) == {A: -1, B: 1}
+
+def test_delta_referencias_sem_mudanca_nao_aparece():
+    assert delta_referencias([([url(A)], [url(A)])]) == {}
+    # O mesmo blob duas vezes no mesmo passo conta uma referência só
+    assert delta_referencias([(None, [url(A), url(A)])]) == {A: 1}
+
+def test_delta_referencias_soma_os_donos():
+    trocas = [
+        (None, [url(A), url(B)]),
+        ([url(A)], [url(C)]),
+        ([url(B)], None),
+    ]
+    # A e B entram num passo e saem de outro: só C muda
+    assert delta_referencias(trocas) == {C: 1}
@@ -0,0 +1,15 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services.evidencias import extensao_evidencia, normalizar_tipo
+
+def test_extensao_vem_so_do_tipo():
+    assert extensao_evidencia("image/png") == ".png"
+    assert extensao_evidencia("application/pdf") == ".pdf"
+    assert extensao_evidencia("application/x-desconhecido") == ".bin"
+
+def test_normalizar_tipo():
+    assert normalizar_tipo("Image/PNG; charset=binary") == "image/png"
+    with pytest.raises(HTTPException) as erro:
+        normalizar_tipo("text/html")
+    assert erro.value.status_code == 415
@@ -0,0 +1,83 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.testing import StatusExecucaoEnum, StatusPassoEnum
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository, status_consolidado
+
+avaliar = ExecucaoTesteRepository._avaliar_operacao
+
+@pytest.mark.parametrize("status_atual, total, aprovados, reprovados, esperado", [
+    (StatusExecucaoEnum.em_progresso, 3, 3, 0, StatusExecucaoEnum.fechado),
+    (StatusExecucaoEnum.reteste, 3, 3, 0, StatusExecucaoEnum.fechado),
+    (StatusExecucaoEnum.pendente, 3, 0, 1, StatusExecucaoEnum.em_progresso),
+    (StatusExecucaoEnum.fechado, 3, 2, 1, StatusExecucaoEnum.em_progresso),
+    (StatusExecucaoEnum.pendente, 3, 1, 0, StatusExecucaoEnum.em_progresso),
+    (StatusExecucaoEnum.em_progresso, 3, 1, 0, None),
+    (StatusExecucaoEnum.reteste, 3, 0, 0, None),
+    (StatusExecucaoEnum.bloqueado, 3, 2, 0, None),
+])
+def test_status_consolidado(status_atual, total, aprovados, reprovados, esperado):
+    assert status_consolidado(status_atual, total, aprovados, reprovados) == esperado
+
+def execucao(id=1, versao=3, status=StatusExecucaoEnum.em_progresso):
+    return SimpleNamespace(id=id, versao=versao, status_geral=status)
+
+def passo(id=10, execucao_teste_id=1, versao=2, evidencias=None):
+    return SimpleNamespace(
+        id=id, execucao_teste_id=execucao_teste_id, versao=versao,
+        status=StatusPassoEnum.pendente, resultado_obtido="", evidencias=evidencias,
+    )
+
+@pytest.fixture
+def estado():
+    return {1: execucao()}, {10: passo(), 11: passo(id=11, evidencias=json.dumps(["e1"])), 20: passo(id=20, execucao_teste_id=2)}
+
+def test_operacao_ja_rejeitada_pelo_servico(estado):
+    execucoes, passos = estado
+    op = {"op_id": "a", "tipo": "status", "execucao_id": 1, "status": "fechado", "motivo": "Status inválido"}
+    assert avaliar(op, execucoes, passos, {}) == {"resultado": "rejeitada", "motivo": "Status inválido"}
+
+def test_operacao_de_execucao_inexistente(estado):
+    execucoes, passos = estado
+    op = {"op_id": "a", "tipo": "status", "execucao_id": 99, "status": "fechado"}
+    assert avaliar(op, execucoes, passos, {})["resultado"] == "rejeitada"
+
+def test_status_com_versao_antiga_e_conflito(estado):
+    execucoes, passos = estado
+    resultado = avaliar({"tipo": "status", "execucao_id": 1, "status": "fechado", "versao": 2}, execucoes, passos, {})
+    assert resultado["resultado"] == "conflito"
+    assert resultado["atual"] == {"id": 1, "versao": 3, "status_geral": "em_progresso"}
+    assert avaliar({"tipo": "status", "execucao_id": 1, "status": "fechado", "versao": 3}, execucoes, passos, {}) == {
+        "resultado": "aplicada"
+    }
+
+def test_passo_de_outra_execucao_e_rejeitado(estado):
+    execucoes, passos = estado
+    gravar = {}
+    op = {"tipo": "passo", "execucao_id": 1, "passo_id": 20, "status": "aprovado"}
+    assert avaliar(op, execucoes, passos, gravar)["resultado"] == "rejeitada"
+    assert gravar == {}
+
+def test_passo_com_versao_antiga_e_conflito(estado):
+    execucoes, passos = estado
+    gravar = {}
+    resultado = avaliar({"tipo": "passo", "execucao_id": 1, "passo_id": 10, "status": "aprovado", "versao": 1}, execucoes, passos, gravar)
+    assert resultado["resultado"] == "conflito"
+    assert resultado["atual"]["versao"] == 2
+    assert gravar == {}
+
+def test_campos_do_passo_mesclados_na_ordem(estado):
+    execucoes, passos = estado
+    gravar = {}
+    avaliar({"tipo": "passo", "execucao_id": 1, "passo_id": 10, "status": "reprovado", "resultado_obtido": "erro"}, execucoes, passos, gravar)
+    avaliar({"tipo": "passo", "execucao_id": 1, "passo_id": 10, "status": "aprovado"}, execucoes, passos, gravar)
+    assert gravar == {1: {10: {"status": "aprovado", "resultado_obtido": "erro"}}}
+
+def test_evidencia_acrescenta_sem_repetir(estado):
+    execucoes, passos = estado
+    gravar = {}
+    avaliar({"tipo": "evidencia", "execucao_id": 1, "passo_id": 11, "evidencias": ["e1", "e2"]}, execucoes, passos, gravar)
+    avaliar({"tipo": "evidencia", "execucao_id": 1, "passo_id": 11, "evidencias": ["e3"]}, execucoes, passos, gravar)
+    assert gravar[1][11] == {"evidencias": ["e1", "e2", "e3"]}
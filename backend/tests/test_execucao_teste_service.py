@@ -0,0 +1,21 @@
+from app.services.execucao_teste_service import balancear_carga
+
+def test_balancear_carga_lpt():
+    # Maior custo primeiro, sempre para quem está com menos carga (empate: menor id)
+    destino = balancear_carga([(1, 10), (2, 8), (3, 5), (4, 3)], {10: 0, 20: 0})
+    assert destino == {1: 10, 2: 20, 3: 20, 4: 10}
+
+def test_balancear_carga_considera_carga_inicial():
+    assert balancear_carga([(1, 5), (2, 5)], {1: 100, 2: 0}) == {1: 2, 2: 2}
+
+def test_balancear_carga_equilibra_totais():
+    custos = [(i, float(c)) for i, c in enumerate([7, 7, 6, 6, 5, 4, 4, 3, 2, 2], start=1)]
+    destino = balancear_carga(custos, {1: 0, 2: 0, 3: 0})
+    totais = {usuario: 0.0 for usuario in (1, 2, 3)}
+    for execucao_id, custo in custos:
+        totais[destino[execucao_id]] += custo
+    assert set(destino) == {execucao_id for execucao_id, _ in custos}
+    assert max(totais.values()) - min(totais.values()) <= 2
+
+def test_balancear_carga_sem_execucoes():
+    assert balancear_carga([], {1: 0}) == {}
@@ -0,0 +1,119 @@
+"""
+Reservas da fila de execuções: quem pegou uma execução sem responsável pela
+fila só fica com ela enquanto a reserva vale; vencida ou liberada, qualquer
+runner pode reservá-la. Execução atribuída (manual ou balanceamento) continua
+de quem é. Precisa de um Postgres migrado (alembic upgrade head) em
+TEST_DATABASE_URL; sem ele, é pulado. Os dados são criados e removidos como
+nos benchmarks (benchmarks.dados).
+"""
+import os
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.projeto import Projeto
+from app.models.sistema import Sistema
+from app.models.testing import CasoTeste, ExecucaoTeste, StatusExecucaoEnum
+from app.models.usuario import Usuario
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from benchmarks.dados import criar_engine, limpar, popular
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL não definido"),
+]
+
+@pytest.fixture
+async def banco():
+    engine = criar_engine(pool_size=2)
+    sistema_id = await popular(engine, total_execucoes=20, passos_por_caso=0, total_runners=2)
+    try:
+        yield engine, sistema_id
+    finally:
+        await limpar(engine, sistema_id)
+        await engine.dispose()
+
+async def preparar(engine, sistema_id: int) -> Tuple[int, int, List[int]]:
+    """(execucao_id, ciclo_id, [runner_a, runner_b]): a execução é a única reservável do ciclo, sem responsável."""
+    async with AsyncSession(engine) as session:
+        execucao = (await session.execute(
+            select(ExecucaoTeste.id, ExecucaoTeste.ciclo_teste_id)
+            .join(CasoTeste, CasoTeste.id == ExecucaoTeste.caso_teste_id)
+            .join(Projeto, Projeto.id == CasoTeste.projeto_id)
+            .where(Projeto.sistema_id == sistema_id, ExecucaoTeste.status_geral == StatusExecucaoEnum.pendente)
+            .order_by(ExecucaoTeste.id)
+            .limit(1)
+        )).one()
+        tag = (await session.execute(select(Sistema.nome).where(Sistema.id == sistema_id))).scalar()
+        runners = (await session.execute(
+            select(Usuario.id).where(Usuario.username.like(f"{tag}_u%")).order_by(Usuario.id)
+        )).scalars().all()
+        await session.execute(
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.ciclo_teste_id == execucao.ciclo_teste_id, ExecucaoTeste.id != execucao.id)
+            .values(status_geral=StatusExecucaoEnum.fechado)
+        )
+        await session.execute(
+            update(ExecucaoTeste).where(ExecucaoTeste.id == execucao.id).values(responsavel_id=None)
+        )
+        await session.commit()
+    return execucao.id, execucao.ciclo_teste_id, list(runners)
+
+async def reservar(engine, usuario_id: int, ciclo_id: int):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        return await ExecucaoTesteRepository(session).reservar_proxima(usuario_id, ciclo_id=ciclo_id)
+
+async def vencer_reserva(engine, execucao_id: int):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE execucoes_teste SET reservado_ate = now() - interval '1 minute' WHERE id = :id"),
+            {"id": execucao_id}
+        )
+
+async def responsavel(engine, execucao_id: int):
+    async with AsyncSession(engine) as session:
+        return (await session.execute(
+            select(ExecucaoTeste.responsavel_id).where(ExecucaoTeste.id == execucao_id)
+        )).scalar()
+
+async def test_reserva_vencida_volta_para_a_fila(banco):
+    engine, sistema_id = banco
+    execucao_id, ciclo_id, (runner_a, runner_b) = await preparar(engine, sistema_id)
+
+    assert await reservar(engine, runner_a, ciclo_id) == execucao_id
+    assert await responsavel(engine, execucao_id) == runner_a
+    # Reserva valendo: é de A
+    assert await reservar(engine, runner_b, ciclo_id) is None
+
+    await vencer_reserva(engine, execucao_id)
+    assert await reservar(engine, runner_b, ciclo_id) == execucao_id
+    assert await responsavel(engine, execucao_id) == runner_b
+
+async def test_reserva_liberada_volta_sem_responsavel(banco):
+    engine, sistema_id = banco
+    execucao_id, ciclo_id, (runner_a, runner_b) = await preparar(engine, sistema_id)
+
+    assert await reservar(engine, runner_a, ciclo_id) == execucao_id
+    async with AsyncSession(engine) as session:
+        assert await ExecucaoTesteRepository(session).liberar_reserva(execucao_id, runner_a)
+    assert await responsavel(engine, execucao_id) is None
+
+    assert await reservar(engine, runner_b, ciclo_id) == execucao_id
+
+async def test_execucao_atribuida_nao_volta_para_a_fila(banco):
+    engine, sistema_id = banco
+    execucao_id, ciclo_id, (runner_a, runner_b) = await preparar(engine, sistema_id)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE execucoes_teste SET responsavel_id = :a WHERE id = :id"), {"a": runner_a, "id": execucao_id}
+        )
+
+    assert await reservar(engine, runner_a, ciclo_id) == execucao_id
+    await vencer_reserva(engine, execucao_id)
+    assert await reservar(engine, runner_b, ciclo_id) is None
+
+    async with AsyncSession(engine) as session:
+        assert await ExecucaoTesteRepository(session).liberar_reserva(execucao_id, runner_a)
+    assert await responsavel(engine, execucao_id) == runner_a
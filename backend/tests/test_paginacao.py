@@ -0,0 +1,27 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.paginacao import codificar_cursor, decodificar_cursor
+
+def test_cursor_ida_e_volta():
+    momento = datetime(2024, 5, 17, 13, 45, 12, 123456, tzinfo=timezone.utc)
+    cursor = codificar_cursor(momento, 42)
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor) == (momento, 42)
+
+def test_cursor_preserva_fuso():
+    momento = datetime.fromisoformat("2024-01-02T03:04:05-03:00")
+    assert decodificar_cursor(codificar_cursor(momento, 1))[0].utcoffset() == momento.utcoffset()
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "nao-e-cursor",
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+    base64.urlsafe_b64encode(b'["ontem", 1]').decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01T00:00:00", "x"]').decode(),
+])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor)